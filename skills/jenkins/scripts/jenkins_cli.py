@@ -4,20 +4,122 @@ Jenkins CLI tool for Claude Code skill integration.
 Provides read access to Jenkins pipelines, logs, and build management.
 """
 
+from __future__ import annotations
+
 import argparse
+import array
+import collections
+import concurrent
+import datetime
+import fnmatch
+import hashlib
+import http.client
+import importlib.util
+import io
 import json
+import math
 import os
+import re
+import select
+import shutil
+import socket
+import socketserver
+import ssl
 import sys
-import urllib.request
-import urllib.error
+import threading
+import time
 import urllib.parse
 import base64
-from typing import Optional
+import email.utils
+import random
+import zlib
+import contextvars
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Optional
+
+_LAZY_MODULES = []
+
+
+def _lazy_import(name: str):
+    """Register a module that is only executed on first attribute access."""
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    spec.loader = importlib.util.LazyLoader(spec.loader)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    parent, _, child = name.rpartition(".")
+    if parent:
+        setattr(sys.modules[parent], child, module)
+    _LAZY_MODULES.append(module)
+    return module
+
+
+def preload_modules() -> None:
+    """Finish loading lazy modules before worker threads may race to do so."""
+    for module in _LAZY_MODULES:
+        getattr(module, "__doc__")
+
+
+# Only some commands need these, and importing them up front took about a third
+# of the CLI's startup time. Importing one by name would load it straight away,
+# so concurrent.futures is reached through its (eagerly imported) package.
+asyncio = _lazy_import("asyncio")
+sqlite3 = _lazy_import("sqlite3")
+subprocess = _lazy_import("subprocess")
+_lazy_import("concurrent.futures")
 
 JENKINS_URL = os.environ.get("JENKINS_URL", "http://XXX.XXX.XXX.XXX:PORT")
 JENKINS_USER = os.environ.get("JENKINS_USER", "")
 JENKINS_TOKEN = os.environ.get("JENKINS_TOKEN", "")
 
+REQUEST_TIMEOUT = 30
+POOL_MAX_CONNECTIONS = int(os.environ.get("JENKINS_POOL_SIZE", "8"))
+POOL_IDLE_TIMEOUT = float(os.environ.get("JENKINS_POOL_IDLE_TIMEOUT", "60"))
+MAX_REDIRECTS = 5
+CONDITIONAL_LOG_SIZE = 50
+RETRIES = int(os.environ.get("JENKINS_RETRIES", "3"))
+RETRY_BASE_DELAY = float(os.environ.get("JENKINS_RETRY_BASE", "0.5"))
+RETRY_MAX_DELAY = float(os.environ.get("JENKINS_RETRY_MAX", "30"))
+RETRY_BUDGET = int(os.environ.get("JENKINS_RETRY_BUDGET", "10"))
+RETRY_STATUSES = (429, 502, 503, 504)
+CONCURRENCY = int(os.environ.get("JENKINS_CONCURRENCY", "8"))
+LIST_MAX_DEPTH = 5
+HISTORY_PAGE_SIZE = 100
+SYNC_PROBE_SIZE = 10
+STATS_NUMPY_MIN_BUILDS = 5000
+TREE_MAX_BYTES = int(os.environ.get("JENKINS_TREE_MAX_MB", "8")) * 1024 * 1024
+CACHE_DIR = os.environ.get("JENKINS_CACHE_DIR") or os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "jenkins-cli")
+CACHE_MAX_BYTES = int(os.environ.get("JENKINS_CACHE_MAX_MB", "512")) * 1024 * 1024
+WAREHOUSE_PATH = os.environ.get("JENKINS_DB") or os.path.join(CACHE_DIR, "builds.db")
+SEARCH_INDEX_PATH = os.path.join(CACHE_DIR, "search.db")
+SEARCH_INDEX_BATCH = 256
+SEARCH_MAX_SEGMENTS = 16
+SEARCH_SEEN_WORDS = 100000
+CHUNK_SIZE = 64 * 1024
+TAIL_WINDOW = 64 * 1024
+TAIL_MAX_WINDOW = 4 * 1024 * 1024
+FOLLOW_MIN_INTERVAL = 0.5
+FOLLOW_MAX_INTERVAL = 10.0
+DAEMON_SOCKET = os.environ.get("JENKINS_DAEMON_SOCKET") or os.path.join(
+    os.environ.get("XDG_RUNTIME_DIR") or CACHE_DIR, "jenkins-cli.sock")
+DAEMON_IDLE_TIMEOUT = float(os.environ.get("JENKINS_DAEMON_IDLE_TIMEOUT", "1800"))
+DAEMON_CACHE_TTL = float(os.environ.get("JENKINS_DAEMON_CACHE_TTL", "5"))
+DAEMON_CACHE_MAX_BYTES = int(os.environ.get("JENKINS_DAEMON_CACHE_MAX_MB", "64")) * 1024 * 1024
+DAEMON_LOCAL_COMMANDS = ("daemon", "batch", "exporter", "-h", "--help")
+EXPORTER_PORT = 9118
+EXPORTER_INTERVAL = 30.0
+
+
+def job_path(job_name: str) -> str:
+    """URL path of a job given its full name, e.g. "team/app" -> "job/team/job/app"."""
+    return "/".join(f"job/{urllib.parse.quote(part, safe='')}"
+                    for part in job_name.strip("/").split("/"))
+
 
 def get_auth_header() -> dict:
     """Build authorization header if credentials are set."""
@@ -28,195 +130,2771 @@ def get_auth_header() -> dict:
     return {}
 
 
-def make_request(path: str, method: str = "GET", data: Optional[bytes] = None) -> tuple:
-    """Make HTTP request to Jenkins API."""
-    url = f"{JENKINS_URL.rstrip('/')}/{path.lstrip('/')}"
-    headers = get_auth_header()
-    headers["Content-Type"] = "application/x-www-form-urlencoded"
+class ConnectionPool:
+    """Per-host pool of persistent HTTP/1.1 connections shared by all commands."""
+
+    def __init__(self, max_connections: int = POOL_MAX_CONNECTIONS,
+                 idle_timeout: float = POOL_IDLE_TIMEOUT):
+        self.max_connections = max(1, max_connections)
+        self.idle_timeout = idle_timeout
+        self._idle = {}   # (scheme, host, port) -> [(connection, last_used), ...]
+        self._open = {}   # (scheme, host, port) -> connections checked out or idle
+        self._cond = threading.Condition()
+
+    def acquire(self, key: tuple) -> tuple:
+        """Check out a connection for key, returning (connection, reused)."""
+        with self._cond:
+            while True:
+                self._evict_idle(key, time.monotonic())
+                idle = self._idle.get(key)
+                if idle:
+                    conn, _ = idle.pop()
+                    if not _connection_dropped(conn):
+                        return conn, True
+                    conn.close()
+                    self._open[key] -= 1
+                    continue
+                if self._open.get(key, 0) < self.max_connections:
+                    self._open[key] = self._open.get(key, 0) + 1
+                    break
+                self._cond.wait()
+
+        scheme, host, port = key
+        try:
+            if scheme == "https":
+                conn = http.client.HTTPSConnection(host, port, timeout=REQUEST_TIMEOUT,
+                                                   context=_ssl_context())
+            else:
+                conn = http.client.HTTPConnection(host, port, timeout=REQUEST_TIMEOUT)
+            conn.dns_seconds = None
+            conn._create_connection = _resolving_connector(conn)
+        except Exception:
+            self.release(key, None, reusable=False)
+            raise
+        return conn, False
+
+    def release(self, key: tuple, conn, reusable: bool) -> None:
+        """Return a connection to the pool, or drop it if it cannot be reused."""
+        with self._cond:
+            if conn is not None and reusable:
+                self._idle.setdefault(key, []).append((conn, time.monotonic()))
+            else:
+                if conn is not None:
+                    conn.close()
+                self._open[key] -= 1
+            self._cond.notify()
+
+    def close(self) -> None:
+        """Close every idle connection."""
+        with self._cond:
+            for key, idle in self._idle.items():
+                for conn, _ in idle:
+                    conn.close()
+                self._open[key] -= len(idle)
+            self._idle.clear()
+
+    def _evict_idle(self, key: tuple, now: float) -> None:
+        idle = self._idle.get(key, [])
+        while idle and now - idle[0][1] >= self.idle_timeout:
+            conn, _ = idle.pop(0)
+            conn.close()
+            self._open[key] -= 1
+
+
+_SSL_CONTEXT = None
+_SSL_CONTEXT_LOCK = threading.Lock()
+
+
+def _ssl_context():
+    """Client SSL context shared by every HTTPS connection, created on first use."""
+    global _SSL_CONTEXT
+    with _SSL_CONTEXT_LOCK:
+        if _SSL_CONTEXT is None:
+            _SSL_CONTEXT = ssl.create_default_context()
+        return _SSL_CONTEXT
+
+
+def _resolving_connector(conn):
+    """socket.create_connection for conn that times the DNS lookup separately from connecting."""
+    def create_connection(address, timeout, source_address=None):
+        host, port = address
+        start = time.perf_counter()
+        addresses = socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM)
+        conn.dns_seconds = time.perf_counter() - start
+        error = OSError(f"getaddrinfo returned no addresses for {host}")
+        for *_, sockaddr in addresses:
+            try:
+                return socket.create_connection(sockaddr[:2], timeout, source_address)
+            except OSError as e:
+                error = e
+        raise error
+    return create_connection
+
+
+def _connection_dropped(conn) -> bool:
+    """Detect keep-alive sockets the server has already closed."""
+    if conn.sock is None:
+        return False  # http.client reconnects on the next request
+    try:
+        readable, _, _ = select.select([conn.sock], [], [], 0)
+    except (OSError, ValueError):
+        return True
+    # An idle HTTP connection should never have anything to read; EOF or
+    # stray bytes both mean the socket cannot carry another request.
+    return bool(readable)
+
+
+_POOL = ConnectionPool()
+
+
+class TransferStats:
+    """Running totals of response body bytes on the wire and after decoding."""
+
+    def __init__(self):
+        self.requests = 0
+        self.wire_bytes = 0
+        self.decoded_bytes = 0
+        self.conditional = collections.Counter()  # outcome -> conditional GETs
+        self.recent_conditional = collections.deque(maxlen=CONDITIONAL_LOG_SIZE)  # (outcome, path)
+        self._lock = threading.Lock()
+
+    def add(self, requests: int = 0, wire_bytes: int = 0, decoded_bytes: int = 0) -> None:
+        with self._lock:
+            self.requests += requests
+            self.wire_bytes += wire_bytes
+            self.decoded_bytes += decoded_bytes
+
+    def record_conditional(self, outcome: str, path: str) -> None:
+        """Note whether a conditional GET was revalidated (304) or refetched."""
+        with self._lock:
+            self.conditional[outcome] += 1
+            self.recent_conditional.append((outcome, path))
+
+    def summary(self) -> str:
+        ratio = self.decoded_bytes / self.wire_bytes if self.wire_bytes else 1.0
+        text = (f"{self.requests} requests, {self.wire_bytes} bytes on wire, "
+                f"{self.decoded_bytes} bytes decoded ({ratio:.1f}x)")
+        if self.conditional:
+            text += f", {self.conditional['revalidated']} revalidated, {self.conditional['refetched']} refetched"
+            recent = list(self.recent_conditional)
+            if len(recent) < sum(self.conditional.values()):
+                text += f" (last {len(recent)} listed)"
+            for outcome, path in recent:
+                text += f"\n  {outcome:<12} {path}"
+        return text
+
+
+TRANSFER_STATS = TransferStats()
+
+
+class RequestTrace:
+    """Timing of one HTTP exchange, from the first DNS lookup to the last body byte.
+
+    dns and connect stay None when a pooled connection was reused; ttfb runs
+    from sending the request to receiving the response headers.
+    """
+
+    __slots__ = ("method", "path", "status", "bytes", "dns", "connect", "ttfb", "total", "_start")
+
+    def __init__(self, method: str, path: str):
+        self.method = method
+        self.path = path
+        self.status = 0
+        self.bytes = 0
+        self.dns = None
+        self.connect = None
+        self.ttfb = 0.0
+        self.total = 0.0
+        self._start = time.perf_counter()
+
+    def finish(self, status: Optional[int] = None) -> None:
+        """Stop the clock and hand the trace to the current command's tracer."""
+        if status is not None:
+            self.status = status
+        self.total = time.perf_counter() - self._start
+        tracer = TRACER.get()
+        if tracer is not None:
+            tracer.record(self)
+
+
+def _ms(seconds: Optional[float]) -> str:
+    return "-" if seconds is None else f"{seconds * 1000:.1f}"
+
+
+class RequestTracer:
+    """Requests and JSON parsing time of one command, optionally echoed to stderr as they finish."""
+
+    def __init__(self, verbose: bool = False):
+        self.verbose = verbose
+        self.traces = []
+        self.parse_calls = 0
+        self.parse_seconds = 0.0
+        self.retries = 0
+        self.retry_seconds = 0.0
+        self._lock = threading.Lock()
+        # Requests also finish on worker threads, which batch and the daemon
+        # do not redirect, so hold on to this command's own stderr.
+        stream = sys.stderr
+        self._stream = stream._target() if isinstance(stream, _ThreadLocalStream) else stream
+
+    def record(self, trace: RequestTrace) -> None:
+        with self._lock:
+            self.traces.append(trace)
+            if self.verbose:
+                self._stream.write(f"[trace] {trace.method} {trace.status or 'ERR'} {trace.bytes}B "
+                                   f"dns={_ms(trace.dns)} connect={_ms(trace.connect)} "
+                                   f"ttfb={_ms(trace.ttfb)} total={_ms(trace.total)}ms {trace.path}\n")
+
+    def add_parse(self, seconds: float) -> None:
+        with self._lock:
+            self.parse_calls += 1
+            self.parse_seconds += seconds
+
+    def record_retry(self, path: str, reason: str, delay: float) -> None:
+        with self._lock:
+            self.retries += 1
+            self.retry_seconds += delay
+            if self.verbose:
+                self._stream.write(f"[trace] retry in {delay:.2f}s after {reason}: {path}\n")
+
+    def summary(self) -> str:
+        traces = list(self.traces)
+        connections = sum(1 for t in traces if t.connect is not None)
+        text = (f"Trace: {len(traces)} requests ({connections} new connections), "
+                f"{sum(t.bytes for t in traces)} bytes on wire, "
+                f"{sum(t.total for t in traces):.3f}s in requests, "
+                f"{self.parse_seconds:.3f}s in json.loads ({self.parse_calls} calls)")
+        if self.retries:
+            text += f", {self.retries} retries ({self.retry_seconds:.3f}s waiting)"
+        if traces:
+            slowest = max(traces, key=lambda t: t.total)
+            text += (f"\n  Slowest request:  {slowest.method} {slowest.path} "
+                     f"({slowest.status or 'ERR'}, {_ms(slowest.total)}ms)")
+            endpoints = collections.defaultdict(list)
+            for t in traces:
+                endpoints[(t.method, _endpoint(t.path))].append(t.total)
+            (method, endpoint), times = max(endpoints.items(), key=lambda item: sum(item[1]))
+            text += (f"\n  Slowest endpoint: {method} {endpoint} ({len(times)} calls, "
+                     f"{_ms(sum(times))}ms total, {_ms(max(times))}ms max)")
+        return text
+
+
+TRACER = contextvars.ContextVar("TRACER", default=None)
+_ENDPOINT_JOB_RE = re.compile(r"job/[^/]+")
+_ENDPOINT_BUILD_RE = re.compile(r"/(\d+|last\w*Build)(?=/|$)")
+
+
+def _endpoint(path: str) -> str:
+    """Group request paths by endpoint, e.g. "job/a/job/b/42/consoleText" -> "job/*/job/*/N/consoleText"."""
+    path = path.split("?", 1)[0].lstrip("/")
+    return _ENDPOINT_BUILD_RE.sub("/N", _ENDPOINT_JOB_RE.sub("job/*", path))
+
+
+def _loads(text: str):
+    """json.loads, with the time spent counted in the current command's trace."""
+    tracer = TRACER.get()
+    if tracer is None:
+        return json.loads(text)
+    start = time.perf_counter()
+    try:
+        return json.loads(text)
+    finally:
+        tracer.add_parse(time.perf_counter() - start)
+
+
+def with_context(fn):
+    """Wrap fn to run in worker threads with the caller's context variables (tracer, output format)."""
+    context = contextvars.copy_context()
+    return lambda *args: context.copy().run(fn, *args)
+
+
+class RetryBudget:
+    """Retries left for one command, shared by all of its requests.
+
+    Each request may retry up to RETRIES times on its own, but a command
+    hitting a struggling controller from many workers stops retrying once
+    the budget is spent instead of multiplying the load.
+    """
+
+    def __init__(self, retries: int = RETRY_BUDGET):
+        self.remaining = max(0, retries)
+        self._lock = threading.Lock()
+
+    def take(self) -> bool:
+        with self._lock:
+            if self.remaining <= 0:
+                return False
+            self.remaining -= 1
+            return True
+
+
+RETRY_BUDGET_LEFT = contextvars.ContextVar("RETRY_BUDGET_LEFT", default=None)
+
+
+def _retry_after_seconds(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header given in seconds or as an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+def retry_delay(attempt: int, path: str, reason: str, retry_after: Optional[str] = None) -> Optional[float]:
+    """Seconds to wait before retrying a failed GET, or None when it should fail now.
+
+    The delay is drawn uniformly from zero to RETRY_BASE_DELAY * 2**attempt,
+    capped at RETRY_MAX_DELAY (full jitter), unless the server sent
+    Retry-After; a Retry-After beyond RETRY_MAX_DELAY is not waited for.
+    """
+    if attempt >= RETRIES:
+        return None
+    delay = _retry_after_seconds(retry_after)
+    if delay is None:
+        delay = random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+    elif delay > RETRY_MAX_DELAY:
+        return None
+    budget = RETRY_BUDGET_LEFT.get()
+    if budget is not None and not budget.take():
+        return None
+    tracer = TRACER.get()
+    if tracer is not None:
+        tracer.record_retry(path, reason, delay)
+    return delay
+
+
+class _DeflateDecoder:
+    """Decode HTTP deflate bodies, accepting both zlib-wrapped and raw streams."""
+
+    def __init__(self):
+        self._obj = zlib.decompressobj()
+        self._first = True
+
+    @property
+    def unconsumed_tail(self) -> bytes:
+        return self._obj.unconsumed_tail
+
+    def decompress(self, data: bytes, max_length: int = 0) -> bytes:
+        if self._first and data:
+            self._first = False
+            try:
+                return self._obj.decompress(data, max_length)
+            except zlib.error:
+                self._obj = zlib.decompressobj(-zlib.MAX_WBITS)
+        return self._obj.decompress(data, max_length)
+
+    def flush(self) -> bytes:
+        return self._obj.flush()
+
+
+def _decompressor(content_encoding: Optional[str]):
+    """Return an incremental decoder for a Content-Encoding, or None for identity."""
+    encoding = (content_encoding or "identity").strip().lower()
+    if encoding in ("gzip", "x-gzip"):
+        return zlib.decompressobj(16 + zlib.MAX_WBITS)
+    if encoding == "deflate":
+        return _DeflateDecoder()
+    return None
+
+
+class PooledResponse:
+    """HTTP response that hands its connection back to the pool when closed."""
+
+    def __init__(self, pool: ConnectionPool, key: tuple, conn, response, trace: RequestTrace):
+        self._pool = pool
+        self._key = key
+        self._conn = conn
+        self._response = response
+        self._trace = trace
+        self.status = response.status
+        self.headers = response.headers
+
+    def getheader(self, name: str, default: Optional[str] = None) -> Optional[str]:
+        return self._response.getheader(name, default)
+
+    def read(self, amt: Optional[int] = None) -> bytes:
+        """Read the raw body, without content decoding."""
+        data = self._response.read(amt)
+        self._trace.bytes += len(data)
+        return data
+
+    def iter_content(self, chunk_size: int = CHUNK_SIZE):
+        """Yield the decoded body in chunks of at most chunk_size bytes.
+
+        Compressed bodies are inflated as they arrive, so neither the
+        compressed nor the decoded body is ever held in memory as a whole.
+        """
+        decoder = _decompressor(self.getheader("Content-Encoding"))
+        while True:
+            raw = self._response.read1(chunk_size)
+            if not raw:
+                break
+            TRANSFER_STATS.add(wire_bytes=len(raw))
+            self._trace.bytes += len(raw)
+            if decoder is None:
+                TRANSFER_STATS.add(decoded_bytes=len(raw))
+                yield raw
+                continue
+            while True:
+                data = decoder.decompress(raw, chunk_size)
+                if data:
+                    TRANSFER_STATS.add(decoded_bytes=len(data))
+                    yield data
+                raw = decoder.unconsumed_tail
+                # A full output chunk may leave inflated bytes pending inside
+                # the decoder, so keep draining until it comes back short.
+                if not raw and len(data) < chunk_size:
+                    break
+        if decoder is not None:
+            data = decoder.flush()
+            if data:
+                TRANSFER_STATS.add(decoded_bytes=len(data))
+                yield data
+
+    def copy_to(self, out, chunk_size: int = CHUNK_SIZE) -> int:
+        """Copy the decoded body to a binary file object, returning bytes written.
+
+        Uncompressed bodies are read straight into one reusable buffer, so
+        memory stays flat regardless of the body size.
+        """
+        written = 0
+        if _decompressor(self.getheader("Content-Encoding")) is not None:
+            for chunk in self.iter_content(chunk_size):
+                out.write(chunk)
+                written += len(chunk)
+            return written
+
+        view = memoryview(bytearray(chunk_size))
+        while True:
+            n = self._response.readinto(view)
+            if not n:
+                break
+            TRANSFER_STATS.add(wire_bytes=n, decoded_bytes=n)
+            self._trace.bytes += n
+            out.write(view[:n])
+            written += n
+        return written
+
+    def close(self) -> None:
+        if self._conn is None:
+            return
+        # Only a fully consumed response leaves the connection ready for reuse.
+        # read1() does not mark a Content-Length body finished once it is used
+        # up, so a zero remaining length counts too (as do HEAD, 204 and 304).
+        reusable = self._response.isclosed() or self._response.length == 0
+        self._response.close()
+        self._pool.release(self._key, self._conn, reusable)
+        self._conn = None
+        self._trace.finish()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_request(path: str, method: str = "GET", data: Optional[bytes] = None,
+                 headers: Optional[dict] = None) -> PooledResponse:
+    """Send a request over a pooled connection and return the unread response.
+
+    GET and HEAD requests are retried with backoff (see retry_delay) on
+    transport failures and on 429, 502, 503 and 504 responses.
+    Raises OSError or http.client.HTTPException on transport failures.
+    """
+    url = f"{JENKINS_URL.rstrip('/')}/{path.lstrip('/')}"
+    request_headers = get_auth_header()
+    request_headers["Content-Type"] = "application/x-www-form-urlencoded"
+    request_headers["Accept-Encoding"] = "gzip, deflate"
+    if headers:
+        request_headers.update(headers)
+
+    idempotent = method in ("GET", "HEAD")
+    attempt = redirects = 0
+    while True:
+        parts = urllib.parse.urlsplit(url)
+        scheme = parts.scheme or "http"
+        port = parts.port or (443 if scheme == "https" else 80)
+        key = (scheme, parts.hostname, port)
+        target = parts.path or "/"
+        if parts.query:
+            target += f"?{parts.query}"
+
+        try:
+            response = _send(key, method, target, data, request_headers)
+        except (OSError, http.client.HTTPException) as e:
+            delay = retry_delay(attempt, target, f"{type(e).__name__}: {e}") if idempotent else None
+            if delay is None:
+                raise
+            time.sleep(delay)
+            attempt += 1
+            continue
+        if idempotent and response.status in RETRY_STATUSES:
+            delay = retry_delay(attempt, target, str(response.status), response.getheader("Retry-After"))
+            if delay is not None:
+                response.read()
+                response.close()
+                time.sleep(delay)
+                attempt += 1
+                continue
+        location = response.getheader("Location")
+        if (idempotent and response.status in (301, 302, 303, 307, 308) and location
+                and redirects < MAX_REDIRECTS):
+            response.read()
+            response.close()
+            url = urllib.parse.urljoin(url, location)
+            redirects += 1
+            continue
+        return response
+
+
+def _send(key: tuple, method: str, target: str, data: Optional[bytes],
+          headers: dict) -> PooledResponse:
+    """Send one request, reconnecting once if a reused socket turns out stale."""
+    trace = RequestTrace(method, target)
+    while True:
+        conn, reused = _POOL.acquire(key)
+        try:
+            if conn.sock is None:
+                start = time.perf_counter()
+                conn.connect()
+                trace.dns = conn.dns_seconds
+                trace.connect = time.perf_counter() - start - (conn.dns_seconds or 0.0)
+            start = time.perf_counter()
+            conn.request(method, target, body=data, headers=headers)
+            response = conn.getresponse()
+            trace.ttfb = time.perf_counter() - start
+            trace.status = response.status
+            TRANSFER_STATS.add(requests=1)
+        except (ConnectionResetError, BrokenPipeError, http.client.BadStatusLine):
+            _POOL.release(key, conn, reusable=False)
+            # The server closed an idle keep-alive socket under us; the request
+            # never reached it, so an idempotent request can go out again.
+            if reused and method in ("GET", "HEAD"):
+                continue
+            trace.finish()
+            raise
+        except BaseException:
+            _POOL.release(key, conn, reusable=False)
+            trace.finish()
+            raise
+        return PooledResponse(_POOL, key, conn, response, trace)
+
+
+class CacheBudget:
+    """Byte budget of on-disk cache directories, evicting least recently used files.
+
+    The total is scanned once per process and then kept up to date as
+    entries are written, so only a write that takes it over max_bytes walks
+    the directories. Eviction then frees down to LOW_WATER of the budget,
+    which keeps the next walk far off. File modification times serve as LRU
+    timestamps.
+    """
+
+    LOW_WATER = 0.9
+
+    def __init__(self, directories: list, max_bytes: int):
+        self.directories = directories
+        self.max_bytes = max_bytes
+        self._total = None
+        self._lock = threading.Lock()
+
+    def added(self, size: int) -> None:
+        """Account for a newly written entry of size bytes, evicting if over budget."""
+        with self._lock:
+            if self._total is None:
+                self._total = sum(entry[1] for entry in self._scan())  # includes the new entry
+            else:
+                self._total += size
+            if self._total > self.max_bytes:
+                self._evict()
+
+    def _scan(self) -> list:
+        """(mtime, size, path) of every entry, in the directories or one level of buckets below."""
+        entries = []
+        for directory in self.directories:
+            try:
+                pending = list(os.scandir(directory))
+                while pending:
+                    entry = pending.pop()
+                    if entry.is_dir(follow_symlinks=False):
+                        if os.path.dirname(entry.path) == directory:
+                            pending.extend(os.scandir(entry.path))
+                    elif not entry.name.endswith(".tmp"):
+                        st = entry.stat()
+                        entries.append((st.st_mtime, st.st_size, entry.path))
+            except OSError:
+                continue
+        return entries
+
+    def _evict(self) -> None:
+        entries = sorted(self._scan())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes * self.LOW_WATER:
+                break
+            try:
+                os.unlink(path)
+                total -= size
+            except OSError:
+                pass
+        self._total = total
+
+
+# Whether the current command may use the on-disk caches; --no-cache turns
+# it off for that command only, not for the daemon or later batch lines.
+CACHING = contextvars.ContextVar("CACHING", default=True)
+
+
+class ValidatorStore:
+    """ETag/Last-Modified validators and bodies kept on disk for conditional GETs.
+
+    Entries persist across invocations, so agents polling the same listing
+    get a 304 and the stored body instead of the full payload. Their size
+    counts against the same CacheBudget as the build cache.
+    """
+
+    def __init__(self, directory: str, budget: CacheBudget):
+        self.directory = os.path.join(directory, "validators")
+        self.budget = budget
+        self.enabled = not os.environ.get("JENKINS_NO_CACHE")
+
+    def _path(self, path: str) -> str:
+        key = "\0".join([JENKINS_URL.rstrip("/"), JENKINS_USER, path])
+        return os.path.join(self.directory, hashlib.sha256(key.encode("utf-8")).hexdigest())
+
+    def load(self, path: str) -> Optional[dict]:
+        if not (self.enabled and CACHING.get()):
+            return None
+        try:
+            with open(self._path(path), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def headers(self, entry: Optional[dict]) -> dict:
+        """Conditional request headers for a stored entry."""
+        headers = {}
+        if entry and entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry and entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def resolve(self, path: str, entry: Optional[dict], status: int, etag: Optional[str],
+                last_modified: Optional[str], content: str) -> tuple:
+        """Turn a conditional response into (status, content), updating the store."""
+        if status == 304 and entry is not None:
+            TRANSFER_STATS.record_conditional("revalidated", path)
+            try:
+                os.utime(self._path(path))  # recently used, for eviction
+            except OSError:
+                pass
+            return 200, entry["body"]
+        if status == 200:
+            TRANSFER_STATS.record_conditional("refetched", path)
+            if self.enabled and CACHING.get() and (etag or last_modified):
+                self._save(path, {"etag": etag, "last_modified": last_modified, "body": content})
+        return status, content
+
+    def _save(self, path: str, entry: dict) -> None:
+        target = self._path(path)
+        tmp = f"{target}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(entry, f)
+            try:
+                replaced = os.path.getsize(target)
+            except OSError:
+                replaced = 0
+            os.replace(tmp, target)
+        except OSError:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            return
+        self.budget.added(os.path.getsize(target) - replaced)
+
+
+CACHE_BUDGET = CacheBudget([os.path.join(CACHE_DIR, "builds"), os.path.join(CACHE_DIR, "validators")],
+                           CACHE_MAX_BYTES)
+VALIDATORS = ValidatorStore(CACHE_DIR, CACHE_BUDGET)
+
+
+class ResponseCache:
+    """In-memory LRU of recent successful GET responses, each kept for ttl seconds.
+
+    Only the daemon installs one (as RESPONSE_CACHE); any other method
+    clears it, since a POST may change what later GETs return.
+    """
+
+    def __init__(self, ttl: float = DAEMON_CACHE_TTL, max_bytes: int = DAEMON_CACHE_MAX_BYTES):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()  # path -> (expires, response)
+        self._lock = threading.Lock()
+
+    def get(self, path: str) -> Optional[tuple]:
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is None or entry[0] < time.monotonic():
+                self.misses += 1
+                return None
+            self._entries.move_to_end(path)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, path: str, response: tuple) -> None:
+        size = len(response[1])
+        if size > self.max_bytes // 8:
+            return
+        with self._lock:
+            old = self._entries.pop(path, None)
+            if old is not None:
+                self.size -= len(old[1][1])
+            self._entries[path] = (time.monotonic() + self.ttl, response)
+            self.size += size
+            while self.size > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.size -= len(evicted[1])
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+
+RESPONSE_CACHE: Optional[ResponseCache] = None
+
+
+def make_request(path: str, method: str = "GET", data: Optional[bytes] = None,
+                 conditional: bool = False) -> tuple:
+    """Make HTTP request to Jenkins API.
+
+    With conditional=True a GET carries the validators stored from the last
+    response for path, and a 304 is answered from the stored body.
+    """
+    cache = RESPONSE_CACHE
+    if cache is not None:
+        if method != "GET":
+            cache.clear()
+        elif (cached := cache.get(path)) is not None:
+            return cached
+    response = _request(path, method, data, conditional)
+    if cache is not None and method == "GET" and response[0] == 200:
+        cache.put(path, response)
+    return response
+
+
+def _request(path: str, method: str, data: Optional[bytes], conditional: bool) -> tuple:
+    entry = VALIDATORS.load(path) if conditional and method == "GET" else None
+    try:
+        with open_request(path, method=method, data=data,
+                          headers=VALIDATORS.headers(entry)) as response:
+            body = b"".join(response.iter_content())
+            if 200 <= response.status < 300:
+                content = body.decode("utf-8")
+            else:
+                content = body.decode("utf-8", errors="replace")
+            if conditional:
+                return VALIDATORS.resolve(path, entry, response.status, response.getheader("ETag"),
+                                          response.getheader("Last-Modified"), content)
+            return response.status, content
+    except (OSError, http.client.HTTPException) as e:
+        return 0, f"Connection error: {e}"
+    except Exception as e:
+        return 0, f"Error: {str(e)}"
+
+
+class AsyncJenkinsClient:
+    """asyncio HTTP/1.1 client with make_request semantics and bounded concurrency.
+
+    At most `concurrency` requests are in flight at once, and keep-alive
+    connections are reused between them.
+    """
+
+    def __init__(self, concurrency: int = CONCURRENCY):
+        self._semaphore = asyncio.Semaphore(max(1, concurrency))
+        self._idle = {}  # (scheme, host, port) -> [(reader, writer), ...]
+
+    async def request(self, path: str, method: str = "GET", data: Optional[bytes] = None,
+                      conditional: bool = False) -> tuple:
+        """Make HTTP request to Jenkins API, returning (status, content).
+
+        conditional has the same meaning as for make_request.
+        """
+        entry = VALIDATORS.load(path) if conditional and method == "GET" else None
+        attempt = 0
+        while True:
+            error = None
+            async with self._semaphore:
+                try:
+                    status, headers, body = await self._follow(path, method, data, VALIDATORS.headers(entry))
+                except asyncio.TimeoutError:
+                    error = "Connection error: timed out"
+                except (OSError, ValueError, asyncio.IncompleteReadError) as e:
+                    error = f"Connection error: {e}"
+                except Exception as e:
+                    return 0, f"Error: {str(e)}"
+            # Same retry rules as open_request; the backoff sleeps outside the semaphore.
+            if method not in ("GET", "HEAD") or (error is None and status not in RETRY_STATUSES):
+                break
+            delay = retry_delay(attempt, path, error or str(status), None if error else headers.get("retry-after"))
+            if delay is None:
+                break
+            await asyncio.sleep(delay)
+            attempt += 1
+        if error is not None:
+            return 0, error
+
+        if 200 <= status < 300:
+            try:
+                content = body.decode("utf-8")
+            except UnicodeDecodeError as e:
+                return 0, f"Error: {str(e)}"
+        else:
+            content = body.decode("utf-8", errors="replace")
+        if conditional:
+            return VALIDATORS.resolve(path, entry, status, headers.get("etag"),
+                                      headers.get("last-modified"), content)
+        return status, content
+
+    async def _follow(self, path: str, method: str, data: Optional[bytes], extra_headers: dict) -> tuple:
+        """Send one request, following redirects, and return (status, headers, body)."""
+        url = f"{JENKINS_URL.rstrip('/')}/{path.lstrip('/')}"
+        for _ in range(MAX_REDIRECTS + 1):
+            status, headers, body = await asyncio.wait_for(
+                self._exchange(url, method, data, extra_headers), REQUEST_TIMEOUT)
+            location = headers.get("location")
+            if method in ("GET", "HEAD") and status in (301, 302, 303, 307, 308) and location:
+                url = urllib.parse.urljoin(url, location)
+                continue
+            break
+        return status, headers, body
+
+    async def close(self) -> None:
+        """Close every idle connection."""
+        for idle in self._idle.values():
+            for _, writer in idle:
+                writer.close()
+        self._idle.clear()
+
+    async def _acquire(self, key: tuple, trace: RequestTrace) -> tuple:
+        idle = self._idle.get(key, [])
+        while idle:
+            reader, writer = idle.pop()
+            if not reader.at_eof() and not writer.is_closing():
+                return reader, writer, True
+            writer.close()
+        scheme, host, port = key
+        context = _ssl_context() if scheme == "https" else None
+        start = time.perf_counter()
+        addresses = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        trace.dns = time.perf_counter() - start
+        start = time.perf_counter()
+        error = OSError(f"getaddrinfo returned no addresses for {host}")
+        for *_, sockaddr in addresses:
+            try:
+                reader, writer = await asyncio.open_connection(
+                    sockaddr[0], sockaddr[1], ssl=context, server_hostname=host if context else None)
+                break
+            except OSError as e:
+                error = e
+        else:
+            raise error
+        trace.connect = time.perf_counter() - start
+        return reader, writer, False
+
+    async def _exchange(self, url: str, method: str, data: Optional[bytes],
+                        extra_headers: dict) -> tuple:
+        parts = urllib.parse.urlsplit(url)
+        scheme = parts.scheme or "http"
+        port = parts.port or (443 if scheme == "https" else 80)
+        key = (scheme, parts.hostname, port)
+        target = parts.path or "/"
+        if parts.query:
+            target += f"?{parts.query}"
+
+        headers = get_auth_header()
+        headers["Host"] = parts.netloc
+        headers["Content-Type"] = "application/x-www-form-urlencoded"
+        headers["Accept-Encoding"] = "gzip, deflate"
+        headers["Content-Length"] = str(len(data or b""))
+        headers.update(extra_headers)
+        head = f"{method} {target} HTTP/1.1\r\n"
+        head += "".join(f"{name}: {value}\r\n" for name, value in headers.items()) + "\r\n"
+
+        trace = RequestTrace(method, target)
+        try:
+            while True:
+                reader, writer, reused = await self._acquire(key, trace)
+                try:
+                    start = time.perf_counter()
+                    writer.write(head.encode("latin-1") + (data or b""))
+                    await writer.drain()
+                    status_line = await reader.readline()
+                    if not status_line:
+                        raise ConnectionResetError("Remote end closed connection without response")
+                    trace.ttfb = time.perf_counter() - start
+                except (ConnectionResetError, BrokenPipeError):
+                    writer.close()
+                    # Same rule as the synchronous pool: a stale keep-alive socket
+                    # only gets a second attempt for idempotent requests.
+                    if reused and method in ("GET", "HEAD"):
+                        continue
+                    raise
+                except BaseException:
+                    writer.close()
+                    raise
+
+                try:
+                    status, response_headers, body, keep_alive = await self._read_response(
+                        status_line, reader, method, trace)
+                except BaseException:
+                    writer.close()
+                    raise
+                TRANSFER_STATS.add(requests=1)
+                if keep_alive:
+                    self._idle.setdefault(key, []).append((reader, writer))
+                else:
+                    writer.close()
+                return status, response_headers, body
+        finally:
+            trace.finish()
+
+    async def _read_response(self, status_line: bytes, reader, method: str, trace: RequestTrace) -> tuple:
+        version, status, *_ = status_line.decode("latin-1").split(" ", 2)
+        status = trace.status = int(status)
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        decoder = _decompressor(headers.get("content-encoding"))
+        chunks = []
+
+        def feed(raw: bytes) -> None:
+            TRANSFER_STATS.add(wire_bytes=len(raw))
+            trace.bytes += len(raw)
+            data = decoder.decompress(raw) if decoder is not None else raw
+            TRANSFER_STATS.add(decoded_bytes=len(data))
+            chunks.append(data)
+
+        keep_alive = (version == "HTTP/1.1"
+                      and headers.get("connection", "").lower() != "close")
+        if method == "HEAD" or status in (204, 304) or status < 200:
+            pass
+        elif "chunked" in headers.get("transfer-encoding", "").lower():
+            while True:
+                size = int((await reader.readline()).split(b";")[0].strip(), 16)
+                if size == 0:
+                    while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                        pass  # discard trailers
+                    break
+                feed(await reader.readexactly(size))
+                await reader.readexactly(2)
+        elif "content-length" in headers:
+            remaining = int(headers["content-length"])
+            while remaining:
+                raw = await reader.read(min(CHUNK_SIZE, remaining))
+                if not raw:
+                    raise asyncio.IncompleteReadError(b"", remaining)
+                feed(raw)
+                remaining -= len(raw)
+        else:
+            keep_alive = False
+            while True:
+                raw = await reader.read(CHUNK_SIZE)
+                if not raw:
+                    break
+                feed(raw)
+
+        if decoder is not None:
+            tail = decoder.flush()
+            TRANSFER_STATS.add(decoded_bytes=len(tail))
+            chunks.append(tail)
+        return status, headers, b"".join(chunks), keep_alive
+
+
+def fetch_many(paths: list, concurrency: int = CONCURRENCY, conditional: bool = False) -> list:
+    """GET many paths concurrently on the asyncio engine.
+
+    Returns (status, content) tuples in the same order as paths.
+    """
+    async def run(paths: list) -> list:
+        client = AsyncJenkinsClient(concurrency)
+        try:
+            return await asyncio.gather(*(client.request(path, conditional=conditional)
+                                          for path in paths))
+        finally:
+            await client.close()
+
+    cache = RESPONSE_CACHE
+    if cache is None:
+        return asyncio.run(run(paths)) if paths else []
+    results = [cache.get(path) for path in paths]
+    missing = [path for path, result in zip(paths, results) if result is None]
+    responses = iter(asyncio.run(run(missing)) if missing else [])
+    for i, path in enumerate(paths):
+        if results[i] is None:
+            results[i] = next(responses)
+            if results[i][0] == 200:
+                cache.put(path, results[i])
+    return results
+
+
+class BuildCache:
+    """On-disk LRU cache of responses for finished builds.
+
+    Entries are keyed by controller, user, job, build and endpoint, and are
+    only written once a build has finished, after which Jenkins never
+    changes them. Their size counts against a CacheBudget.
+    """
+
+    COMPLETE = "#complete"
+
+    def __init__(self, directory: str, budget: CacheBudget):
+        self.directory = os.path.join(directory, "builds")
+        self.budget = budget
+        self.max_bytes = budget.max_bytes
+        self.enabled = not os.environ.get("JENKINS_NO_CACHE")
+
+    def cacheable(self, build_number: str) -> bool:
+        """Only numbered builds are immutable; lastBuild and friends move."""
+        return self.enabled and CACHING.get() and str(build_number).isdigit()
+
+    def _path(self, job_name: str, build_number: str, endpoint: str) -> str:
+        key = "\0".join([JENKINS_URL.rstrip("/"), JENKINS_USER, job_name,
+                         str(build_number), endpoint])
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, digest[:2], digest)
+
+    def open(self, job_name: str, build_number: str, endpoint: str):
+        """Return a binary file for a cached entry, or None on a miss."""
+        if not self.cacheable(build_number):
+            return None
+        path = self._path(job_name, build_number, endpoint)
+        try:
+            f = open(path, "rb")
+        except OSError:
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return f
+
+    def get(self, job_name: str, build_number: str, endpoint: str) -> Optional[bytes]:
+        f = self.open(job_name, build_number, endpoint)
+        if f is None:
+            return None
+        with f:
+            return f.read()
+
+    def put(self, job_name: str, build_number: str, endpoint: str, data: bytes) -> None:
+        writer = self.writer(job_name, build_number, endpoint)
+        if writer is not None:
+            writer.write(data)
+            writer.commit()
+
+    def writer(self, job_name: str, build_number: str, endpoint: str):
+        """Return a CacheWriter that publishes the entry on commit, or None."""
+        if not self.cacheable(build_number):
+            return None
+        path = self._path(job_name, build_number, endpoint)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            return CacheWriter(self, path)
+        except OSError:
+            return None
+
+    def is_complete(self, job_name: str, build_number: str) -> bool:
+        if not self.cacheable(build_number):
+            return False
+        return os.path.exists(self._path(job_name, build_number, self.COMPLETE))
+
+    def mark_complete(self, job_name: str, build_number: str) -> None:
+        self.put(job_name, build_number, self.COMPLETE, b"")
+
+
+class CacheWriter:
+    """Write a cache entry to a temporary file and publish it atomically."""
+
+    def __init__(self, cache: BuildCache, path: str):
+        self._cache = cache
+        self._path = path
+        self._tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        self._file = open(self._tmp, "wb")
+        self._size = 0
+
+    def write(self, data) -> None:
+        if self._file is None:
+            return
+        self._size += len(data)
+        if self._size > self._cache.max_bytes:
+            self.discard()  # larger than the whole budget; not worth keeping
+            return
+        try:
+            self._file.write(data)
+        except OSError:
+            self.discard()
+
+    def commit(self) -> None:
+        if self._file is None:
+            return
+        try:
+            self._file.close()
+            os.replace(self._tmp, self._path)
+        except OSError:
+            self.discard()
+            return
+        self._file = None
+        self._cache.budget.added(self._size)
+
+    def discard(self) -> None:
+        if self._file is None:
+            return
+        self._file.close()
+        self._file = None
+        try:
+            os.unlink(self._tmp)
+        except OSError:
+            pass
+
+
+class _Tee:
+    """Binary writer that copies everything to a CacheWriter as well."""
+
+    def __init__(self, out, writer: CacheWriter):
+        self._out = out
+        self._writer = writer
+
+    def write(self, data) -> None:
+        self._out.write(data)
+        self._writer.write(data)
+
+
+BUILD_CACHE = BuildCache(CACHE_DIR, CACHE_BUDGET)
+
+
+def cached_build_request(job_name: str, build_number: str, endpoint: str, finished) -> tuple:
+    """make_request for a build endpoint, served from BUILD_CACHE once the build is done.
+
+    finished(content) returns True or False when the response itself says
+    whether the build is over, or None when it cannot tell.
+    """
+    cached = BUILD_CACHE.get(job_name, build_number, endpoint)
+    if cached is not None:
+        return 200, cached.decode("utf-8")
+
+    job_url = job_path(job_name)
+    status, content = make_request(f"{job_url}/{build_number}/{endpoint}")
+    if status == 200 and BUILD_CACHE.cacheable(build_number):
+        done = finished(content)
+        if done:
+            BUILD_CACHE.mark_complete(job_name, build_number)
+        if done or (done is None and BUILD_CACHE.is_complete(job_name, build_number)):
+            BUILD_CACHE.put(job_name, build_number, endpoint, content.encode("utf-8"))
+    return status, content
+
+
+def cached_build_requests(job_name: str, build_number: str, endpoints: list,
+                          finished: bool) -> list:
+    """Fetch several endpoints of one build concurrently, through BUILD_CACHE once it has finished."""
+    results = [None] * len(endpoints)
+    missing = []
+    for i, endpoint in enumerate(endpoints):
+        cached = BUILD_CACHE.get(job_name, build_number, endpoint) if finished else None
+        if cached is None:
+            missing.append(i)
+        else:
+            results[i] = (200, cached.decode("utf-8"))
+
+    job_url = job_path(job_name)
+    responses = fetch_many([f"{job_url}/{build_number}/{endpoints[i]}" for i in missing])
+    for i, (status, content) in zip(missing, responses):
+        results[i] = (status, content)
+        if finished and status == 200:
+            BUILD_CACHE.put(job_name, build_number, endpoints[i], content.encode("utf-8"))
+    return results
+
+
+def _build_json_finished(content: str) -> Optional[bool]:
+    try:
+        building = _loads(content).get("building")
+    except (json.JSONDecodeError, AttributeError):
+        return None
+    return None if building is None else not building
+
+
+def build_finished(job_name: str, build_number: str) -> bool:
+    """Return True if the build is known to have finished, asking Jenkins if needed."""
+    if not BUILD_CACHE.cacheable(build_number):
+        return False
+    if BUILD_CACHE.is_complete(job_name, build_number):
+        return True
+    status, content = cached_build_request(job_name, build_number, "api/json?tree=building",
+                                           _build_json_finished)
+    return status == 200 and _build_json_finished(content) is True
+
+
+# Fields each command needs, as dotted paths compiled into a tree= query.
+LIST_FIELDS = ["name", "color", "url", "lastBuild.number", "lastBuild.result",
+               "lastBuild.timestamp"]
+JOB_INFO_FIELDS = ["name", "description", "color", "buildable", "lastBuild.number",
+                   "lastBuild.result", "lastBuild.timestamp", "lastBuild.duration",
+                   "lastSuccessfulBuild.number", "lastFailedBuild.number",
+                   "nextBuildNumber", "healthReport.description", "healthReport.score"]
+BUILD_INFO_FIELDS = ["fullDisplayName", "result", "building", "duration", "url",
+                     "changeSets.items.msg", "changeSets.items.author.fullName",
+                     "actions._class", "actions.parameters.name", "actions.parameters.value"]
+QUEUE_FIELDS = ["id", "task.name", "why"]
+HISTORY_FIELDS = ["number", "result", "timestamp", "duration", "builtOn"]
+SYNC_FIELDS = ["number", "result", "building", "timestamp", "duration", "builtOn",
+               "actions.parameters.name", "actions.parameters.value",
+               "actions.causes.shortDescription"]
+CHECK_FIELDS = ["mode", "nodeDescription", "useSecurity"]
+EXPORTER_JOB_FIELDS = ["name", "color", "lastCompletedBuild.number", "lastCompletedBuild.result",
+                       "lastCompletedBuild.duration", "lastCompletedBuild.timestamp"]
+EXPORTER_QUEUE_FIELDS = ["inQueueSince", "stuck", "blocked"]
+EXPORTER_COMPUTER_FIELDS = ["busyExecutors", "totalExecutors", "computer.displayName",
+                            "computer.offline", "computer.numExecutors", "computer.executors.idle"]
+
+
+def select_fields(defaults: list, spec: Optional[str]) -> tuple:
+    """Apply a --fields spec to a command's defaults, returning (fields, narrowed).
+
+    Entries prefixed with '+' are added to the defaults; any plain entry
+    replaces the defaults with exactly the fields listed.
+    """
+    if not spec:
+        return list(defaults), False
+    entries = [e.strip() for e in spec.split(",") if e.strip()]
+    if all(e.startswith("+") for e in entries):
+        extra = [e[1:] for e in entries if e[1:] not in defaults]
+        return list(defaults) + extra, False
+    return [e.lstrip("+") for e in entries], True
+
+
+def compile_tree(fields: list) -> str:
+    """Compile dotted field paths into a minimal Jenkins tree= expression.
+
+    ["name", "lastBuild.number", "lastBuild.result"] becomes
+    "name,lastBuild[number,result]".
+    """
+    root = {}
+    for field in fields:
+        node = root
+        for part in field.split("."):
+            node = node.setdefault(part, {})
+
+    def render(node: dict) -> str:
+        return ",".join(f"{name}[{render(child)}]" if child else name
+                        for name, child in node.items())
+
+    return urllib.parse.quote(render(root), safe="[],{}")
+
+
+def resolve_field(data, field: str):
+    """Look up a dotted field path, flattening any lists along the way."""
+    values = [data]
+    for part in field.split("."):
+        next_values = []
+        for value in values:
+            if isinstance(value, dict):
+                value = value.get(part)
+                if isinstance(value, list):
+                    next_values.extend(value)
+                elif value is not None:
+                    next_values.append(value)
+        values = next_values
+    if not values:
+        return None
+    return values[0] if len(values) == 1 else values
+
+
+def format_field(value) -> str:
+    """Render a resolved field value on one line."""
+    if value is None:
+        return "-"
+    if isinstance(value, list):
+        return ", ".join(format_field(v) for v in value)
+    if isinstance(value, dict):
+        return json.dumps(value, separators=(",", ":"))
+    return str(value)
+
+
+def print_fields(data: dict, fields: list) -> None:
+    """Print selected fields of one object, one per line."""
+    for field in fields:
+        print(f"{field}: {format_field(resolve_field(data, field))}")
+
+
+OUTPUT_FORMAT = contextvars.ContextVar("output_format", default="text")
+_RECORDS = contextvars.ContextVar("records")
+
+
+def structured() -> bool:
+    """True when the current command should emit records instead of text."""
+    return OUTPUT_FORMAT.get() != "text"
+
+
+def emit(record: dict) -> None:
+    """Output one record right away: a JSON line with --ndjson, or the next
+    element of the array that --json prints."""
+    if OUTPUT_FORMAT.get() == "ndjson":
+        sys.stdout.write(json.dumps(record, default=str) + "\n")
+    else:
+        _RECORDS.get().append(record)
+
+
+class _JsonArray:
+    """Write records to stdout as the elements of one JSON array as they arrive,
+    so --json output is never held in memory as a whole."""
+
+    def __init__(self):
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def append(self, record: dict) -> None:
+        text = json.dumps(record, indent=2, default=str).replace("\n", "\n  ")
+        with self._lock:
+            sys.stdout.write(("[\n  " if not self._count else ",\n  ") + text)
+            self._count += 1
+
+    def close(self) -> None:
+        sys.stdout.write("\n]\n" if self._count else "[]\n")
+
+
+def _discard_stdout() -> None:
+    """After a reader closed the pipe, point stdout at devnull so the
+    interpreter's final flush does not raise again."""
+    try:
+        fd = sys.stdout.fileno()
+    except (OSError, ValueError):
+        return  # a daemon client stream, not a real descriptor
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, fd)
+
+
+class _LineRecords:
+    """Binary writer that emits each line written to it as a {"line", "text"} record."""
+
+    def __init__(self):
+        self._partial = b""
+        self._line = 0
+
+    def write(self, data) -> None:
+        lines = (self._partial + bytes(data)).split(b"\n")
+        self._partial = lines.pop()
+        for line in lines:
+            self._line += 1
+            emit({"line": self._line, "text": line.decode("utf-8", errors="replace")})
+
+    def writelines(self, lines) -> None:
+        for line in lines:
+            self.write(line)
+
+    def flush(self) -> None:
+        sys.stdout.flush()
+
+    def close(self) -> None:
+        if self._partial:
+            self._line += 1
+            emit({"line": self._line, "text": self._partial.decode("utf-8", errors="replace")})
+            self._partial = b""
+
+
+def nested_jobs_tree(tree: str, depth: int) -> str:
+    """Nest jobs[...] depth levels deep, with child names one level further.
+
+    The innermost jobs[name] only marks which entries are folders.
+    """
+    expr = f"jobs[{tree},jobs[name]]"
+    for _ in range(depth - 1):
+        expr = f"jobs[{tree},{expr}]"
+    return expr
+
+
+def collect_jobs(jobs: list, prefix: str, levels: int) -> list:
+    """Flatten a nested jobs listing into entries named by full path."""
+    found = []
+    for job in jobs:
+        children = job.pop("jobs", None)
+        job["name"] = f"{prefix}{job.get('name', 'Unknown')}"
+        if children is not None:
+            job["folder"] = True
+            if levels > 1:
+                found.append(job)
+                found.extend(collect_jobs(children, f"{job['name']}/", levels - 1))
+                continue
+        found.append(job)
+    return found
+
+
+class JobListingError(Exception):
+    """A folder listing failed; the message is the error to report."""
+
+
+def fetch_job_tree(root: str, tree: str, depth: int) -> Optional[list]:
+    """Fetch every job below root, depth levels deep, in one nested tree= request.
+
+    Returns None when the response would exceed TREE_MAX_BYTES or the
+    controller fails to produce it, so the caller can walk level by level.
+    Raises JobListingError when the controller refuses the listing.
+    """
+    prefix = f"{job_path(root)}/" if root else ""
+    path = f"{prefix}api/json?tree={nested_jobs_tree(tree, depth)}"
+    try:
+        with open_request(path) as response:
+            length = response.getheader("Content-Length")
+            if response.status >= 500 or (length and not response.getheader("Content-Encoding")
+                                          and int(length) > TREE_MAX_BYTES):
+                return None
+            chunks = []
+            size = 0
+            for chunk in response.iter_content():
+                size += len(chunk)
+                if size > TREE_MAX_BYTES:
+                    return None
+                chunks.append(chunk)
+            content = b"".join(chunks).decode("utf-8", errors="replace")
+            if response.status != 200:
+                raise JobListingError(f"Error ({response.status}): {content}")
+    except (OSError, http.client.HTTPException):
+        return None
+    try:
+        jobs = _loads(content).get("jobs", [])
+    except json.JSONDecodeError:
+        return None
+    return collect_jobs(jobs, f"{root}/" if root else "", depth)
+
+
+def walk_job_tree(root: str, tree: str, depth: int) -> list:
+    """Breadth-first walk below root, fetching each level's folders concurrently.
+
+    Raises JobListingError when a folder cannot be listed.
+    """
+    found = []
+    frontier = [root]
+    for _ in range(depth):
+        if not frontier:
+            break
+        paths = [f"{job_path(folder) + '/' if folder else ''}api/json?tree=jobs[{tree},jobs[name]]"
+                 for folder in frontier]
+        next_frontier = []
+        for folder, (status, content) in zip(frontier, fetch_many(paths)):
+            if status != 200:
+                raise JobListingError(f"Error ({status}) listing {folder or '/'}: {content}")
+            try:
+                jobs = _loads(content).get("jobs", [])
+            except json.JSONDecodeError:
+                raise JobListingError(f"Invalid JSON response: {content[:200]}") from None
+            for job in collect_jobs(jobs, f"{folder}/" if folder else "", 1):
+                found.append(job)
+                if job.get("folder"):
+                    next_frontier.append(job["name"])
+        frontier = next_frontier
+    return found
+
+
+def list_jobs(folders: Optional[list] = None, fields: Optional[str] = None,
+              recursive: bool = False, depth: int = LIST_MAX_DEPTH) -> None:
+    """List all Jenkins jobs, fetching several folders concurrently.
+
+    With recursive, the whole hierarchy is fetched in one nested tree= query,
+    falling back to a parallel breadth-first walk when that is too large,
+    and jobs are printed by full path.
+    """
+    selected, narrowed = select_fields(LIST_FIELDS, fields)
+    tree = compile_tree(selected)
+    extra = [f for f in selected if f not in LIST_FIELDS]
+
+    if recursive:
+        jobs = []
+        for root in folders or [""]:
+            root = root.strip("/")
+            found = fetch_job_tree(root, tree, depth)
+            if found is None:
+                found = walk_job_tree(root, tree, depth)
+            jobs.extend(found)
+        jobs.sort(key=lambda job: job["name"])
+        print_job_table(jobs, selected, narrowed, extra)
+        return
+
+    if not folders:
+        responses = [make_request(f"api/json?tree=jobs[{tree}]", conditional=True)]
+    else:
+        responses = fetch_many([f"{job_path(folder)}/api/json?tree=jobs[{tree}]"
+                                for folder in folders], conditional=True)
+
+    jobs = []
+    for i, (status, content) in enumerate(responses):
+        if status != 200:
+            print(f"Error ({status}): {content}", file=sys.stderr)
+            sys.exit(1)
+        try:
+            folder_jobs = _loads(content).get("jobs", [])
+        except json.JSONDecodeError:
+            print(f"Invalid JSON response: {content[:200]}", file=sys.stderr)
+            sys.exit(1)
+        if folders and len(folders) > 1:
+            for job in folder_jobs:
+                job["name"] = f"{folders[i]}/{job.get('name', 'Unknown')}"
+        jobs.extend(folder_jobs)
+
+    print_job_table(jobs, selected, narrowed, extra)
+
+
+def print_job_table(jobs: list, selected: list, narrowed: bool, extra: list) -> None:
+    """Print jobs as the list table, or as field=value rows when narrowed."""
+    if structured():
+        for job in jobs:
+            emit(job)
+        return
+    if not jobs:
+        print("No jobs found.")
+        return
+
+    if narrowed:
+        for job in jobs:
+            print("  ".join(f"{f}={format_field(resolve_field(job, f))}" for f in selected))
+        return
+
+    print(f"{'Job Name':<40} {'Status':<15} {'Last Build':<10} {'Result':<12}")
+    print("-" * 80)
+
+    for job in jobs:
+        name = job.get("name", "Unknown")
+        color = job.get("color") or ("folder" if job.get("folder") else "notbuilt")
+        last_build = job.get("lastBuild") or {}
+        build_num = last_build.get("number", "-")
+        result = last_build.get("result", "N/A") or "BUILDING"
+        if job.get("folder"):
+            result = "-"
+
+        status_map = {
+            "blue": "Stable",
+            "blue_anime": "Building",
+            "red": "Failed",
+            "red_anime": "Building",
+            "yellow": "Unstable",
+            "yellow_anime": "Building",
+            "grey": "Pending",
+            "disabled": "Disabled",
+            "notbuilt": "Not Built",
+            "folder": "Folder",
+        }
+        status_text = status_map.get(color, color)
+
+        row = f"{name:<40} {status_text:<15} {str(build_num):<10} {result:<12}"
+        if extra:
+            row += " " + "  ".join(f"{f}={format_field(resolve_field(job, f))}" for f in extra)
+        print(row)
+
+
+def expand_job_patterns(patterns: list) -> list:
+    """Expand shell-style glob patterns against the top-level job list.
+
+    Plain names pass through untouched; only patterns trigger a listing.
+    """
+    if not any(set(p) & set("*?[") for p in patterns):
+        return list(patterns)
+
+    status, content = make_request("api/json?tree=jobs[name]")
+    if status != 200:
+        print(f"Error ({status}): {content}", file=sys.stderr)
+        sys.exit(1)
+    try:
+        names = [job.get("name", "") for job in _loads(content).get("jobs", [])]
+    except json.JSONDecodeError:
+        print(f"Invalid JSON response: {content[:200]}", file=sys.stderr)
+        sys.exit(1)
+
+    expanded = []
+    for pattern in patterns:
+        if not set(pattern) & set("*?["):
+            expanded.append(pattern)
+            continue
+        matches = [name for name in names if fnmatch.fnmatchcase(name, pattern)]
+        if not matches:
+            print(f"No jobs match pattern: {pattern}", file=sys.stderr)
+        expanded.extend(matches)
+    return expanded
+
+
+def all_job_names(recursive: bool = False) -> list:
+    """Full names of every buildable job, optionally including nested folders."""
+    tree = compile_tree(["name"])
+    jobs = (fetch_job_tree("", tree, LIST_MAX_DEPTH) or walk_job_tree("", tree, LIST_MAX_DEPTH)
+            if recursive else walk_job_tree("", tree, 1))
+    return [job["name"] for job in jobs if not job.get("folder")]
+
+
+def fetch_targets(targets: list, fetch, render) -> None:
+    """Fetch targets on a bounded thread pool and render them in a stable order.
+
+    fetch(target) returns (status, content) and runs on worker threads that
+    share the connection pool; render(target, data) runs on the calling
+    thread as soon as every earlier target has been printed.
+    """
+    if not targets:
+        sys.exit(1)
+
+    failed = False
+    workers = max(1, min(CONCURRENCY, len(targets)))
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        fetch_in_context = with_context(fetch)
+        futures = [executor.submit(fetch_in_context, target) for target in targets]
+        for i, (target, future) in enumerate(zip(targets, futures)):
+            status, content = future.result()
+            label = f"{target}: " if len(targets) > 1 else ""
+            if status != 200:
+                print(f"{label}Error ({status}): {content}", file=sys.stderr)
+                failed = True
+                continue
+            try:
+                data = _loads(content)
+            except json.JSONDecodeError:
+                print(f"{label}Invalid JSON response: {content[:200]}", file=sys.stderr)
+                failed = True
+                continue
+            if structured():
+                emit({"target": target, **data})
+            else:
+                if len(targets) > 1:
+                    print(f"{chr(10) if i else ''}==> {target} <==")
+                render(target, data)
+            sys.stdout.flush()
+
+    if failed:
+        sys.exit(1)
+
+
+def get_job_info(job_names: list, fields: Optional[str] = None) -> None:
+    """Get detailed information about one or more jobs."""
+    selected, narrowed = select_fields(JOB_INFO_FIELDS, fields)
+    tree = compile_tree(selected)
+
+    def fetch(job_name: str) -> tuple:
+        job_url = job_path(job_name)
+        return make_request(f"{job_url}/api/json?tree={tree}", conditional=True)
+
+    def render(job_name: str, data: dict) -> None:
+        if narrowed:
+            print_fields(data, selected)
+            return
+
+        print(f"Job: {data.get('name', job_name)}")
+        print(f"Description: {data.get('description') or 'No description'}")
+        print(f"Buildable: {data.get('buildable', False)}")
+        print(f"Next Build Number: {data.get('nextBuildNumber', 'N/A')}")
+
+        if data.get("healthReport"):
+            print("\nHealth Reports:")
+            for report in data["healthReport"]:
+                print(f"  - {report.get('description', 'N/A')} (Score: {report.get('score', 'N/A')})")
+
+        last_build = data.get("lastBuild")
+        if last_build:
+            duration_ms = last_build.get("duration", 0)
+            duration_sec = duration_ms // 1000
+            print(f"\nLast Build: #{last_build.get('number')}")
+            print(f"  Result: {last_build.get('result') or 'BUILDING'}")
+            print(f"  Duration: {duration_sec // 60}m {duration_sec % 60}s")
+
+        if data.get("lastSuccessfulBuild"):
+            print(f"Last Successful Build: #{data['lastSuccessfulBuild'].get('number')}")
+        if data.get("lastFailedBuild"):
+            print(f"Last Failed Build: #{data['lastFailedBuild'].get('number')}")
+
+        print_fields(data, [f for f in selected if f not in JOB_INFO_FIELDS])
+
+    fetch_targets(expand_job_patterns(job_names), fetch, render)
+
+
+BUILD_PERMALINKS = ("lastBuild", "lastCompletedBuild", "lastSuccessfulBuild", "lastFailedBuild",
+                    "lastStableBuild", "lastUnstableBuild", "lastUnsuccessfulBuild")
+
+
+def parse_build_targets(args: list) -> list:
+    """Turn build-info arguments into (job, build) pairs.
+
+    Accepts the classic "JOB BUILD" form as well as any number of
+    "JOB#BUILD" targets, where JOB may be a glob and BUILD defaults to
+    lastBuild.
+    """
+    if len(args) == 2 and "#" not in args[0] and "#" not in args[1]:
+        job, build = args
+        if not (build.isdigit() or build in BUILD_PERMALINKS):
+            print(f"Error: {build!r} is not a build number or permalink such as lastBuild. "
+                  f"To show several jobs, use JOB#BUILD targets: {job}#lastBuild {build}#lastBuild",
+                  file=sys.stderr)
+            sys.exit(1)
+        return [(name, build) for name in expand_job_patterns([job])]
+
+    pairs = []
+    for arg in args:
+        job, _, build = arg.rpartition("#") if "#" in arg else (arg, "", "lastBuild")
+        pairs.extend((name, build or "lastBuild") for name in expand_job_patterns([job]))
+    return pairs
+
+
+def get_build_info(targets: list, fields: Optional[str] = None) -> None:
+    """Get information about one or more builds, given as (job, build) pairs."""
+    selected, narrowed = select_fields(BUILD_INFO_FIELDS, fields)
+    tree = compile_tree(selected)
+    labels = {f"{job}#{build}": (job, build) for job, build in targets}
+
+    def fetch(label: str) -> tuple:
+        job_name, build_number = labels[label]
+        return cached_build_request(job_name, build_number, f"api/json?tree={tree}",
+                                    _build_json_finished)
+
+    def render(label: str, data: dict) -> None:
+        job_name, build_number = labels[label]
+        if narrowed:
+            print_fields(data, selected)
+            return
+
+        duration_ms = data.get("duration", 0)
+        duration_sec = duration_ms // 1000
+
+        print(f"Build: {data.get('fullDisplayName', f'{job_name} #{build_number}')}")
+        print(f"Result: {data.get('result') or 'BUILDING'}")
+        print(f"Building: {data.get('building', False)}")
+        print(f"Duration: {duration_sec // 60}m {duration_sec % 60}s")
+        print(f"URL: {data.get('url', 'N/A')}")
+
+        if data.get("changeSets"):
+            print("\nChanges:")
+            for changeset in data["changeSets"]:
+                for item in changeset.get("items", []):
+                    msg = item.get("msg", "No message")[:60]
+                    author = item.get("author", {}).get("fullName", "Unknown")
+                    print(f"  - {msg} ({author})")
+
+        if data.get("actions"):
+            for action in data["actions"]:
+                if action.get("_class", "").endswith("ParametersAction"):
+                    print("\nParameters:")
+                    for param in action.get("parameters", []):
+                        print(f"  {param.get('name')}: {param.get('value')}")
+
+        print_fields(data, [f for f in selected if f not in BUILD_INFO_FIELDS])
+
+    fetch_targets(list(labels), fetch, render)
+
+
+def parse_since(text: str) -> int:
+    """Parse --since as a relative age (30m, 12h, 7d) or ISO date into epoch millis."""
+    match = re.fullmatch(r"(\d+)([mhdw])", text.strip())
+    if match:
+        seconds = int(match.group(1)) * {"m": 60, "h": 3600, "d": 86400, "w": 604800}[match.group(2)]
+        return int((time.time() - seconds) * 1000)
+    try:
+        return int(datetime.datetime.fromisoformat(text.strip()).timestamp() * 1000)
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f"invalid --since value: {text!r} (use e.g. 12h, 7d or 2024-05-01)")
+
+
+def get_build_history(job_name: str, limit: Optional[int] = None, since: Optional[int] = None,
+                      page_size: int = HISTORY_PAGE_SIZE, fields: Optional[str] = None) -> None:
+    """Stream a job's build history a page at a time using allBuilds{M,N} ranges.
+
+    Builds come newest first, so paging stops as soon as --limit builds have
+    been printed or a build older than --since is reached.
+    """
+    selected, narrowed = select_fields(HISTORY_FIELDS, fields)
+    if since is not None and "timestamp" not in selected:
+        selected.append("timestamp")
+    tree = compile_tree(selected)
+    extra = [f for f in selected if f not in HISTORY_FIELDS]
+    job_url = job_path(job_name)
+
+    printed = 0
+    start = 0
+    while True:
+        end = start + page_size
+        if limit is not None:
+            end = min(end, limit)
+        # {M,N} selects builds M (inclusive) to N (exclusive); braces are
+        # percent-encoded for servlet containers that reject them raw.
+        status, content = make_request(f"{job_url}/api/json?tree=allBuilds[{tree}]%7B{start},{end}%7D")
+        if status != 200:
+            print(f"Error ({status}): {content}", file=sys.stderr)
+            sys.exit(1)
+        try:
+            builds = _loads(content).get("allBuilds", [])
+        except json.JSONDecodeError:
+            print(f"Invalid JSON response: {content[:200]}", file=sys.stderr)
+            sys.exit(1)
+
+        if not printed and not narrowed and not structured():
+            if not builds:
+                print("No builds found.")
+                return
+            print(f"{'Build':<8} {'Result':<10} {'Started':<17} {'Duration':<10} {'Node':<20}")
+            print("-" * 70)
+
+        for build in builds:
+            if since is not None and (build.get("timestamp") or 0) < since:
+                return
+            if structured():
+                emit(build)
+            elif narrowed:
+                print("  ".join(f"{f}={format_field(resolve_field(build, f))}" for f in selected))
+            else:
+                started = datetime.datetime.fromtimestamp((build.get("timestamp") or 0) / 1000)
+                duration_sec = (build.get("duration") or 0) // 1000
+                row = (f"{'#' + str(build.get('number', '?')):<8} "
+                       f"{build.get('result') or 'BUILDING':<10} "
+                       f"{started:%Y-%m-%d %H:%M}  "
+                       f"{f'{duration_sec // 60}m {duration_sec % 60}s':<10} "
+                       f"{build.get('builtOn') or '-':<20}")
+                if extra:
+                    row += " " + "  ".join(f"{f}={format_field(resolve_field(build, f))}" for f in extra)
+                print(row)
+            printed += 1
+        sys.stdout.flush()
+
+        if len(builds) < end - start or (limit is not None and printed >= limit):
+            return
+        start = end
+
+
+def format_duration(seconds: float) -> str:
+    """Render seconds as the "Xm Ys" form used throughout the CLI."""
+    seconds = int(round(seconds))
+    return f"{seconds // 60}m {seconds % 60}s"
+
+
+def _percentile(sorted_values, q: float) -> float:
+    """Linearly interpolated percentile, matching numpy.percentile's default."""
+    if not sorted_values:
+        return 0.0
+    pos = (len(sorted_values) - 1) * q / 100
+    low = int(pos)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (pos - low)
+
+
+def duration_stats(durations: array.array, window: int) -> dict:
+    """Summary statistics of build durations in seconds, oldest build first."""
+    n = len(durations)
+    ordered = array.array("d", sorted(durations))
+    mean = math.fsum(durations) / n
+    stddev = math.sqrt(math.fsum((d - mean) ** 2 for d in durations) / (n - 1)) if n > 1 else 0.0
+    median = _percentile(ordered, 50)
+    mad = _percentile(array.array("d", sorted(abs(d - median) for d in durations)), 50)
+
+    # Least-squares slope of duration against build index.
+    x_mean = (n - 1) / 2
+    sxx = math.fsum((i - x_mean) ** 2 for i in range(n))
+    slope = math.fsum((i - x_mean) * (d - mean) for i, d in enumerate(durations)) / sxx if sxx else 0.0
+
+    rolling = array.array("d")
+    if n >= window:
+        total = math.fsum(durations[:window])
+        rolling.append(total / window)
+        for i in range(window, n):
+            total += durations[i] - durations[i - window]
+            rolling.append(total / window)
+
+    return {"mean": mean, "stddev": stddev, "min": ordered[0], "max": ordered[-1],
+            "p50": median, "p90": _percentile(ordered, 90), "p99": _percentile(ordered, 99),
+            "median": median, "mad": mad, "slope": slope, "rolling": rolling}
+
+
+def duration_stats_numpy(durations: array.array, window: int) -> dict:
+    """NumPy version of duration_stats for very long histories."""
+    import numpy as np
+
+    values = np.frombuffer(durations, dtype=np.float64)
+    n = len(values)
+    median = float(np.median(values))
+    p50, p90, p99 = (float(v) for v in np.percentile(values, [50, 90, 99]))
+    slope = float(np.polyfit(np.arange(n), values, 1)[0]) if n > 1 else 0.0
+    rolling = np.convolve(values, np.ones(window) / window, mode="valid") if n >= window else []
+    return {"mean": float(values.mean()), "stddev": float(values.std(ddof=1)) if n > 1 else 0.0,
+            "min": float(values.min()), "max": float(values.max()),
+            "p50": p50, "p90": p90, "p99": p99,
+            "median": median, "mad": float(np.median(np.abs(values - median))),
+            "slope": slope, "rolling": array.array("d", rolling)}
+
+
+def get_build_stats(job_name: str, last: int = HISTORY_PAGE_SIZE, window: int = 10,
+                    threshold: float = 3.0, use_numpy: Optional[bool] = None) -> None:
+    """Duration percentiles, success rate, trend and outliers over a job's last builds."""
+    tree = compile_tree(["number", "result", "duration", "building"])
+    status, content = make_request(f"{job_path(job_name)}/api/json?tree=allBuilds[{tree}]%7B0,{last}%7D")
+    if status != 200:
+        print(f"Error ({status}): {content}", file=sys.stderr)
+        sys.exit(1)
+    try:
+        builds = _loads(content).get("allBuilds", [])
+    except json.JSONDecodeError:
+        print(f"Invalid JSON response: {content[:200]}", file=sys.stderr)
+        sys.exit(1)
+
+    # Jenkins lists newest first; analyse finished builds oldest first.
+    finished = [b for b in reversed(builds) if not b.get("building") and b.get("result")]
+    if not finished:
+        if not structured():
+            print("No finished builds found.")
+        return
+
+    numbers = array.array("q", (b.get("number", 0) for b in finished))
+    durations = array.array("d", ((b.get("duration") or 0) / 1000 for b in finished))
+    successes = sum(1 for b in finished if b.get("result") == "SUCCESS")
+
+    if use_numpy is None:
+        use_numpy = len(durations) >= STATS_NUMPY_MIN_BUILDS
+    stats = None
+    if use_numpy:
+        try:
+            stats = duration_stats_numpy(durations, window)
+        except ImportError:
+            pass
+    if stats is None:
+        stats = duration_stats(durations, window)
+
+    # Robust z-scores (median/MAD) so a few extreme builds cannot hide themselves;
+    # fall back to the standard deviation when most durations are identical.
+    scale = 1.4826 * stats["mad"] or stats["stddev"]
+    outliers = []
+    if scale:
+        for number, duration in zip(numbers, durations):
+            z = (duration - stats["median"]) / scale
+            if abs(z) > threshold:
+                outliers.append((number, duration, z))
+
+    if structured():
+        emit({"job": job_name, "builds": len(builds), "finished": len(finished),
+              "success_rate": successes / len(finished),
+              **{key: stats[key] for key in ("mean", "stddev", "p50", "p90", "p99", "min", "max", "slope")},
+              "rolling_mean": stats["rolling"][-1] if stats["rolling"] else None,
+              "outliers": [{"number": n, "duration": d, "z": z} for n, d, z in outliers]})
+        return
+
+    print(f"Job: {job_name} (last {len(builds)} builds, {len(finished)} finished)")
+    print(f"Success rate: {100 * successes / len(finished):.1f}% ({successes}/{len(finished)})")
+    print("\nDuration:")
+    print(f"  Mean: {format_duration(stats['mean'])}  Stddev: {format_duration(stats['stddev'])}")
+    print(f"  p50: {format_duration(stats['p50'])}  p90: {format_duration(stats['p90'])}  "
+          f"p99: {format_duration(stats['p99'])}")
+    print(f"  Min: {format_duration(stats['min'])}  Max: {format_duration(stats['max'])}")
+
+    rolling = stats["rolling"]
+    print(f"\nTrend (rolling mean over {window} builds):")
+    if len(rolling) > window:
+        previous, latest = rolling[-window - 1], rolling[-1]
+        change = 100 * (latest - previous) / previous if previous else 0.0
+        print(f"  {format_duration(previous)} -> {format_duration(latest)} ({change:+.1f}%)")
+    elif rolling:
+        print(f"  {format_duration(rolling[-1])} (not enough builds to compare windows)")
+    else:
+        print("  Not enough builds")
+    print(f"  Slope: {stats['slope']:+.1f}s per build")
+
+    print(f"\nOutliers (|z| > {threshold:g}): {len(outliers) or 'none'}")
+    for number, duration, z in outliers:
+        print(f"  #{number:<8} {format_duration(duration):<10} z={z:+.1f}")
+
+
+WAREHOUSE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    controller TEXT NOT NULL,
+    name TEXT NOT NULL,
+    watermark INTEGER NOT NULL DEFAULT 0,
+    synced_at INTEGER,
+    PRIMARY KEY (controller, name)
+);
+CREATE TABLE IF NOT EXISTS builds (
+    controller TEXT NOT NULL,
+    job TEXT NOT NULL,
+    number INTEGER NOT NULL,
+    result TEXT,
+    building INTEGER NOT NULL,
+    timestamp INTEGER,
+    duration INTEGER,
+    built_on TEXT,
+    parameters TEXT,
+    causes TEXT,
+    PRIMARY KEY (controller, job, number)
+);
+CREATE INDEX IF NOT EXISTS builds_by_timestamp ON builds (controller, timestamp);
+"""
+
+
+def _build_row(controller: str, job_name: str, build: dict) -> tuple:
+    parameters = {}
+    causes = []
+    for action in build.get("actions") or []:
+        for param in action.get("parameters") or []:
+            parameters[param.get("name")] = param.get("value")
+        causes.extend(c.get("shortDescription") for c in action.get("causes") or [])
+    return (controller, job_name, build.get("number"), build.get("result"),
+            int(bool(build.get("building"))), build.get("timestamp"), build.get("duration"),
+            build.get("builtOn") or None, json.dumps(parameters), json.dumps(causes))
+
+
+def sync_builds(job_names: Optional[list] = None, db_path: str = WAREHOUSE_PATH,
+                recursive: bool = False, concurrency: int = CONCURRENCY,
+                page_size: int = HISTORY_PAGE_SIZE) -> None:
+    """Mirror job and build metadata into a local SQLite warehouse.
+
+    Each job keeps a watermark: the highest build number below which every
+    build is finished and stored. A run fetches only builds above it, a page
+    per job at a time with the pages for all jobs fetched concurrently, and
+    keeps paging a job only while its page was entirely new. Jobs that were
+    synced before start with a small page, since most have few new builds.
+    """
+    names = expand_job_patterns(job_names) if job_names else all_job_names(recursive)
+    if not names:
+        print("No jobs to sync.", file=sys.stderr if structured() else sys.stdout)
+        return
+
+    if os.path.dirname(db_path):
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    db = sqlite3.connect(db_path)
+    db.executescript(WAREHOUSE_SCHEMA)
+    controller = JENKINS_URL.rstrip("/")
+    watermarks = dict(db.execute("SELECT name, watermark FROM jobs WHERE controller = ?",
+                                 (controller,)).fetchall())
+
+    tree = compile_tree(SYNC_FIELDS)
+    offsets = {name: 0 for name in names}
+    sizes = {name: SYNC_PROBE_SIZE if name in watermarks else page_size for name in names}
+    fetched = collections.defaultdict(int)
+    highest = {}
+    running = collections.defaultdict(list)
+    failed = []
+    while offsets:
+        batch = list(offsets)
+        paths = [f"{job_path(name)}/api/json?tree=allBuilds[{tree}]"
+                 f"%7B{offsets[name]},{offsets[name] + sizes[name]}%7D" for name in batch]
+        responses = fetch_many(paths, concurrency)
+        with db:
+            for name, (status, content) in zip(batch, responses):
+                try:
+                    builds = _loads(content).get("allBuilds", []) if status == 200 else None
+                except json.JSONDecodeError:
+                    builds = None
+                if builds is None:
+                    print(f"{name}: Error ({status}): {content[:200]}", file=sys.stderr)
+                    failed.append(name)
+                    del offsets[name]
+                    continue
+
+                watermark = watermarks.get(name, 0)
+                fresh = [b for b in builds if (b.get("number") or 0) > watermark]
+                db.executemany("INSERT OR REPLACE INTO builds VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                               [_build_row(controller, name, b) for b in fresh])
+                fetched[name] += len(fresh)
+                running[name].extend(b["number"] for b in fresh if b.get("building"))
+                if fresh:
+                    highest[name] = max(highest.get(name, 0), max(b["number"] for b in fresh))
+
+                if len(fresh) < len(builds) or len(builds) < sizes[name]:
+                    del offsets[name]
+                else:
+                    offsets[name] += sizes[name]
+                    sizes[name] = min(sizes[name] * 4, page_size)
+
+    now = int(time.time() * 1000)
+    with db:
+        for name in names:
+            if name in failed:
+                continue
+            watermark = watermarks.get(name, 0)
+            if name in highest:
+                # Running builds stay above the watermark so the next sync
+                # picks up their final result.
+                top = min(running[name]) - 1 if running[name] else highest[name]
+                watermark = max(watermark, top)
+            db.execute("INSERT INTO jobs (controller, name, watermark, synced_at) VALUES (?, ?, ?, ?) "
+                       "ON CONFLICT (controller, name) DO UPDATE SET "
+                       "watermark = excluded.watermark, synced_at = excluded.synced_at",
+                       (controller, name, watermark, now))
+            if structured():
+                emit({"job": name, "fetched": fetched[name], "watermark": watermark,
+                      "running": len(running[name])})
+                continue
+            note = f", {len(running[name])} still running" if running[name] else ""
+            print(f"{name:<40} {fetched[name]:>6} builds fetched (watermark #{watermark}{note})")
+    db.close()
+
+    if not structured():
+        print(f"\nSynced {len(names) - len(failed)} jobs, {sum(fetched.values())} builds into {db_path}")
+    if failed:
+        sys.exit(1)
+
+
+_WORD_RE = re.compile(rb"\w{3,}")
+
+
+def text_trigrams(data: bytes, seen: Optional[set] = None) -> set:
+    """Lowercased trigrams that lie inside runs of word characters.
+
+    Words already in seen are skipped (and new ones added), which keeps
+    repetitive logs cheap to index.
+    """
+    grams = set()
+    for word in set(_WORD_RE.findall(data.lower())):
+        if seen is not None:
+            if word in seen:
+                continue
+            seen.add(word)
+        grams.update(word[i:i + 3] for i in range(len(word) - 2))
+    return grams
+
+
+def pattern_trigrams(pattern: str, regex: bool) -> set:
+    """Trigrams every match of the pattern must contain; empty means no filter.
+
+    For regexes only literal runs in the top-level sequence (and in plain
+    groups) count, since anything under alternation or repetition is optional.
+    """
+    if not regex:
+        return text_trigrams(pattern.encode("utf-8"))
+    try:
+        from re import _parser as sre_parse
+    except ImportError:
+        import sre_parse
+    try:
+        parsed = sre_parse.parse(pattern)
+    except (re.error, TypeError, ValueError):
+        return set()
+
+    grams = set()
+
+    def walk(items) -> None:
+        run = []
+        for op, av in items:
+            if op is sre_parse.LITERAL:
+                run.append(chr(av))
+                continue
+            grams.update(text_trigrams("".join(run).encode("utf-8")))
+            run = []
+            if op is sre_parse.SUBPATTERN:
+                walk(av[-1])
+        grams.update(text_trigrams("".join(run).encode("utf-8")))
+
+    walk(parsed)
+    return grams
+
+
+class LogIndex:
+    """Trigram index over the console logs of finished builds, kept in SQLite.
+
+    Each indexing run appends one segment: per trigram, a packed array of
+    the ids of newly indexed logs containing it. A query intersects the
+    postings of the pattern's trigrams, so only logs that can match are
+    read. Segments are merged once there are more than max_segments.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS docs (
+        id INTEGER PRIMARY KEY,
+        controller TEXT NOT NULL,
+        job TEXT NOT NULL,
+        number INTEGER NOT NULL,
+        UNIQUE (controller, job, number)
+    );
+    CREATE TABLE IF NOT EXISTS postings (
+        tri BLOB NOT NULL,
+        segment INTEGER NOT NULL,
+        docs BLOB NOT NULL,
+        PRIMARY KEY (tri, segment)
+    ) WITHOUT ROWID;
+    """
+
+    def __init__(self, path: str, max_segments: int = SEARCH_MAX_SEGMENTS):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.db = sqlite3.connect(path)
+        self.db.executescript(self.SCHEMA)
+        self.controller = JENKINS_URL.rstrip("/")
+        self.max_segments = max_segments
+
+    def lookup(self, job_name: str, numbers: list) -> dict:
+        """Map the already indexed build numbers of a job to document ids."""
+        rows = self.db.execute("SELECT number, id FROM docs WHERE controller = ? AND job = ?",
+                               (self.controller, job_name))
+        wanted = set(numbers)
+        return {number: doc for number, doc in rows if number in wanted}
+
+    def add(self, logs: list) -> None:
+        """Index (job, number, trigrams) entries as one new segment."""
+        if not logs:
+            return
+        postings = collections.defaultdict(lambda: array.array("I"))
+        with self.db:
+            segment = self.db.execute("SELECT coalesce(max(segment), 0) + 1 FROM postings").fetchone()[0]
+            for job_name, number, grams in logs:
+                doc = self.db.execute(
+                    "INSERT OR REPLACE INTO docs (controller, job, number) VALUES (?, ?, ?)",
+                    (self.controller, job_name, number)).lastrowid
+                for gram in grams:
+                    postings[gram].append(doc)
+            self.db.executemany("INSERT INTO postings VALUES (?, ?, ?)",
+                                ((gram, segment, docs.tobytes()) for gram, docs in postings.items()))
+        segments = self.db.execute("SELECT count(DISTINCT segment) FROM postings").fetchone()[0]
+        if segments > self.max_segments:
+            self.merge()
+
+    def merge(self) -> None:
+        """Rewrite all segments into one, a trigram at a time."""
+        with self.db:
+            self.db.execute("CREATE TEMP TABLE merged (tri BLOB PRIMARY KEY, docs BLOB) WITHOUT ROWID")
+            rows = self.db.execute("SELECT tri, docs FROM postings ORDER BY tri, segment")
+            batch = []
+            current, docs = None, array.array("I")
+            for gram, blob in rows:
+                if gram != current and current is not None:
+                    batch.append((current, docs.tobytes()))
+                    docs = array.array("I")
+                current = gram
+                docs.frombytes(blob)
+                if len(batch) >= 1000:
+                    self.db.executemany("INSERT INTO merged VALUES (?, ?)", batch)
+                    batch = []
+            if current is not None:
+                batch.append((current, docs.tobytes()))
+            self.db.executemany("INSERT INTO merged VALUES (?, ?)", batch)
+            self.db.execute("DELETE FROM postings")
+            self.db.execute("INSERT INTO postings SELECT tri, 1, docs FROM merged")
+            self.db.execute("DROP TABLE merged")
+
+    def candidates(self, grams: set, docs: set) -> set:
+        """The subset of docs whose logs contain every one of the trigrams."""
+        remaining = set(docs)
+        for gram in grams:
+            if not remaining:
+                break
+            found = set()
+            for (blob,) in self.db.execute("SELECT docs FROM postings WHERE tri = ?", (gram,)):
+                found.update(array.array("I", blob))
+            remaining &= found
+        return remaining
+
+    def close(self) -> None:
+        self.db.close()
+
+
+def console_chunks(job_name: str, build_number: int):
+    """Yield the consoleText of a finished build, from BUILD_CACHE when possible.
+
+    A downloaded log is written to the cache once it has been read to the end.
+    """
+    cached = BUILD_CACHE.open(job_name, str(build_number), "consoleText")
+    if cached is not None:
+        with cached:
+            while chunk := cached.read(CHUNK_SIZE):
+                yield chunk
+        return
+
+    writer = BUILD_CACHE.writer(job_name, str(build_number), "consoleText")
+    try:
+        with open_request(f"{job_path(job_name)}/{build_number}/consoleText") as response:
+            if response.status != 200:
+                body = b"".join(response.iter_content()).decode("utf-8", errors="replace")
+                raise http.client.HTTPException(f"Error ({response.status}): {body[:200]}")
+            for chunk in response.iter_content():
+                if writer:
+                    writer.write(chunk)
+                yield chunk
+        if writer:
+            BUILD_CACHE.mark_complete(job_name, str(build_number))
+            writer.commit()
+    finally:
+        if writer:
+            writer.discard()
+
+
+def scan_log(chunks, matcher, max_count: int, index: bool) -> tuple:
+    """Collect up to max_count (line number, line) matches and, if asked, the log's trigrams.
+
+    Chunks are searched whole and split into lines only around matches.
+    """
+    matches = []
+    grams = set() if index else None
+    seen = set()
+    partial = b""
+    line_no = 1
+    for chunk in chunks:
+        if grams is not None:
+            # Keep two bytes of overlap so trigrams spanning chunks are seen.
+            grams |= text_trigrams(partial[-2:] + chunk, seen)
+            if len(seen) > SEARCH_SEEN_WORDS:
+                seen.clear()
+        if len(matches) >= max_count:
+            if grams is None:
+                break
+            partial = chunk[-2:]
+            continue
+        data = partial + chunk
+        cut = data.rfind(b"\n") + 1
+        block, partial = data[:cut], data[cut:]
+        line_end = 0
+        for m in matcher.finditer(block):
+            if m.start() < line_end:
+                continue
+            start = block.rfind(b"\n", 0, m.start()) + 1
+            line_end = block.find(b"\n", m.start()) + 1
+            matches.append((line_no + block.count(b"\n", 0, start), block[start:line_end - 1]))
+            if len(matches) >= max_count:
+                break
+        line_no += block.count(b"\n")
+    if partial and len(matches) < max_count:
+        m = matcher.search(partial)
+        if m:
+            matches.append((line_no, partial))
+    return matches, grams
+
+
+def search_logs(pattern: str, job_names: Optional[list] = None, last: int = 20,
+                regex: bool = False, ignore_case: bool = False, max_count: int = 3,
+                concurrency: int = CONCURRENCY) -> None:
+    """Print log lines matching a pattern across the last builds of some jobs.
+
+    Logs not yet in the LogIndex are downloaded (or read from BUILD_CACHE),
+    searched and indexed in one pass; indexed logs are read again only when
+    their trigrams show they can contain a match. Running builds are skipped.
+    """
+    flags = re.MULTILINE | (re.IGNORECASE if ignore_case else 0)
+    try:
+        matcher = re.compile(pattern.encode("utf-8") if regex else re.escape(pattern.encode("utf-8")), flags)
+    except re.error as e:
+        print(f"Error: invalid regex: {e}", file=sys.stderr)
+        sys.exit(1)
+    grams = pattern_trigrams(pattern, regex)
+
+    names = expand_job_patterns(job_names) if job_names else all_job_names()
+    paths = [f"{job_path(name)}/api/json?tree=builds[number,building]%7B0,{last}%7D" for name in names]
+    targets = []
+    numbers = collections.defaultdict(list)
+    running = 0
+    failed = False
+    for name, (status, content) in zip(names, fetch_many(paths, concurrency)):
+        try:
+            builds = _loads(content).get("builds", []) if status == 200 else None
+        except json.JSONDecodeError:
+            builds = None
+        if builds is None:
+            print(f"{name}: Error ({status}): {content[:200]}", file=sys.stderr)
+            failed = True
+            continue
+        running += sum(1 for b in builds if b.get("building"))
+        numbers[name] = [b["number"] for b in builds if not b.get("building")]
+        targets.extend((name, number) for number in numbers[name])
+
+    index = LogIndex(SEARCH_INDEX_PATH)
+    indexed = {}
+    for name in numbers:
+        for number, doc in index.lookup(name, numbers[name]).items():
+            indexed[(name, number)] = doc
+    candidates = index.candidates(grams, set(indexed.values()))
+    work = [t for t in targets if t not in indexed or indexed[t] in candidates]
+
+    def search(target: tuple) -> tuple:
+        name, number = target
+        try:
+            return scan_log(console_chunks(name, number), matcher, max_count, target not in indexed) + (None,)
+        except (OSError, http.client.HTTPException) as e:
+            return [], None, str(e)
+
+    fresh = []
+    matched = 0
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        for (name, number), (matches, log_grams, error) in zip(work, executor.map(with_context(search), work)):
+            if error:
+                print(f"{name} #{number}: {error}", file=sys.stderr)
+                failed = True
+                continue
+            if log_grams is not None:
+                fresh.append((name, number, log_grams))
+                if len(fresh) >= SEARCH_INDEX_BATCH:
+                    index.add(fresh)
+                    fresh = []
+            matched += bool(matches)
+            for line_no, line in matches:
+                text = line.decode("utf-8", errors="replace").rstrip()
+                if structured():
+                    emit({"job": name, "build": number, "line": line_no, "text": text})
+                else:
+                    print(f"{name} #{number}:{line_no}: {text}")
+    index.add(fresh)
+    index.close()
+
+    skipped = len(targets) - len(work)
+    note = f", {running} running builds skipped" if running else ""
+    print(f"\n{matched} of {len(targets)} builds matched ({len(work)} logs read, "
+          f"{skipped} ruled out by the index{note})", file=sys.stderr)
+    if failed:
+        sys.exit(1)
+
+
+def get_log_size(job_name: str, build_number: str) -> Optional[int]:
+    """Return the console log size in bytes from progressiveText's X-Text-Size."""
+    job_url = job_path(job_name)
+    path = f"{job_url}/{build_number}/logText/progressiveText?start=0"
 
-    req = urllib.request.Request(url, data=data, headers=headers, method=method)
+    # HEAD keeps the log off the wire; fall back to abandoning a GET after
+    # its headers for servers that do not answer HEAD.
+    for method in ("HEAD", "GET"):
+        try:
+            with open_request(path, method=method) as response:
+                size = response.getheader("X-Text-Size")
+                if response.status == 200 and size is not None:
+                    return int(size)
+        except (OSError, http.client.HTTPException, ValueError):
+            return None
+    return None
 
-    try:
-        with urllib.request.urlopen(req, timeout=30) as response:
-            content = response.read().decode("utf-8")
-            return response.status, content
-    except urllib.error.HTTPError as e:
-        return e.code, e.read().decode("utf-8", errors="replace")
-    except urllib.error.URLError as e:
-        return 0, f"Connection error: {e.reason}"
-    except Exception as e:
-        return 0, f"Error: {str(e)}"
 
+def read_log_range(job_name: str, build_number: str, start: int, length: int) -> bytes:
+    """Read up to length bytes of the console log starting at byte offset start."""
+    job_url = job_path(job_name)
+    path = f"{job_url}/{build_number}/logText/progressiveText?start={start}"
 
-def list_jobs(folder: Optional[str] = None) -> None:
-    """List all Jenkins jobs."""
-    path = "api/json?tree=jobs[name,color,url,lastBuild[number,result,timestamp]]"
-    if folder:
-        path = f"job/{urllib.parse.quote(folder, safe='')}/api/json?tree=jobs[name,color,url,lastBuild[number,result,timestamp]]"
+    chunks = []
+    remaining = length
+    with open_request(path) as response:
+        if response.status != 200:
+            raise OSError(f"progressiveText returned {response.status}")
+        for chunk in response.iter_content(min(CHUNK_SIZE, remaining) or 1):
+            chunks.append(chunk[:remaining])
+            remaining -= len(chunks[-1])
+            if remaining <= 0:
+                # Closing early drops the connection rather than pulling the
+                # rest of the log through it.
+                break
+    return b"".join(chunks)
 
-    status, content = make_request(path)
 
-    if status != 200:
-        print(f"Error ({status}): {content}", file=sys.stderr)
-        sys.exit(1)
+def tail_log(job_name: str, build_number: str, lines: int,
+             size: Optional[int] = None) -> Optional[bytes]:
+    """Return the last lines of a console log by reading trailing byte windows.
+
+    Windows double in size while walking backwards from the end of the log,
+    so the bytes fetched and held depend on the lines requested rather than
+    on the log size. Returns None when the log size cannot be determined.
+    """
+    if size is None:
+        size = get_log_size(job_name, build_number)
+    if size is None:
+        return None
 
     try:
-        data = json.loads(content)
-        jobs = data.get("jobs", [])
+        return tail_bytes(lambda start, length: read_log_range(job_name, build_number,
+                                                              start, length),
+                          size, lines)
+    except (OSError, http.client.HTTPException):
+        return None
 
-        if not jobs:
-            print("No jobs found.")
-            return
 
-        print(f"{'Job Name':<40} {'Status':<15} {'Last Build':<10} {'Result':<12}")
-        print("-" * 80)
+def tail_file(f, lines: int) -> bytes:
+    """Return the last lines of a seekable binary file."""
+    def read_range(start: int, length: int) -> bytes:
+        f.seek(start)
+        return f.read(length)
 
-        for job in jobs:
-            name = job.get("name", "Unknown")
-            color = job.get("color", "notbuilt")
-            last_build = job.get("lastBuild") or {}
-            build_num = last_build.get("number", "-")
-            result = last_build.get("result", "N/A") or "BUILDING"
-
-            status_map = {
-                "blue": "Stable",
-                "blue_anime": "Building",
-                "red": "Failed",
-                "red_anime": "Building",
-                "yellow": "Unstable",
-                "yellow_anime": "Building",
-                "grey": "Pending",
-                "disabled": "Disabled",
-                "notbuilt": "Not Built",
-            }
-            status_text = status_map.get(color, color)
-
-            print(f"{name:<40} {status_text:<15} {str(build_num):<10} {result:<12}")
+    return tail_bytes(read_range, os.fstat(f.fileno()).st_size, lines)
 
-    except json.JSONDecodeError:
-        print(f"Invalid JSON response: {content[:200]}", file=sys.stderr)
-        sys.exit(1)
 
+def tail_bytes(read_range, size: int, lines: int) -> bytes:
+    """Collect the last lines of a size-byte stream through read_range(start, length)."""
+    windows = []
+    newlines = 0
+    end = size
+    window = TAIL_WINDOW
+    while end > 0:
+        start = max(0, end - window)
+        data = read_range(start, end - start)
+        if not data:
+            break
+        if not windows and data.endswith(b"\n"):
+            newlines -= 1  # the final line terminator does not start a new line
+        windows.append(data)
+        newlines += data.count(b"\n")
+        end = start
+        if newlines >= lines:
+            break
+        window = min(window * 2, TAIL_MAX_WINDOW)
 
-def get_job_info(job_name: str) -> None:
-    """Get detailed information about a specific job."""
-    encoded_name = urllib.parse.quote(job_name, safe='')
-    path = f"job/{encoded_name}/api/json?tree=name,description,color,buildable,lastBuild[number,result,timestamp,duration],lastSuccessfulBuild[number],lastFailedBuild[number],nextBuildNumber,healthReport[description,score]"
+    content = b"".join(reversed(windows))
+    pos = len(content) - 1 if content.endswith(b"\n") else len(content)
+    for _ in range(lines):
+        pos = content.rfind(b"\n", 0, pos)
+        if pos < 0:
+            break
+    return content[pos + 1:]
 
-    status, content = make_request(path)
 
-    if status != 200:
-        print(f"Error ({status}): {content}", file=sys.stderr)
-        sys.exit(1)
+def follow_log(job_name: str, build_number: str, start: int = 0, out=None) -> None:
+    """Stream console output from byte offset start until the build finishes.
 
-    try:
-        data = json.loads(content)
+    Polls progressiveText with the offset reported by the previous response,
+    halving the interval while output is flowing and backing off while the
+    log is quiet.
+    """
+    job_url = job_path(job_name)
+    offset = start
+    interval = FOLLOW_MIN_INTERVAL
+    if out is None:
+        out = sys.stdout.buffer
 
-        print(f"Job: {data.get('name', job_name)}")
-        print(f"Description: {data.get('description') or 'No description'}")
-        print(f"Buildable: {data.get('buildable', False)}")
-        print(f"Next Build Number: {data.get('nextBuildNumber', 'N/A')}")
+    while True:
+        path = f"{job_url}/{build_number}/logText/progressiveText?start={offset}"
+        received = 0
+        try:
+            with open_request(path) as response:
+                if response.status != 200:
+                    body = b"".join(response.iter_content()).decode("utf-8", errors="replace")
+                    print(f"Error ({response.status}): {body}", file=sys.stderr)
+                    sys.exit(1)
+                size = response.getheader("X-Text-Size")
+                more = response.getheader("X-More-Data", "false").lower() == "true"
+                received = response.copy_to(out)
+                out.flush()
+        except (OSError, http.client.HTTPException) as e:
+            if isinstance(e, BrokenPipeError):
+                raise
+            print(f"Connection error: {e}", file=sys.stderr)
+            sys.exit(1)
 
-        if data.get("healthReport"):
-            print("\nHealth Reports:")
-            for report in data["healthReport"]:
-                print(f"  - {report.get('description', 'N/A')} (Score: {report.get('score', 'N/A')})")
+        offset = int(size) if size is not None else offset + received
+        if not more:
+            return
 
-        last_build = data.get("lastBuild")
-        if last_build:
-            duration_ms = last_build.get("duration", 0)
-            duration_sec = duration_ms // 1000
-            print(f"\nLast Build: #{last_build.get('number')}")
-            print(f"  Result: {last_build.get('result') or 'BUILDING'}")
-            print(f"  Duration: {duration_sec // 60}m {duration_sec % 60}s")
+        if received:
+            interval = max(FOLLOW_MIN_INTERVAL, interval / 2)
+        else:
+            interval = min(FOLLOW_MAX_INTERVAL, interval * 1.5)
+        time.sleep(interval)
 
-        if data.get("lastSuccessfulBuild"):
-            print(f"Last Successful Build: #{data['lastSuccessfulBuild'].get('number')}")
-        if data.get("lastFailedBuild"):
-            print(f"Last Failed Build: #{data['lastFailedBuild'].get('number')}")
 
-    except json.JSONDecodeError:
-        print(f"Invalid JSON response: {content[:200]}", file=sys.stderr)
-        sys.exit(1)
+def stream_console(job_name: str, build_number: str, out, tail: Optional[int] = None) -> None:
+    """Copy consoleText to out in fixed-size chunks, optionally keeping only the last lines.
 
+    The log of a finished build is also written to BUILD_CACHE on the way.
+    """
+    job_url = job_path(job_name)
+    path = f"{job_url}/{build_number}/consoleText"
+    writer = None
+    if build_finished(job_name, build_number):
+        writer = BUILD_CACHE.writer(job_name, build_number, "consoleText")
 
-def get_build_info(job_name: str, build_number: str) -> None:
-    """Get information about a specific build."""
-    encoded_name = urllib.parse.quote(job_name, safe='')
-    path = f"job/{encoded_name}/{build_number}/api/json"
+    try:
+        with open_request(path) as response:
+            if response.status != 200:
+                body = b"".join(response.iter_content()).decode("utf-8", errors="replace")
+                print(f"Error ({response.status}): {body}", file=sys.stderr)
+                sys.exit(1)
 
-    status, content = make_request(path)
+            if not tail:
+                response.copy_to(_Tee(out, writer) if writer else out)
+                if writer:
+                    writer.commit()
+                return
 
-    if status != 200:
-        print(f"Error ({status}): {content}", file=sys.stderr)
+            # Without a usable log size, keep a bounded window of lines while
+            # the whole log streams past.
+            lines = collections.deque(maxlen=tail)
+            partial = b""
+            for chunk in response.iter_content():
+                if writer:
+                    writer.write(chunk)
+                parts = (partial + chunk).split(b"\n")
+                partial = parts.pop()
+                lines.extend(part + b"\n" for part in parts[-tail:])
+            if partial:
+                lines.append(partial + b"\n")
+            if writer:
+                writer.commit()
+            out.writelines(lines)
+    except (OSError, http.client.HTTPException) as e:
+        if isinstance(e, BrokenPipeError):
+            raise
+        print(f"Connection error: {e}", file=sys.stderr)
         sys.exit(1)
+    finally:
+        if writer:
+            writer.discard()
 
-    try:
-        data = json.loads(content)
 
-        duration_ms = data.get("duration", 0)
-        duration_sec = duration_ms // 1000
+def get_build_log(job_name: str, build_number: str, tail: Optional[int] = None,
+                  follow: bool = False, output: Optional[str] = None) -> None:
+    """Get console output for a build.
 
-        print(f"Build: {data.get('fullDisplayName', f'{job_name} #{build_number}')}")
-        print(f"Result: {data.get('result') or 'BUILDING'}")
-        print(f"Building: {data.get('building', False)}")
-        print(f"Duration: {duration_sec // 60}m {duration_sec % 60}s")
-        print(f"URL: {data.get('url', 'N/A')}")
+    Bytes are copied from the socket to stdout, or to the output file, without
+    decoding; a reader closing the pipe stops the download immediately.
+    Logs of finished builds are served from BUILD_CACHE when present.
+    """
+    sys.stdout.flush()
+    out_file = open(output, "wb") if output else None
+    records = _LineRecords() if structured() and not output else None
+    out = out_file or records or sys.stdout.buffer
+    cached = BUILD_CACHE.open(job_name, build_number, "consoleText")
 
-        if data.get("changeSets"):
-            print("\nChanges:")
-            for changeset in data["changeSets"]:
-                for item in changeset.get("items", []):
-                    msg = item.get("msg", "No message")[:60]
-                    author = item.get("author", {}).get("fullName", "Unknown")
-                    print(f"  - {msg} ({author})")
+    try:
+        if cached:
+            if tail:
+                out.write(tail_file(cached, tail))
+            else:
+                shutil.copyfileobj(cached, out, CHUNK_SIZE)
+        elif follow:
+            start = 0
+            if tail:
+                start = get_log_size(job_name, build_number) or 0
+                out.write(tail_log(job_name, build_number, tail, size=start) or b"")
+            try:
+                follow_log(job_name, build_number, start, out)
+            except KeyboardInterrupt:
+                pass
+        elif tail:
+            content = tail_log(job_name, build_number, tail)
+            if content is None:
+                stream_console(job_name, build_number, out, tail)
+            else:
+                out.write(content)
+        else:
+            stream_console(job_name, build_number, out)
+        out.flush()
+    except BrokenPipeError:
+        _discard_stdout()
+    finally:
+        if cached:
+            cached.close()
+        if out_file:
+            out_file.close()
+            if structured():
+                emit({"job": job_name, "build": build_number, "output": output})
+        if records:
+            records.close()
 
-        if data.get("actions"):
-            for action in data["actions"]:
-                if action.get("_class", "").endswith("ParametersAction"):
-                    print("\nParameters:")
-                    for param in action.get("parameters", []):
-                        print(f"  {param.get('name')}: {param.get('value')}")
 
-    except json.JSONDecodeError:
-        print(f"Invalid JSON response: {content[:200]}", file=sys.stderr)
-        sys.exit(1)
+PIPELINE_FAILED_STATUSES = ("FAILED", "UNSTABLE", "ABORTED")
+CRITICAL_PATH_TOLERANCE_MS = 500
 
 
-def get_build_log(job_name: str, build_number: str, tail: Optional[int] = None) -> None:
-    """Get console output for a build."""
-    encoded_name = urllib.parse.quote(job_name, safe='')
-    path = f"job/{encoded_name}/{build_number}/consoleText"
+def _pipeline_finished(content: str) -> Optional[bool]:
+    try:
+        status = _loads(content).get("status")
+    except (json.JSONDecodeError, AttributeError):
+        return None
+    if status is None:
+        return None
+    return status not in ("IN_PROGRESS", "PAUSED_PENDING_INPUT", "QUEUED", "NOT_EXECUTED")
 
-    status, content = make_request(path)
 
-    if status != 200:
-        print(f"Error ({status}): {content}", file=sys.stderr)
-        sys.exit(1)
+def print_stage_logs(job_name: str, build_number: str, stages: list, finished: bool,
+                     failed_only: bool = False) -> None:
+    """Print the step logs of each stage, fetching flow nodes and logs concurrently."""
+    if failed_only:
+        stages = [stage for stage in stages if stage.get("status") in PIPELINE_FAILED_STATUSES]
+        if not stages:
+            if not structured():
+                print("\nNo failed stages.")
+            return
 
-    if tail:
-        lines = content.split("\n")
-        content = "\n".join(lines[-tail:])
+    described = cached_build_requests(
+        job_name, build_number,
+        [f"execution/node/{stage.get('id')}/wfapi/describe" for stage in stages], finished)
+    stage_nodes = []
+    for stage, (status, content) in zip(stages, described):
+        try:
+            nodes = _loads(content).get("stageFlowNodes", []) if status == 200 else None
+        except json.JSONDecodeError:
+            nodes = None
+        if nodes is None:
+            print(f"{stage.get('name', 'Unknown')}: Error ({status}): {content[:200]}", file=sys.stderr)
+            nodes = []
+        stage_nodes.append(nodes)
 
-    print(content)
+    node_ids = [node.get("id") for nodes in stage_nodes for node in nodes]
+    logs = iter(cached_build_requests(
+        job_name, build_number, [f"execution/node/{node_id}/wfapi/log" for node_id in node_ids], finished))
 
+    for stage, nodes in zip(stages, stage_nodes):
+        steps = []
+        duration = stage.get("durationMillis", 0) // 1000
+        if not structured():
+            print(f"\n==> {stage.get('name', 'Unknown')} ({stage.get('status', 'UNKNOWN')}, {duration}s) <==")
+        for node in nodes:
+            status, content = next(logs)
+            try:
+                log = _loads(content) if status == 200 else None
+            except json.JSONDecodeError:
+                log = None
+            if structured():
+                step = {key: node.get(key) for key in ("id", "name", "status", "parameterDescription")}
+                if log is None:
+                    step["error"] = f"Error ({status}): {content[:200]}"
+                else:
+                    step.update(log=log.get("text") or "", hasMore=bool(log.get("hasMore")))
+                steps.append(step)
+                continue
+            label = node.get("name", "step")
+            if node.get("parameterDescription"):
+                label += f": {node['parameterDescription']}"
+            print(f"--- {label} [{node.get('status', 'UNKNOWN')}] ---")
+            if log is None:
+                print(f"Error ({status}): {content[:200]}")
+                continue
+            text = log.get("text") or ""
+            sys.stdout.write(text if text.endswith("\n") or not text else text + "\n")
+            if log.get("hasMore"):
+                print(f"... (truncated, full log at {log.get('consoleUrl', 'the console')})")
+        if structured():
+            emit(dict(stage, steps=steps))
 
-def get_pipeline_log(job_name: str, build_number: str) -> None:
-    """Get pipeline stages and their logs."""
-    encoded_name = urllib.parse.quote(job_name, safe='')
 
+def get_pipeline_log(job_name: str, build_number: str, logs: bool = False,
+                     failed_only: bool = False) -> None:
+    """Get pipeline stages and, optionally, the step logs of each stage."""
     # Get workflow run info
-    path = f"job/{encoded_name}/{build_number}/wfapi/describe"
-    status, content = make_request(path)
+    status, content = cached_build_request(job_name, build_number, "wfapi/describe",
+                                           _pipeline_finished)
 
     if status != 200:
         # Fall back to regular console log
-        print("Note: Pipeline API not available, showing console log instead.\n")
+        print("Note: Pipeline API not available, showing console log instead.\n",
+              file=sys.stderr if structured() else sys.stdout)
         get_build_log(job_name, build_number)
         return
 
     try:
-        data = json.loads(content)
+        data = _loads(content)
+        stages = data.get("stages", [])
+        # Pin the build number so lastBuild cannot move between requests.
+        number = str(data.get("id", build_number))
+        number = number if number.isdigit() else build_number
+
+        if structured():
+            if logs or failed_only:
+                print_stage_logs(job_name, number, stages, bool(_pipeline_finished(content)), failed_only)
+            else:
+                for stage in stages:
+                    emit(stage)
+            return
 
         print(f"Pipeline: {data.get('name', job_name)}")
         print(f"Status: {data.get('status', 'UNKNOWN')}")
@@ -225,7 +2903,6 @@ def get_pipeline_log(job_name: str, build_number: str) -> None:
         duration_sec = duration_ms // 1000
         print(f"Duration: {duration_sec // 60}m {duration_sec % 60}s")
 
-        stages = data.get("stages", [])
         if stages:
             print(f"\nStages ({len(stages)}):")
             print("-" * 60)
@@ -235,17 +2912,178 @@ def get_pipeline_log(job_name: str, build_number: str) -> None:
                 stage_duration = stage.get("durationMillis", 0) // 1000
                 print(f"  {stage_name:<30} {stage_status:<12} {stage_duration}s")
 
+        if logs or failed_only:
+            print_stage_logs(job_name, number, stages, bool(_pipeline_finished(content)), failed_only)
+
     except json.JSONDecodeError:
         print(f"Invalid JSON response: {content[:200]}", file=sys.stderr)
         sys.exit(1)
 
 
+def stage_schedule(stages: list, tolerance_ms: int = CRITICAL_PATH_TOLERANCE_MS) -> tuple:
+    """Run the critical-path method over pipeline stages.
+
+    wfapi does not expose the stage graph, so it is inferred from timing:
+    a stage depends on every stage that ended before it started (within
+    tolerance_ms), which covers sequential stages and the join after a
+    parallel block, while stages that overlap in time are parallel branches.
+    Returns (schedule, length, path): one dict per stage in start order with
+    start, duration and slack in seconds and whether the stage has zero
+    slack, the critical path length in seconds, and the names along one
+    critical path. Parallel branches that tie are all marked critical, but
+    the path follows only one of them.
+    """
+    spans = sorted((s["startTimeMillis"], s.get("durationMillis") or 0, s.get("name", "Unknown"))
+                   for s in stages if s.get("startTimeMillis"))
+    if not spans:
+        return [], 0.0, []
+    origin = spans[0][0]
+    # Edges only run forward in start order, so the graph is acyclic and
+    # this order is topological.
+    preds = [[a for a in range(b) if spans[a][0] + spans[a][1] <= spans[b][0] + tolerance_ms]
+             for b in range(len(spans))]
+    succs = [[] for _ in spans]
+    for b, pred in enumerate(preds):
+        for a in pred:
+            succs[a].append(b)
+
+    finish = []
+    for b, (_, duration, _) in enumerate(spans):
+        finish.append(max((finish[a] for a in preds[b]), default=0) + duration)
+    length = max(finish)
+    latest_start = [0] * len(spans)
+    for a in reversed(range(len(spans))):
+        latest_start[a] = min((latest_start[b] for b in succs[a]), default=length) - spans[a][1]
+
+    schedule = []
+    for a, (start, duration, name) in enumerate(spans):
+        slack = latest_start[a] - (finish[a] - duration)
+        schedule.append({"name": name, "start": (start - origin) / 1000, "duration": duration / 1000,
+                         "slack": slack / 1000, "critical": slack <= tolerance_ms})
+
+    # Walk back from the stage that finishes last through the predecessor
+    # that determined each start, so tied branches yield a single chain.
+    b = max(range(len(spans)), key=lambda i: (finish[i], i))
+    path = [b]
+    while preds[b]:
+        b = max(preds[b], key=lambda a: (finish[a], -a))
+        path.append(b)
+    return schedule, length / 1000, [spans[i][2] for i in reversed(path)]
+
+
+def print_critical_path(job_name: str, data: dict) -> None:
+    """Print one run's stages with their slack and the resulting critical path."""
+    schedule, length, path = stage_schedule(data.get("stages", []))
+    if structured():
+        for stage in schedule:
+            emit(stage)
+        return
+    if not schedule:
+        print("No stage timings available.")
+        return
+    print(f"Pipeline: {job_name} {data.get('name', '')} ({data.get('status', 'UNKNOWN')})")
+    print(f"Wall time: {format_duration(data.get('durationMillis', 0) / 1000)}  "
+          f"Stage total: {format_duration(sum(stage['duration'] for stage in schedule))}  "
+          f"Critical path: {format_duration(length)}")
+    print(f"\n  {'Stage':<32} {'Start':<10} {'Duration':<10} {'Slack':<10}")
+    print("-" * 68)
+    for stage in schedule:
+        marker = "*" if stage["critical"] else " "
+        print(f"{marker} {stage['name']:<32} {format_duration(stage['start']):<10} "
+              f"{format_duration(stage['duration']):<10} {format_duration(stage['slack']):<10}")
+    print(f"\nCritical path: {' -> '.join(path)}")
+
+
+def get_critical_path(job_name: str, build_number: str = "lastBuild", last: int = 1) -> None:
+    """Critical path of one pipeline run, or how often each stage is on it over the last runs."""
+    if last <= 1:
+        status, content = cached_build_request(job_name, build_number, "wfapi/describe",
+                                               _pipeline_finished)
+        if status != 200:
+            print(f"Error ({status}): {content}", file=sys.stderr)
+            sys.exit(1)
+        try:
+            print_critical_path(job_name, _loads(content))
+        except json.JSONDecodeError:
+            print(f"Invalid JSON response: {content[:200]}", file=sys.stderr)
+            sys.exit(1)
+        return
+
+    if not str(build_number).isdigit():
+        status, content = make_request(f"{job_path(job_name)}/{build_number}/api/json?tree=number")
+        try:
+            build_number = _loads(content).get("number") if status == 200 else None
+        except json.JSONDecodeError:
+            build_number = None
+        if build_number is None:
+            print(f"Error ({status}): {content}", file=sys.stderr)
+            sys.exit(1)
+    numbers = [str(n) for n in range(int(build_number), max(0, int(build_number) - last), -1)]
+
+    runs = {}
+    missing = []
+    for number in numbers:
+        cached = BUILD_CACHE.get(job_name, number, "wfapi/describe")
+        if cached is None:
+            missing.append(number)
+        else:
+            runs[number] = _loads(cached)
+    job_url = job_path(job_name)
+    for number, (status, content) in zip(missing, fetch_many(
+            [f"{job_url}/{number}/wfapi/describe" for number in missing])):
+        if status != 200:
+            continue  # deleted builds, or not a pipeline
+        if _pipeline_finished(content):
+            BUILD_CACHE.put(job_name, number, "wfapi/describe", content.encode("utf-8"))
+            runs[number] = _loads(content)
+
+    on_path = collections.Counter()
+    slack = collections.defaultdict(list)
+    durations = collections.defaultdict(list)
+    walls, lengths = [], []
+    for number in numbers:
+        if number not in runs:
+            continue
+        schedule, length, _ = stage_schedule(runs[number].get("stages", []))
+        if not schedule:
+            continue
+        walls.append(runs[number].get("durationMillis", 0) / 1000)
+        lengths.append(length)
+        for stage in schedule:
+            on_path[stage["name"]] += stage["critical"]
+            slack[stage["name"]].append(stage["slack"])
+            durations[stage["name"]].append(stage["duration"])
+    names = sorted(durations, key=lambda name: (-on_path[name] / len(durations[name]),
+                                                -sum(durations[name]) / len(durations[name])))
+    if structured():
+        for name in names:
+            runs_seen = len(durations[name])
+            emit({"name": name, "runs": runs_seen, "on_path": on_path[name] / runs_seen,
+                  "mean_slack": sum(slack[name]) / runs_seen,
+                  "mean_duration": sum(durations[name]) / runs_seen})
+        return
+    if not walls:
+        print("No finished pipeline runs found.")
+        return
+
+    print(f"Job: {job_name} ({len(walls)} finished runs of #{numbers[-1]}-#{numbers[0]})")
+    print(f"Mean wall time: {format_duration(sum(walls) / len(walls))}  "
+          f"Mean critical path: {format_duration(sum(lengths) / len(lengths))}")
+    print(f"\n  {'Stage':<32} {'On path':<9} {'Mean slack':<12} {'Mean duration':<14}")
+    print("-" * 70)
+    for name in names:
+        runs_seen = len(durations[name])
+        print(f"  {name:<32} {100 * on_path[name] / runs_seen:>5.0f}%   "
+              f"{format_duration(sum(slack[name]) / runs_seen):<12} "
+              f"{format_duration(sum(durations[name]) / runs_seen):<14}")
+
+
 def start_build(job_name: str, params: Optional[list] = None) -> None:
     """Start a new build for a job."""
-    encoded_name = urllib.parse.quote(job_name, safe='')
+    job_url = job_path(job_name)
 
     if params:
-        path = f"job/{encoded_name}/buildWithParameters"
+        path = f"{job_url}/buildWithParameters"
         param_dict = {}
         for p in params:
             if "=" in p:
@@ -253,20 +3091,24 @@ def start_build(job_name: str, params: Optional[list] = None) -> None:
                 param_dict[key] = value
         data = urllib.parse.urlencode(param_dict).encode()
     else:
-        path = f"job/{encoded_name}/build"
+        path = f"{job_url}/build"
         data = None
 
     status, content = make_request(path, method="POST", data=data)
 
     if status in (200, 201, 302):
-        print(f"Build started successfully for job: {job_name}")
+        if not structured():
+            print(f"Build started successfully for job: {job_name}")
         # Get queue info
-        queue_path = f"job/{encoded_name}/api/json?tree=queueItem[id,why],lastBuild[number]"
+        queue_path = f"{job_url}/api/json?tree=queueItem[id,why],lastBuild[number]"
         q_status, q_content = make_request(queue_path)
+        record = {"job": job_name, "started": True}
         if q_status == 200:
             try:
-                q_data = json.loads(q_content)
-                if q_data.get("queueItem"):
+                q_data = _loads(q_content)
+                if structured():
+                    record.update(queueItem=q_data.get("queueItem"), lastBuild=q_data.get("lastBuild"))
+                elif q_data.get("queueItem"):
                     print(f"Queue ID: {q_data['queueItem'].get('id')}")
                     if q_data['queueItem'].get('why'):
                         print(f"Status: {q_data['queueItem']['why']}")
@@ -274,6 +3116,8 @@ def start_build(job_name: str, params: Optional[list] = None) -> None:
                     print(f"Last build number: #{q_data['lastBuild'].get('number')}")
             except json.JSONDecodeError:
                 pass
+        if structured():
+            emit(record)
     else:
         print(f"Error starting build ({status}): {content}", file=sys.stderr)
         sys.exit(1)
@@ -281,21 +3125,26 @@ def start_build(job_name: str, params: Optional[list] = None) -> None:
 
 def stop_build(job_name: str, build_number: str) -> None:
     """Stop a running build."""
-    encoded_name = urllib.parse.quote(job_name, safe='')
-    path = f"job/{encoded_name}/{build_number}/stop"
+    job_url = job_path(job_name)
+    path = f"{job_url}/{build_number}/stop"
 
     status, content = make_request(path, method="POST")
 
     if status in (200, 302):
-        print(f"Build #{build_number} stopped for job: {job_name}")
+        if structured():
+            emit({"job": job_name, "build": build_number, "stopped": True})
+        else:
+            print(f"Build #{build_number} stopped for job: {job_name}")
     else:
         print(f"Error stopping build ({status}): {content}", file=sys.stderr)
         sys.exit(1)
 
 
-def get_queue() -> None:
+def get_queue(fields: Optional[str] = None) -> None:
     """Get current build queue."""
-    path = "queue/api/json"
+    selected, narrowed = select_fields(QUEUE_FIELDS, fields)
+    path = f"queue/api/json?tree=items[{compile_tree(selected)}]"
+    extra = [f for f in selected if f not in QUEUE_FIELDS]
     status, content = make_request(path)
 
     if status != 200:
@@ -303,13 +3152,23 @@ def get_queue() -> None:
         sys.exit(1)
 
     try:
-        data = json.loads(content)
+        data = _loads(content)
         items = data.get("items", [])
 
+        if structured():
+            for item in items:
+                emit(item)
+            return
+
         if not items:
             print("Build queue is empty.")
             return
 
+        if narrowed:
+            for item in items:
+                print("  ".join(f"{f}={format_field(resolve_field(item, f))}" for f in selected))
+            return
+
         print(f"{'ID':<8} {'Job':<40} {'Why':<40}")
         print("-" * 90)
 
@@ -318,133 +3177,1084 @@ def get_queue() -> None:
             task = item.get("task", {})
             job_name = task.get("name", "Unknown")
             why = item.get("why", "N/A")[:40]
-            print(f"{item_id:<8} {job_name:<40} {why:<40}")
+            row = f"{item_id:<8} {job_name:<40} {why:<40}"
+            if extra:
+                row += " " + "  ".join(f"{f}={format_field(resolve_field(item, f))}" for f in extra)
+            print(row)
 
     except json.JSONDecodeError:
         print(f"Invalid JSON response: {content[:200]}", file=sys.stderr)
         sys.exit(1)
 
 
-def check_connection() -> None:
+def check_connection(fields: Optional[str] = None) -> None:
     """Check Jenkins connectivity and authentication."""
-    status, content = make_request("api/json?tree=mode,nodeDescription,useSecurity")
+    selected, narrowed = select_fields(CHECK_FIELDS, fields)
+    status, content = make_request(f"api/json?tree={compile_tree(selected)}")
 
+    # Keep --json/--ndjson output parseable; failures go to stderr there.
+    errors = sys.stderr if structured() else sys.stdout
     if status == 0:
-        print(f"Cannot connect to Jenkins at {JENKINS_URL}")
-        print(f"Error: {content}")
+        print(f"Cannot connect to Jenkins at {JENKINS_URL}", file=errors)
+        print(f"Error: {content}", file=errors)
         sys.exit(1)
     elif status == 401:
-        print(f"Authentication required. Set JENKINS_USER and JENKINS_TOKEN environment variables.")
+        print(f"Authentication required. Set JENKINS_USER and JENKINS_TOKEN environment variables.", file=errors)
         sys.exit(1)
     elif status == 403:
-        print(f"Access forbidden. Check your Jenkins credentials and permissions.")
+        print(f"Access forbidden. Check your Jenkins credentials and permissions.", file=errors)
         sys.exit(1)
     elif status != 200:
-        print(f"Unexpected response ({status}): {content[:200]}")
+        print(f"Unexpected response ({status}): {content[:200]}", file=errors)
         sys.exit(1)
 
     try:
-        data = json.loads(content)
+        data = _loads(content)
+        if structured():
+            emit({"url": JENKINS_URL, "connected": True, **data})
+            return
         print(f"Connected to Jenkins at {JENKINS_URL}")
+        if narrowed:
+            print_fields(data, selected)
+            return
         print(f"Mode: {data.get('mode', 'Unknown')}")
         print(f"Description: {data.get('nodeDescription', 'N/A')}")
         print(f"Security Enabled: {data.get('useSecurity', False)}")
+        print_fields(data, [f for f in selected if f not in CHECK_FIELDS])
     except json.JSONDecodeError:
         print(f"Connected to Jenkins at {JENKINS_URL}")
 
 
+def _escape_label_value(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _metric_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape_label_value(value)}"' for name, value in labels.items()) + "}"
+
+
+def render_metrics(families: list, openmetrics: bool = False) -> bytes:
+    """Render (name, type, help, [(labels, value), ...]) families in the text exposition format.
+
+    The OpenMetrics variant names counter families without their _total
+    suffix and ends with # EOF.
+    """
+    lines = []
+    for name, kind, help_text, samples in families:
+        family = name[:-len("_total")] if openmetrics and kind == "counter" else name
+        lines.append(f"# HELP {family} {help_text}")
+        lines.append(f"# TYPE {family} {kind}")
+        for labels, value in samples:
+            lines.append(f"{name}{_metric_labels(labels)} {value!r}")
+    if openmetrics:
+        lines.append("# EOF")
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def collect_metrics(depth: int) -> list:
+    """Fetch job, queue and executor state in three tree= queries and build metric families."""
+    tree = compile_tree(EXPORTER_JOB_FIELDS)
+    jobs = fetch_job_tree("", tree, depth) or walk_job_tree("", tree, depth)
+    (queue_status, queue_content), (computer_status, computer_content) = fetch_many([
+        f"queue/api/json?tree=items[{compile_tree(EXPORTER_QUEUE_FIELDS)}]",
+        f"computer/api/json?tree={compile_tree(EXPORTER_COMPUTER_FIELDS)}",
+    ])
+    for status, content in ((queue_status, queue_content), (computer_status, computer_content)):
+        if status != 200:
+            raise OSError(f"Error ({status}): {content[:200]}")
+    queue = _loads(queue_content).get("items", [])
+    computers = _loads(computer_content)
+    now = time.time()
+
+    colors, building, results, numbers, durations, timestamps = [], [], [], [], [], []
+    for job in jobs:
+        if job.get("folder"):
+            continue
+        labels = {"job": job["name"]}
+        color = job.get("color") or "notbuilt"
+        colors.append(({**labels, "color": color.removesuffix("_anime")}, 1))
+        building.append((labels, int(color.endswith("_anime"))))
+        last = job.get("lastCompletedBuild")
+        if last:
+            results.append(({**labels, "result": last.get("result") or "UNKNOWN"}, 1))
+            numbers.append((labels, last.get("number", 0)))
+            durations.append((labels, (last.get("duration") or 0) / 1000))
+            timestamps.append((labels, (last.get("timestamp") or 0) / 1000))
+
+    ages = [max(0.0, now - item["inQueueSince"] / 1000) for item in queue if item.get("inQueueSince")]
+    nodes = computers.get("computer", [])
+    node_executors, node_busy, node_offline = [], [], []
+    for node in nodes:
+        labels = {"node": node.get("displayName", "")}
+        executors = node.get("executors") or []
+        node_executors.append((labels, node.get("numExecutors", len(executors))))
+        node_busy.append((labels, sum(1 for executor in executors if not executor.get("idle", True))))
+        node_offline.append((labels, int(bool(node.get("offline")))))
+
+    return [
+        ("jenkins_job_color", "gauge", "Ball color of each job, without the _anime suffix (always 1).", colors),
+        ("jenkins_job_building", "gauge", "Whether a build of the job is running.", building),
+        ("jenkins_job_last_build_result", "gauge",
+         "Result of the last completed build (always 1).", results),
+        ("jenkins_job_last_build_number", "gauge", "Number of the last completed build.", numbers),
+        ("jenkins_job_last_build_duration_seconds", "gauge",
+         "Duration of the last completed build.", durations),
+        ("jenkins_job_last_build_timestamp_seconds", "gauge",
+         "Start time of the last completed build, as a Unix timestamp.", timestamps),
+        ("jenkins_queue_items", "gauge", "Items waiting in the build queue.", [({}, len(queue))]),
+        ("jenkins_queue_items_stuck", "gauge", "Queue items Jenkins reports as stuck.",
+         [({}, sum(1 for item in queue if item.get("stuck")))]),
+        ("jenkins_queue_items_blocked", "gauge", "Queue items blocked from starting.",
+         [({}, sum(1 for item in queue if item.get("blocked")))]),
+        ("jenkins_queue_oldest_item_age_seconds", "gauge", "Time the oldest queue item has waited.",
+         [({}, round(max(ages, default=0.0), 3))]),
+        ("jenkins_queue_item_age_seconds_sum", "gauge", "Total time all queue items have waited.",
+         [({}, round(sum(ages), 3))]),
+        ("jenkins_executors", "gauge", "Executors on all nodes.", [({}, computers.get("totalExecutors", 0))]),
+        ("jenkins_executors_busy", "gauge", "Executors running a build.", [({}, computers.get("busyExecutors", 0))]),
+        ("jenkins_nodes", "gauge", "Nodes attached to the controller.", [({}, len(nodes))]),
+        ("jenkins_nodes_offline", "gauge", "Nodes that are offline.",
+         [({}, sum(1 for node in nodes if node.get("offline")))]),
+        ("jenkins_node_executors", "gauge", "Executors per node.", node_executors),
+        ("jenkins_node_executors_busy", "gauge", "Busy executors per node.", node_busy),
+        ("jenkins_node_offline", "gauge", "Whether the node is offline.", node_offline),
+    ]
+
+
+class MetricsExporter:
+    """Controller state refreshed on a background thread, pre-rendered for scrapes.
+
+    Every refresh renders both exposition formats, plain and gzipped, so a
+    scrape only copies bytes from memory and never reaches Jenkins. When a
+    refresh fails the previous controller metrics are kept and jenkins_up
+    drops to 0.
+    """
+
+    def __init__(self, interval: float = EXPORTER_INTERVAL, depth: int = LIST_MAX_DEPTH, trace: bool = False):
+        self.interval = interval
+        self.depth = depth
+        self.trace = trace
+        self.families = []
+        self.bodies = {}  # (openmetrics, gzipped) -> bytes
+        self.refresh_errors = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def refresh(self) -> None:
+        start = time.perf_counter()
+        up = 1
+        tracer = RequestTracer(verbose=self.trace)
+        token = TRACER.set(tracer)  # a fresh tracer per refresh, so traces do not pile up
+        budget_token = RETRY_BUDGET_LEFT.set(RetryBudget())
+        try:
+            self.families = collect_metrics(self.depth)
+        except Exception as e:
+            up = 0
+            self.refresh_errors += 1
+            print(f"{time.strftime('%Y-%m-%d %H:%M:%S')} Refresh failed: {e}; keeping the previous metrics",
+                  file=sys.stderr, flush=True)
+        finally:
+            TRACER.reset(token)
+            RETRY_BUDGET_LEFT.reset(budget_token)
+        if self.trace:
+            print(tracer.summary(), file=sys.stderr, flush=True)
+        families = [
+            ("jenkins_up", "gauge", "Whether the last refresh from Jenkins succeeded.", [({}, up)]),
+            *self.families,
+            ("jenkins_exporter_refresh_timestamp_seconds", "gauge", "Time of the last refresh.",
+             [({}, round(time.time(), 3))]),
+            ("jenkins_exporter_refresh_duration_seconds", "gauge", "Time the last refresh took.",
+             [({}, round(time.perf_counter() - start, 6))]),
+            ("jenkins_exporter_refresh_errors_total", "counter", "Refreshes that failed.",
+             [({}, self.refresh_errors)]),
+        ]
+        bodies = {}
+        for openmetrics in (False, True):
+            body = render_metrics(families, openmetrics)
+            bodies[openmetrics, False] = body
+            bodies[openmetrics, True] = zlib.compress(body, 6, wbits=16 + zlib.MAX_WBITS)
+        with self._lock:
+            self.bodies = bodies
+
+    def body(self, openmetrics: bool, gzipped: bool) -> bytes:
+        with self._lock:
+            return self.bodies[openmetrics, gzipped]
+
+    def run(self) -> None:
+        """Refresh every interval seconds (measured start to start) until stopped."""
+        elapsed = 0.0
+        while not self._stop.wait(max(0.0, self.interval - elapsed)):
+            started = time.monotonic()
+            self.refresh()
+            elapsed = time.monotonic() - started
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+def run_exporter(host: str, port: int, interval: float, depth: int, trace: bool = False) -> None:
+    """Serve /metrics from a MetricsExporter until interrupted."""
+    import http.server
+
+    exporter = MetricsExporter(interval, depth, trace)
+
+    class MetricsHandler(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            if self.path.split("?", 1)[0] != "/metrics":
+                body = b"Jenkins exporter: metrics are at /metrics\n"
+                self.send_response(200 if self.path == "/" else 404)
+                self.send_header("Content-Type", "text/plain; charset=utf-8")
+            else:
+                openmetrics = "application/openmetrics-text" in self.headers.get("Accept", "")
+                gzipped = "gzip" in self.headers.get("Accept-Encoding", "")
+                body = exporter.body(openmetrics, gzipped)
+                self.send_response(200)
+                self.send_header("Content-Type", "application/openmetrics-text; version=1.0.0; charset=utf-8"
+                                 if openmetrics else "text/plain; version=0.0.4; charset=utf-8")
+                if gzipped:
+                    self.send_header("Content-Encoding", "gzip")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # one line per scrape would drown out refresh errors
+
+    try:
+        server = http.server.ThreadingHTTPServer((host, port), MetricsHandler)
+    except OSError as e:
+        print(f"Error: cannot listen on {host}:{port}: {e.strerror or e}", file=sys.stderr)
+        sys.exit(1)
+    server.daemon_threads = True
+    exporter.refresh()  # so the first scrape already has data
+    preload_modules()  # the refresh thread uses asyncio
+    refresher = threading.Thread(target=exporter.run, name="exporter-refresh", daemon=True)
+    refresher.start()
+    print(f"Serving metrics on http://{host}:{server.server_address[1]}/metrics "
+          f"(refreshing every {interval:g}s)", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        exporter.stop()
+        server.server_close()
+
+
+class _ThreadLocalStream:
+    """Stand-in for sys.stdout/sys.stderr that writes to a per-thread stream when one is set.
+
+    The daemon runs each client's command on its own thread and points that
+    thread's output at the client's socket; other threads keep the default.
+    """
+
+    def __init__(self, default):
+        self._default = default
+        self._local = threading.local()
+
+    def redirect(self, stream) -> None:
+        self._local.stream = stream
+
+    def _target(self):
+        return getattr(self._local, "stream", None) or self._default
+
+    def write(self, text):
+        return self._target().write(text)
+
+    def flush(self) -> None:
+        self._target().flush()
+
+    def __getattr__(self, name):
+        return getattr(self._target(), name)
+
+
+class _FrameWriter(io.RawIOBase):
+    """Raw binary stream that sends each write to the daemon client as one frame.
+
+    A frame is a kind byte (o: stdout, e: stderr, x: exit status, r: refused)
+    followed by a 4-byte big-endian length and the payload.
+    """
+
+    def __init__(self, sock: socket.socket, kind: bytes, lock: threading.Lock, before=None):
+        self._sock = sock
+        self._kind = kind
+        self._lock = lock
+        self._before = before
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        if self._before:
+            self._before()  # keep stdout ahead of stderr, as on a terminal
+        _send_frame(self._sock, self._kind, bytes(data), self._lock)
+        return len(data)
+
+
+def _send_frame(sock: socket.socket, kind: bytes, payload: bytes, lock: threading.Lock) -> None:
+    with lock:
+        sock.sendall(kind + len(payload).to_bytes(4, "big") + payload)
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("daemon closed the connection")
+        data += chunk
+    return bytes(data)
+
+
+def script_path() -> str:
+    """Path that runs this CLI: the script itself, or the zipapp it was loaded from."""
+    path = os.path.abspath(__file__)
+    return path if os.path.isfile(path) else os.path.abspath(sys.argv[0])
+
+
+def daemon_fingerprint() -> str:
+    """Identify the credentials, cache and script a daemon was started with."""
+    try:
+        st = os.stat(script_path())
+        script = f"{st.st_mtime_ns}:{st.st_size}"
+    except OSError:
+        script = ""
+    key = "\0".join([JENKINS_URL.rstrip("/"), JENKINS_USER, JENKINS_TOKEN, CACHE_DIR, script])
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+def _daemon_call(request: dict, timeout: Optional[float] = None) -> socket.socket:
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(DAEMON_SOCKET)
+        sock.sendall(json.dumps(request).encode("utf-8") + b"\n")
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+def daemon_alive() -> bool:
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(2)
+            sock.connect(DAEMON_SOCKET)
+        return True
+    except OSError:
+        return False
+
+
+def forward_to_daemon(argv: list) -> Optional[int]:
+    """Run a command in the daemon, relaying its output; None means run it directly.
+
+    Commands are run directly when no daemon is listening, when it was
+    started with other credentials or another version of this script, and
+    for --stats, whose transfer totals are per process, and --no-cache,
+    which must also skip the daemon's response cache, or when JENKINS_TRACE
+    asks for tracing that the daemon's environment may not. Options cannot
+    be abbreviated, so matching them exactly is enough.
+    """
+    if (os.environ.get("JENKINS_CLI_NO_DAEMON") or os.environ.get("JENKINS_TRACE") or not argv
+            or argv[0] in DAEMON_LOCAL_COMMANDS or "--stats" in argv or "--no-cache" in argv
+            or not os.path.exists(DAEMON_SOCKET)):
+        return None
+    try:
+        sock = _daemon_call({"argv": argv, "cwd": os.getcwd(), "fingerprint": daemon_fingerprint()})
+    except OSError:
+        return None
+
+    outputs = {b"o": sys.stdout.buffer, b"e": sys.stderr.buffer}
+    received = False
+    with sock:
+        try:
+            while True:
+                header = _recv_exact(sock, 5)
+                received = True
+                kind, payload = header[:1], _recv_exact(sock, int.from_bytes(header[1:], "big"))
+                if kind == b"r":
+                    return None
+                if kind == b"x":
+                    return int(payload)
+                outputs[kind].write(payload)
+                outputs[kind].flush()
+        except BrokenPipeError:
+            return 0  # reader went away (e.g. piped into head); stop quietly
+        except (OSError, ValueError) as e:
+            if not received and isinstance(e, ConnectionError):
+                return None  # dropped before running anything, e.g. while stopping
+            print(f"Error: lost connection to daemon: {e}", file=sys.stderr)
+            return 1
+
+
+class _DaemonHandler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        try:
+            request = json.loads(self.rfile.readline())
+        except (ValueError, OSError):
+            return
+        server = self.server
+        server.last_activity = time.monotonic()
+        lock = threading.Lock()
+        control = request.get("control")
+        try:
+            if control:
+                text = server.control(control, request.get("fingerprint"))
+                _send_frame(self.connection, b"o", text.encode("utf-8"), lock)
+                _send_frame(self.connection, b"x", b"0", lock)
+                return
+            if request.get("fingerprint") != server.fingerprint:
+                _send_frame(self.connection, b"r", b"", lock)
+                return
+        except OSError:
+            return
+
+        out = io.TextIOWrapper(io.BufferedWriter(_FrameWriter(self.connection, b"o", lock), CHUNK_SIZE),
+                               encoding="utf-8", errors="replace")
+        err = io.TextIOWrapper(_FrameWriter(self.connection, b"e", lock, before=out.flush),
+                               encoding="utf-8", errors="replace", write_through=True)
+        sys.stdout.redirect(out)
+        sys.stderr.redirect(err)
+        with server.lock:
+            server.active += 1
+            server.served += 1
+        try:
+            code = run_forwarded(server.parser, request.get("argv", []), request.get("cwd", "/"))
+            out.flush()
+            _send_frame(self.connection, b"x", str(code).encode(), lock)
+        except OSError:
+            pass  # client went away
+        finally:
+            sys.stdout.redirect(None)
+            sys.stderr.redirect(None)
+            with server.lock:
+                server.active -= 1
+            server.last_activity = time.monotonic()
+
+
+def run_forwarded(parser: argparse.ArgumentParser, argv: list, cwd: str) -> int:
+    """Parse and run one client command on the current thread; returns its exit status."""
+    try:
+        args = parser.parse_args(argv)
+        if not args.command:
+            parser.print_help()
+            return 0
+        # The daemon's working directory is not the client's.
+        for attr in ("output", "db"):
+            value = getattr(args, attr, None)
+            if value and not os.path.isabs(value):
+                setattr(args, attr, os.path.join(cwd, value))
+        run_command(args)
+        return 0
+    except SystemExit as e:
+        if e.code is None or isinstance(e.code, int):
+            return e.code or 0
+        print(e.code, file=sys.stderr)
+        return 1
+    except OSError as e:
+        if isinstance(e, (BrokenPipeError, ConnectionResetError)):
+            raise
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    except Exception:
+        import traceback
+        traceback.print_exc()
+        return 1
+
+
+class DaemonServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Unix-socket server running forwarded commands on threads that share one pool and cache."""
+
+    daemon_threads = True
+
+    def __init__(self, path: str, parser: argparse.ArgumentParser):
+        self.parser = parser
+        self.fingerprint = daemon_fingerprint()
+        self.started = time.time()
+        self.last_activity = time.monotonic()
+        self.lock = threading.Lock()
+        self.active = 0
+        self.served = 0
+        self.handlers = 0
+        self.stopping = False
+        super().__init__(path, _DaemonHandler)
+        os.chmod(path, 0o600)
+
+    def process_request(self, request, client_address) -> None:
+        with self.lock:
+            self.handlers += 1
+        super().process_request(request, client_address)
+
+    def process_request_thread(self, request, client_address) -> None:
+        try:
+            super().process_request_thread(request, client_address)
+        finally:
+            with self.lock:
+                self.handlers -= 1
+
+    def stop_listening(self) -> None:
+        """Remove the socket and stop accepting, so new clients run their commands directly.
+
+        Shutting the listening socket down also wakes handle_request, and
+        clients still waiting in the backlog are reset before anything is
+        sent to them.
+        """
+        with self.lock:
+            if self.stopping:
+                return
+            self.stopping = True
+        try:
+            os.unlink(DAEMON_SOCKET)
+        except OSError:
+            pass
+        try:
+            self.socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    def control(self, action: str, fingerprint: Optional[str]) -> str:
+        if action == "stop":
+            self.stop_listening()
+            return f"Daemon {os.getpid()} stopping\n"
+        cache = RESPONSE_CACHE
+        lookups = cache.hits + cache.misses
+        return (f"Daemon running (pid {os.getpid()}, socket {DAEMON_SOCKET})\n"
+                f"Uptime: {format_duration(time.time() - self.started)}\n"
+                f"Commands: {self.served} served, {self.active} active\n"
+                f"Response cache: {len(cache._entries)} entries, {cache.size} bytes, "
+                f"{cache.hits}/{lookups} hits, {cache.ttl:g}s TTL\n"
+                + ("" if fingerprint == self.fingerprint else
+                   "Started with other credentials or script version; commands run directly\n"))
+
+    def run(self) -> None:
+        """Serve until stopped or idle for DAEMON_IDLE_TIMEOUT seconds, then let accepted commands finish."""
+        self.timeout = 1.0
+        try:
+            while not self.stopping:
+                self.handle_request()
+                if not self.active and time.monotonic() - self.last_activity > DAEMON_IDLE_TIMEOUT:
+                    break
+        finally:
+            self.stop_listening()
+            while self.handlers:
+                time.sleep(0.05)
+            self.server_close()
+
+
+def serve_daemon(parser: argparse.ArgumentParser) -> None:
+    """Run the daemon in the foreground."""
+    global RESPONSE_CACHE
+    os.makedirs(os.path.dirname(DAEMON_SOCKET) or ".", exist_ok=True)
+    if os.path.exists(DAEMON_SOCKET):
+        if daemon_alive():
+            print(f"Daemon already running on {DAEMON_SOCKET}", file=sys.stderr)
+            sys.exit(1)
+        os.unlink(DAEMON_SOCKET)  # left behind by a daemon that died
+
+    RESPONSE_CACHE = ResponseCache()
+    preload_modules()
+    sys.stdout = _ThreadLocalStream(sys.stdout)
+    sys.stderr = _ThreadLocalStream(sys.stderr)
+    server = DaemonServer(DAEMON_SOCKET, parser)
+    print(f"Daemon {os.getpid()} listening on {DAEMON_SOCKET}", flush=True)
+    server.run()
+
+
+def daemon_command(action: str, parser: argparse.ArgumentParser) -> None:
+    """Start, stop, query or run the background daemon."""
+    if action == "run":
+        serve_daemon(parser)
+        return
+
+    if action == "start":
+        if daemon_alive():
+            print(f"Daemon already running on {DAEMON_SOCKET}")
+            return
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        log_path = os.path.join(CACHE_DIR, "daemon.log")
+        with open(log_path, "ab") as log:
+            process = subprocess.Popen([sys.executable, script_path(), "daemon", "run"],
+                                       stdin=subprocess.DEVNULL, stdout=log, stderr=log,
+                                       start_new_session=True)
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                print(f"Daemon exited with status {process.returncode}; see {log_path}", file=sys.stderr)
+                sys.exit(1)
+            if daemon_alive():
+                print(f"Daemon started (pid {process.pid}) on {DAEMON_SOCKET}")
+                return
+            time.sleep(0.05)
+        print(f"Daemon did not come up within 10s; see {log_path}", file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        with _daemon_call({"control": action, "fingerprint": daemon_fingerprint()}, timeout=10) as sock:
+            header = _recv_exact(sock, 5)
+            sys.stdout.write(_recv_exact(sock, int.from_bytes(header[1:], "big")).decode("utf-8"))
+    except OSError:  # includes a daemon that closed the connection while stopping
+        print("Daemon not running")
+        if action == "status":
+            sys.exit(1)
+
+
+def batch_argv(parser: argparse.ArgumentParser, request: dict) -> list:
+    """Turn a batch request into command-line arguments.
+
+    Either "args" holds the arguments after the command, or the other keys
+    name the command's options and positionals by their destinations
+    (dashes or underscores), e.g. {"cmd": "log", "job": "x", "build": "42", "tail": 50}.
+    """
+    command = request.get("cmd")
+    subcommands = next(a for a in parser._actions if isinstance(a, argparse._SubParsersAction)).choices
+    if command not in subcommands or command in DAEMON_LOCAL_COMMANDS:
+        raise ValueError(f"unknown or unsupported command: {command!r}")
+    if "args" in request:
+        if not isinstance(request["args"], list):
+            raise ValueError('"args" must be a list')
+        return [command] + [str(arg) for arg in request["args"]]
+
+    values = {key.replace("-", "_"): value for key, value in request.items() if key not in ("cmd", "id")}
+    actions = [action for action in subcommands[command]._actions if action.dest != "help"]
+    dests = {action.dest for action in actions}
+    if "target" in dests and "target" not in values and "job" in values:
+        # build-info takes JOB#BUILD targets; accept the job/build keys the other commands use
+        values["target"] = [f"{values.pop('job')}#{values.pop('build', 'lastBuild')}"]
+    unknown = set(values) - dests
+    if unknown:
+        raise ValueError(f"unknown keys for {command}: {', '.join(sorted(unknown))}")
+
+    options, positionals = [], []
+    for action in actions:
+        value = values.get(action.dest)
+        if value is None:
+            continue
+        items = value if isinstance(value, list) else [value]
+        if not action.option_strings:
+            positionals.extend(str(item) for item in items)
+        elif isinstance(action, argparse.BooleanOptionalAction):
+            options.append(action.option_strings[0 if value else 1])
+        elif isinstance(action, argparse._StoreConstAction) and not isinstance(action.const, bool):
+            if value == action.const:  # e.g. {"format": "ndjson"}
+                options.append(max(action.option_strings, key=len))
+        elif action.nargs == 0:
+            if value:
+                options.append(max(action.option_strings, key=len))
+        else:
+            for item in items:
+                options.extend([max(action.option_strings, key=len), str(item)])
+    return [command] + options + (["--"] + positionals if positionals else [])
+
+
+def run_batch(parser: argparse.ArgumentParser, concurrency: int = CONCURRENCY) -> None:
+    """Run JSONL commands from stdin concurrently, writing one NDJSON result per command.
+
+    Results are written as commands finish, each tagged with the request's
+    "id" (its line number when absent). All commands share this process's
+    connection pool and caches; their output is captured per thread. A
+    command run with --json or --ndjson reports "records" instead of "stdout".
+    """
+    preload_modules()
+    real_stdout, real_stderr = sys.stdout, sys.stderr
+    cwd = os.getcwd()
+    failures = 0
+
+    def run(argv: list) -> tuple:
+        out = io.TextIOWrapper(io.BytesIO(), encoding="utf-8", errors="replace")
+        err = io.TextIOWrapper(io.BytesIO(), encoding="utf-8", errors="replace")
+        sys.stdout.redirect(out)
+        sys.stderr.redirect(err)
+        try:
+            code = run_forwarded(parser, argv, cwd)
+        finally:
+            sys.stdout.redirect(None)
+            sys.stderr.redirect(None)
+        out.flush()
+        err.flush()
+        result = {"exit": code, "stdout": out.buffer.getvalue().decode("utf-8", errors="replace"),
+                  "stderr": err.buffer.getvalue().decode("utf-8", errors="replace")}
+        if "--ndjson" in argv or "--json" in argv:
+            text = result.pop("stdout")
+            try:
+                result["records"] = (json.loads(text or "[]") if "--json" in argv else
+                                     [json.loads(line) for line in text.splitlines() if line])
+            except json.JSONDecodeError:
+                result["stdout"] = text
+        return result
+
+    def write_result(request_id, result: dict) -> None:
+        nonlocal failures
+        failures += result["exit"] != 0
+        real_stdout.write(json.dumps({"id": request_id, **result}) + "\n")
+        real_stdout.flush()
+
+    pending = {}
+    sys.stdout = _ThreadLocalStream(real_stdout)
+    sys.stderr = _ThreadLocalStream(real_stderr)
+    try:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+            for line_no, line in enumerate(sys.stdin, 1):
+                if not line.strip():
+                    continue
+                request_id = line_no
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError("expected a JSON object")
+                    request_id = request.get("id", line_no)
+                    argv = batch_argv(parser, request)
+                except ValueError as e:
+                    write_result(request_id, {"exit": 2, "stdout": "", "stderr": f"Error: {e}\n"})
+                    continue
+                pending[executor.submit(run, argv)] = request_id
+                if len(pending) >= concurrency * 4:
+                    done, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                    for future in done:
+                        write_result(pending.pop(future), future.result())
+            for future in concurrent.futures.as_completed(pending):
+                write_result(pending[future], future.result())
+    finally:
+        sys.stdout, sys.stderr = real_stdout, real_stderr
+
+    if failures:
+        sys.exit(1)
+
+
 def main():
+    argv = sys.argv[1:]
+    code = forward_to_daemon(argv)
+    if code is not None:
+        sys.exit(code)
+
+    parser = create_parser(argv[0] if argv else None)
+    args = parser.parse_args(argv)
+
+    if not args.command:
+        parser.print_help()
+        sys.exit(0)
+
+    try:
+        run_command(args, parser)
+    finally:
+        if args.stats:
+            print(f"Transfer: {TRANSFER_STATS.summary()}", file=sys.stderr)
+
+
+class _SkippedParser:
+    """Stand-in for subcommands that are not being run, so their arguments are never built."""
+
+    def add_argument(self, *args, **kwargs) -> None:
+        pass
+
+
+def create_parser(command: Optional[str] = None) -> argparse.ArgumentParser:
+    """Build the CLI parser; with a command name, only that subcommand's arguments are built."""
+    # No abbreviated options: forward_to_daemon matches --stats and --no-cache exactly.
     parser = argparse.ArgumentParser(
-        description="Jenkins CLI for Claude Code",
+        description="Jenkins CLI for Claude Code", allow_abbrev=False,
         formatter_class=argparse.RawDescriptionHelpFormatter,
         epilog="""
 Examples:
   %(prog)s list                          List all jobs
   %(prog)s list --folder MyFolder        List jobs in a folder
+  %(prog)s list -f A -f B                List jobs in several folders
+  %(prog)s list --recursive              List jobs in all nested folders
   %(prog)s info my-job                   Get job details
+  %(prog)s info my-job --fields +color   Add a field to the default output
+  %(prog)s build-info my-job 42 --fields result,duration
+                                         Fetch and print only these fields
+  %(prog)s info 'deploy-*' api-gateway    Get details for several jobs at once
   %(prog)s build-info my-job 42          Get build #42 info
+  %(prog)s build-info a#42 b#lastBuild   Get several builds at once
+  %(prog)s history my-job --since 7d     List builds from the last week
+  %(prog)s stats my-job --last 200       Duration percentiles and trend
+  %(prog)s sync --recursive              Mirror build metadata into SQLite
+  %(prog)s search "OutOfMemoryError" -j my-job --last 50
+                                         Find builds whose log contains a string
   %(prog)s log my-job 42                 Get build log
   %(prog)s log my-job 42 --tail 50       Get last 50 lines
+  %(prog)s log my-job 42 --follow        Stream output until the build ends
+  %(prog)s log my-job 42 -o build.log    Save the log to a file
   %(prog)s pipeline my-job 42            Get pipeline stages
+  %(prog)s pipeline my-job 42 --failed-only
+                                         Show step logs of failed stages
+  %(prog)s critical-path my-job --last 20
+                                         Stages most often on the critical path
   %(prog)s start my-job                  Start a build
   %(prog)s start my-job -p KEY=VALUE     Start with parameters
   %(prog)s stop my-job 42                Stop build #42
   %(prog)s queue                         Show build queue
   %(prog)s check                         Check connection
+  %(prog)s daemon start                  Keep a warm background process for later calls
+  %(prog)s batch < commands.jsonl        Run many commands, e.g. {"cmd": "info", "job": ["x"]}
+  %(prog)s exporter --port 9118          Serve job, queue and executor metrics to Prometheus
+  %(prog)s list --ndjson                 One JSON record per job, streamed
+  %(prog)s info my-job --trace           Time every request (DNS, connect, TTFB, total)
+
+Faster startup: tools/build_zipapp.py builds a precompiled jenkins_cli.pyz
+that takes the same arguments; tools/startup_bench.py measures cold start.
+Offline benchmarks: tools/bench.py times every command against the fake
+controller in tools/mock_jenkins.py.
 
 Environment Variables:
   JENKINS_URL    Jenkins server URL (default: http://XXX.XXX.XXX.XXX:PORT)
   JENKINS_USER   Username for authentication
   JENKINS_TOKEN  API token or password
+  JENKINS_POOL_SIZE          Max persistent connections per host (default: 8)
+  JENKINS_CONCURRENCY        Max requests in flight for multi-target commands (default: 8)
+  JENKINS_RETRIES            Retries of a failed GET, 0 to disable (default: 3)
+  JENKINS_RETRY_BASE         First backoff bound in seconds, doubled per retry (default: 0.5)
+  JENKINS_RETRY_MAX          Longest wait before a retry, Retry-After included (default: 30)
+  JENKINS_RETRY_BUDGET       Retries per command across all requests (default: 10)
+  JENKINS_TREE_MAX_MB        Largest single nested listing before list --recursive
+                             walks folders level by level instead (default: 8)
+  JENKINS_CACHE_DIR          Cache directory (default: ~/.cache/jenkins-cli)
+  JENKINS_CACHE_MAX_MB       Size budget of the finished-build cache (default: 512)
+  JENKINS_NO_CACHE           Set to disable the finished-build cache
+  JENKINS_DB                 SQLite file written by sync (default: <cache dir>/builds.db)
+  JENKINS_POOL_IDLE_TIMEOUT  Seconds before an idle connection is closed (default: 60)
+  JENKINS_DAEMON_SOCKET      Daemon socket (default: $XDG_RUNTIME_DIR or cache dir/jenkins-cli.sock)
+  JENKINS_DAEMON_IDLE_TIMEOUT  Seconds before an unused daemon exits (default: 1800)
+  JENKINS_DAEMON_CACHE_TTL   Seconds the daemon reuses a GET response (default: 5)
+  JENKINS_CLI_NO_DAEMON      Set to always run commands in-process
+  JENKINS_TRACE              Set to trace requests on every run, as with --trace
         """
     )
 
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--stats", action="store_true",
+                        help="Print bytes on wire versus decoded bytes to stderr")
+    common.add_argument("--no-cache", action="store_true",
+                        help="Bypass the on-disk build cache and stored validators")
+    common.add_argument("--trace", action="store_true", default=bool(os.environ.get("JENKINS_TRACE")),
+                        help="Print each request's status, bytes and DNS/connect/TTFB/total time to "
+                             "stderr, then a summary")
+    output = common.add_mutually_exclusive_group()
+    output.add_argument("--json", dest="format", action="store_const", const="json", default="text",
+                        help="Print records as one JSON array instead of text")
+    output.add_argument("--ndjson", dest="format", action="store_const", const="ndjson",
+                        help="Print one JSON record per line as soon as it is available")
+
+    projection = argparse.ArgumentParser(add_help=False)
+    projection.add_argument("--fields", metavar="FIELDS",
+                            help="Comma-separated dotted fields to fetch (e.g. lastBuild.result); "
+                                 "prefix each with + to add to the default fields instead")
+
     subparsers = parser.add_subparsers(dest="command", help="Available commands")
+    build_all = not command or command.startswith("-") or command in ("batch", "daemon")
+
+    def add_command(name: str, parents: list, help: str):
+        if build_all or name == command:
+            return subparsers.add_parser(name, parents=parents, help=help, allow_abbrev=False)
+        subparsers.add_parser(name, help=help, add_help=False)  # still a valid choice in usage errors
+        return _SkippedParser()
 
     # List jobs
-    list_parser = subparsers.add_parser("list", help="List all jobs")
-    list_parser.add_argument("--folder", "-f", help="Folder name to list jobs from")
+    list_parser = add_command("list", parents=[common, projection], help="List all jobs")
+    list_parser.add_argument("--folder", "-f", action="append",
+                             help="Folder name to list jobs from (repeat to fetch several concurrently)")
+    list_parser.add_argument("--recursive", "-r", action="store_true",
+                             help="Include jobs in nested folders, printed by full path")
+    list_parser.add_argument("--depth", type=int, default=LIST_MAX_DEPTH,
+                             help=f"Folder levels to descend with --recursive (default: {LIST_MAX_DEPTH})")
 
     # Job info
-    info_parser = subparsers.add_parser("info", help="Get job information")
-    info_parser.add_argument("job", help="Job name")
+    info_parser = add_command("info", parents=[common, projection], help="Get job information")
+    info_parser.add_argument("job", nargs="+", help="Job name or glob pattern (several allowed)")
 
     # Build info
-    build_parser = subparsers.add_parser("build-info", help="Get build information")
-    build_parser.add_argument("job", help="Job name")
-    build_parser.add_argument("build", help="Build number (or 'lastBuild')")
+    build_parser = add_command("build-info", parents=[common, projection], help="Get build information")
+    build_parser.add_argument("target", nargs="+", metavar="JOB#BUILD",
+                              help="Builds to show: JOB BUILD, or any number of JOB#BUILD "
+                                   "(JOB may be a glob, BUILD defaults to lastBuild)")
+
+    # Build history
+    history_parser = add_command("history", parents=[common, projection],
+                                           help="List a job's builds, newest first")
+    history_parser.add_argument("job", help="Job name")
+    history_parser.add_argument("--limit", "-n", type=int, help="Show at most N builds")
+    history_parser.add_argument("--since", type=parse_since,
+                                help="Only builds started after this (e.g. 12h, 7d, 2024-05-01)")
+    history_parser.add_argument("--page-size", type=int, default=HISTORY_PAGE_SIZE,
+                                help=f"Builds fetched per request (default: {HISTORY_PAGE_SIZE})")
+
+    # Duration statistics
+    stats_parser = add_command("stats", parents=[common],
+                                         help="Duration percentiles, success rate and trend")
+    stats_parser.add_argument("job", help="Job name")
+    stats_parser.add_argument("--last", "-n", type=int, default=HISTORY_PAGE_SIZE,
+                              help=f"Number of recent builds to analyse (default: {HISTORY_PAGE_SIZE})")
+    stats_parser.add_argument("--window", "-w", type=int, default=10,
+                              help="Rolling window size for the trend (default: 10)")
+    stats_parser.add_argument("--threshold", type=float, default=3.0,
+                              help="Flag builds whose robust z-score exceeds this (default: 3)")
+    stats_parser.add_argument("--numpy", action=argparse.BooleanOptionalAction, default=None,
+                              help=f"Force or disable the NumPy path (default: used when installed "
+                                   f"and there are at least {STATS_NUMPY_MIN_BUILDS} builds)")
+
+    # Warehouse sync
+    sync_parser = add_command("sync", parents=[common],
+                                        help="Mirror build metadata into a local SQLite database")
+    sync_parser.add_argument("job", nargs="*", help="Jobs or glob patterns to sync (default: all jobs)")
+    sync_parser.add_argument("--db", default=WAREHOUSE_PATH,
+                             help=f"SQLite file to write (default: {WAREHOUSE_PATH})")
+    sync_parser.add_argument("--recursive", "-r", action="store_true",
+                             help="When syncing all jobs, include jobs in nested folders")
+    sync_parser.add_argument("--concurrency", "-c", type=int, default=CONCURRENCY,
+                             help=f"Max requests in flight (default: {CONCURRENCY})")
+
+    # Log search
+    search_parser = add_command("search", parents=[common],
+                                          help="Search console logs of recent builds")
+    search_parser.add_argument("pattern", help="Text to search for (a regex with --regex)")
+    search_parser.add_argument("--job", "-j", action="append",
+                               help="Job name or glob pattern; repeatable (default: all top-level jobs)")
+    search_parser.add_argument("--last", "-n", type=int, default=20,
+                               help="Number of recent builds per job to search (default: 20)")
+    search_parser.add_argument("--regex", "-E", action="store_true", help="Treat the pattern as a regex")
+    search_parser.add_argument("--ignore-case", "-i", action="store_true", help="Case-insensitive match")
+    search_parser.add_argument("--max-count", "-m", type=int, default=3,
+                               help="Matching lines to show per build (default: 3)")
+    search_parser.add_argument("--concurrency", "-c", type=int, default=CONCURRENCY,
+                               help=f"Logs read in parallel (default: {CONCURRENCY})")
 
     # Console log
-    log_parser = subparsers.add_parser("log", help="Get build console log")
+    log_parser = add_command("log", parents=[common], help="Get build console log")
     log_parser.add_argument("job", help="Job name")
     log_parser.add_argument("build", help="Build number (or 'lastBuild')")
     log_parser.add_argument("--tail", "-t", type=int, help="Show only last N lines")
+    log_parser.add_argument("--follow", "-f", action="store_true",
+                            help="Keep printing new output until the build finishes")
+    log_parser.add_argument("--output", "-o", metavar="FILE",
+                            help="Write the log to FILE instead of stdout")
 
     # Pipeline log
-    pipeline_parser = subparsers.add_parser("pipeline", help="Get pipeline stages and status")
+    pipeline_parser = add_command("pipeline", parents=[common], help="Get pipeline stages and status")
     pipeline_parser.add_argument("job", help="Job name")
     pipeline_parser.add_argument("build", help="Build number (or 'lastBuild')")
+    pipeline_parser.add_argument("--logs", action="store_true", help="Also print the step logs of each stage")
+    pipeline_parser.add_argument("--failed-only", action="store_true",
+                                 help="Print step logs of failed, unstable or aborted stages only")
+
+    # Critical path
+    critical_parser = add_command("critical-path", parents=[common],
+                                            help="Find the stages that determine pipeline wall time")
+    critical_parser.add_argument("job", help="Job name")
+    critical_parser.add_argument("build", nargs="?", default="lastBuild",
+                                 help="Build number (default: lastBuild)")
+    critical_parser.add_argument("--last", "-n", type=int, default=1,
+                                 help="Aggregate over this many runs ending at BUILD (default: 1)")
 
     # Start build
-    start_parser = subparsers.add_parser("start", help="Start a new build")
+    start_parser = add_command("start", parents=[common], help="Start a new build")
     start_parser.add_argument("job", help="Job name")
     start_parser.add_argument("-p", "--param", action="append", help="Build parameter (KEY=VALUE)")
 
     # Stop build
-    stop_parser = subparsers.add_parser("stop", help="Stop a running build")
+    stop_parser = add_command("stop", parents=[common], help="Stop a running build")
     stop_parser.add_argument("job", help="Job name")
     stop_parser.add_argument("build", help="Build number")
 
     # Queue
-    subparsers.add_parser("queue", help="Show build queue")
+    add_command("queue", parents=[common, projection], help="Show build queue")
 
     # Check connection
-    subparsers.add_parser("check", help="Check Jenkins connection")
+    add_command("check", parents=[common, projection], help="Check Jenkins connection")
 
-    args = parser.parse_args()
+    # Daemon
+    daemon_parser = add_command("daemon", parents=[common],
+                                          help="Manage the background daemon that keeps connections warm")
+    daemon_parser.add_argument("action", choices=["start", "stop", "status", "run"],
+                               help="run serves in the foreground; start launches it in the background")
+
+    # Batch
+    batch_parser = add_command("batch", parents=[common],
+                                         help="Run JSON commands from stdin, one per line, printing NDJSON results")
+    batch_parser.add_argument("--concurrency", "-c", type=int, default=CONCURRENCY,
+                              help=f"Commands run at once (default: {CONCURRENCY})")
+
+    # Exporter
+    exporter_parser = add_command("exporter", parents=[common],
+                                  help="Serve job, build, queue and executor state as Prometheus metrics")
+    exporter_parser.add_argument("--host", default="127.0.0.1",
+                                 help="Address to listen on (default: 127.0.0.1; 0.0.0.0 for all interfaces)")
+    exporter_parser.add_argument("--port", "-p", type=int, default=EXPORTER_PORT,
+                                 help=f"Port to listen on (default: {EXPORTER_PORT})")
+    exporter_parser.add_argument("--interval", "-i", type=float, default=EXPORTER_INTERVAL,
+                                 help=f"Seconds between refreshes from Jenkins (default: {EXPORTER_INTERVAL:g})")
+    exporter_parser.add_argument("--depth", type=int, default=LIST_MAX_DEPTH,
+                                 help=f"Folder levels to include (default: {LIST_MAX_DEPTH})")
+
+    return parser
+
+
+def run_command(args: argparse.Namespace, parser: Optional[argparse.ArgumentParser] = None) -> None:
+    """Run a parsed command in the requested output format."""
+    records = _JsonArray() if args.format == "json" else None
+    tracer = RequestTracer(verbose=args.trace)
+    OUTPUT_FORMAT.set(args.format)
+    _RECORDS.set(records)
+    TRACER.set(tracer)
+    RETRY_BUDGET_LEFT.set(RetryBudget())
+    CACHING.set(not args.no_cache)
+    try:
+        try:
+            dispatch(args, parser)
+        finally:
+            if records is not None:
+                records.close()  # the array stays valid when a command fails part way
+            sys.stdout.flush()
+    except BrokenPipeError:
+        _discard_stdout()
+    except JobListingError as e:
+        print(e, file=sys.stderr)
+        sys.exit(1)
+    finally:
+        if args.trace or args.stats:
+            print(tracer.summary(), file=sys.stderr)
 
-    if not args.command:
-        parser.print_help()
-        sys.exit(0)
 
+def dispatch(args: argparse.Namespace, parser: Optional[argparse.ArgumentParser] = None) -> None:
+    """Dispatch parsed arguments to the matching command function."""
     if args.command == "list":
-        list_jobs(args.folder)
+        list_jobs(args.folder, args.fields, args.recursive, max(1, args.depth))
     elif args.command == "info":
-        get_job_info(args.job)
+        get_job_info(args.job, args.fields)
     elif args.command == "build-info":
-        get_build_info(args.job, args.build)
+        get_build_info(parse_build_targets(args.target), args.fields)
+    elif args.command == "history":
+        get_build_history(args.job, args.limit, args.since, max(1, args.page_size), args.fields)
+    elif args.command == "stats":
+        get_build_stats(args.job, max(1, args.last), max(1, args.window), args.threshold, args.numpy)
+    elif args.command == "sync":
+        sync_builds(args.job, args.db, args.recursive, max(1, args.concurrency))
+    elif args.command == "search":
+        search_logs(args.pattern, args.job, max(1, args.last), args.regex, args.ignore_case,
+                    max(1, args.max_count), max(1, args.concurrency))
     elif args.command == "log":
-        get_build_log(args.job, args.build, args.tail)
+        get_build_log(args.job, args.build, args.tail, args.follow, args.output)
     elif args.command == "pipeline":
-        get_pipeline_log(args.job, args.build)
+        get_pipeline_log(args.job, args.build, args.logs, args.failed_only)
+    elif args.command == "critical-path":
+        get_critical_path(args.job, args.build, args.last)
     elif args.command == "start":
         start_build(args.job, args.param)
     elif args.command == "stop":
         stop_build(args.job, args.build)
     elif args.command == "queue":
-        get_queue()
+        get_queue(args.fields)
     elif args.command == "check":
-        check_connection()
+        check_connection(args.fields)
+    elif args.command == "batch":
+        run_batch(parser or create_parser(), max(1, args.concurrency))
+    elif args.command == "daemon":
+        daemon_command(args.action, parser or create_parser())
+    elif args.command == "exporter":
+        run_exporter(args.host, args.port, max(1.0, args.interval), max(1, args.depth), args.trace)
 
 
 if __name__ == "__main__":
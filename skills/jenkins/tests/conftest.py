@@ -0,0 +1,55 @@
+"""Shared fixtures: jenkins_cli imported against a throwaway cache, and an in-process mock Jenkins."""
+
+import contextvars
+import os
+import sys
+import tempfile
+import threading
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [os.path.join(HERE, "..", "scripts"), os.path.join(HERE, "..", "tools")]
+# Module constants are read from the environment on import. Retries are off
+# except where test_retry.py turns them on.
+os.environ.update(JENKINS_CACHE_DIR=tempfile.mkdtemp(prefix="jenkins-cli-tests-"),
+                  JENKINS_CLI_NO_DAEMON="1", JENKINS_RETRIES="0")
+
+import pytest  # noqa: E402
+
+import jenkins_cli  # noqa: E402
+import mock_jenkins  # noqa: E402
+
+
+@pytest.fixture
+def mock(monkeypatch, tmp_path):
+    """Start a small mock Jenkins on a free port and point jenkins_cli (and fresh caches) at it."""
+    options = mock_jenkins.create_parser().parse_args(
+        ["--port", "0", "--jobs", "3", "--folders", "1", "--builds", "5", "--running", "0",
+         "--log-lines", "200", "--queue", "1"])
+    server = mock_jenkins.MockJenkins(options)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(jenkins_cli, "JENKINS_URL", server.url)
+    monkeypatch.setattr(jenkins_cli, "_POOL", jenkins_cli.ConnectionPool())
+    budget = jenkins_cli.CacheBudget([str(tmp_path / "builds"), str(tmp_path / "validators")],
+                                     jenkins_cli.CACHE_MAX_BYTES)
+    monkeypatch.setattr(jenkins_cli, "CACHE_BUDGET", budget)
+    monkeypatch.setattr(jenkins_cli, "BUILD_CACHE", jenkins_cli.BuildCache(str(tmp_path), budget))
+    monkeypatch.setattr(jenkins_cli, "VALIDATORS", jenkins_cli.ValidatorStore(str(tmp_path), budget))
+    monkeypatch.setattr(jenkins_cli, "TRANSFER_STATS", jenkins_cli.TransferStats())
+    yield server
+    jenkins_cli._POOL.close()
+    server.shutdown()
+    server.server_close()
+
+
+def run_cli(argv: list) -> int:
+    """Run one command in-process the way main() does, returning its exit status.
+
+    Each command gets its own context, as it does on a daemon thread.
+    """
+    parser = jenkins_cli.create_parser(argv[0])
+    try:
+        contextvars.copy_context().run(jenkins_cli.run_command, parser.parse_args(argv), parser)
+    except SystemExit as e:
+        return e.code or 0
+    return 0
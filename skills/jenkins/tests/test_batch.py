@@ -0,0 +1,51 @@
+"""Batch mode: one process running many commands."""
+
+import io
+import json
+import sys
+
+import pytest
+
+import jenkins_cli
+from conftest import run_cli
+
+
+def run_batch(monkeypatch, capsys, lines: list) -> list:
+    monkeypatch.setattr(sys, "stdin", io.StringIO("".join(json.dumps(line) + "\n" for line in lines)))
+    streams = sys.stdout, sys.stderr
+    jenkins_cli.run_batch(jenkins_cli.create_parser(), concurrency=1)
+    assert (sys.stdout, sys.stderr) == streams
+    return [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+
+def test_no_cache_line_does_not_disable_cache_for_later_lines(mock, monkeypatch, capsys):
+    results = run_batch(monkeypatch, capsys, [
+        {"id": "a", "cmd": "queue", "args": ["--no-cache"]},
+        {"id": "b", "cmd": "build-info", "job": "job0", "build": "3", "no_cache": True},
+        {"id": "c", "cmd": "build-info", "job": "job1", "build": "3"},
+    ])
+    assert [(r["id"], r["exit"]) for r in sorted(results, key=lambda r: r["id"])] == [("a", 0), ("b", 0), ("c", 0)]
+    # Line c's build is now served from the cache; line b's was never stored.
+    requests = mock.counters["requests"]
+    assert run_cli(["build-info", "job1#3"]) == 0
+    assert mock.counters["requests"] == requests
+    assert run_cli(["build-info", "job0#3"]) == 0
+    assert mock.counters["requests"] > requests
+
+
+def test_json_lines_report_records(mock, monkeypatch, capsys):
+    [result] = run_batch(monkeypatch, capsys, [{"cmd": "queue", "format": "json"}])
+    assert result["exit"] == 0
+    assert result["records"] and "why" in result["records"][0]
+
+
+def test_streams_restored_when_input_fails(mock, monkeypatch):
+    def lines():
+        yield json.dumps({"cmd": "queue"}) + "\n"
+        raise OSError("stdin went away")
+
+    monkeypatch.setattr(sys, "stdin", lines())
+    streams = sys.stdout, sys.stderr
+    with pytest.raises(OSError):
+        jenkins_cli.run_batch(jenkins_cli.create_parser(), concurrency=1)
+    assert (sys.stdout, sys.stderr) == streams
@@ -0,0 +1,19 @@
+"""build-info target parsing."""
+
+from conftest import run_cli
+
+
+def test_job_glob_in_two_argument_form(mock, capsys):
+    assert run_cli(["build-info", "job*", "3"]) == 0
+    out = capsys.readouterr().out
+    assert [line for line in out.splitlines() if line.startswith("==>")] == [
+        "==> job0#3 <==", "==> job1#3 <==", "==> job2#3 <=="]
+
+
+def test_two_job_names_are_rejected_before_any_request(mock, capsys):
+    assert run_cli(["build-info", "job0", "job1"]) == 1
+    err = capsys.readouterr().err
+    assert "'job1' is not a build number" in err
+    assert "job0#lastBuild job1#lastBuild" in err
+    assert mock.counters["requests"] == 0
+    assert run_cli(["build-info", "job0", "lastSuccessfulBuild"]) == 0
@@ -0,0 +1,76 @@
+"""On-disk build cache: hits, byte budget and eviction cost."""
+
+import os
+
+import jenkins_cli
+from conftest import run_cli
+
+
+def cache_files(directory: str) -> list:
+    return [os.path.join(root, name) for root, _, names in os.walk(directory)
+            for name in names if not name.endswith(".tmp")]
+
+
+def count_scans(monkeypatch, budget) -> list:
+    scans = []
+    scan = budget._scan
+    monkeypatch.setattr(budget, "_scan", lambda: scans.append(1) or scan())
+    return scans
+
+
+def test_finished_build_log_served_from_cache(mock, capsys):
+    assert run_cli(["log", "job0", "3"]) == 0
+    first = capsys.readouterr().out
+    requests = mock.counters["requests"]
+    assert run_cli(["log", "job0", "3"]) == 0
+    assert capsys.readouterr().out == first
+    assert mock.counters["requests"] == requests
+
+
+def test_writes_under_budget_scan_the_cache_once(mock, monkeypatch, capsys):
+    scans = count_scans(monkeypatch, jenkins_cli.CACHE_BUDGET)
+    for job in ("job0", "job1", "job2"):
+        for build in range(1, 6):
+            assert run_cli(["log", job, str(build)]) == 0
+    capsys.readouterr()
+    assert len(cache_files(jenkins_cli.BUILD_CACHE.directory)) >= 15
+    assert len(scans) == 1
+
+
+def test_eviction_keeps_cache_within_budget(mock, monkeypatch, capsys):
+    budget = jenkins_cli.CACHE_BUDGET
+    monkeypatch.setattr(budget, "max_bytes", 64 * 1024)
+    for build in range(1, 6):
+        for job in ("job0", "job1", "job2"):
+            assert run_cli(["log", job, str(build)]) == 0
+    capsys.readouterr()
+    files = cache_files(jenkins_cli.BUILD_CACHE.directory)
+    assert sum(os.path.getsize(path) for path in files) <= budget.max_bytes
+    assert jenkins_cli.BUILD_CACHE.get("job2", "5", "consoleText") is not None
+
+
+def test_validator_bodies_count_against_the_budget(mock, monkeypatch, capsys):
+    assert run_cli(["list"]) == 0
+    validators = cache_files(jenkins_cli.VALIDATORS.directory)
+    assert validators
+    requests = mock.counters["requests"]
+    assert run_cli(["list"]) == 0
+    assert jenkins_cli.TRANSFER_STATS.conditional["revalidated"] == 1
+    assert mock.counters["requests"] == requests + 1
+
+    # Logs written afterwards push the older listing body out of a small budget.
+    monkeypatch.setattr(jenkins_cli.CACHE_BUDGET, "max_bytes", 64 * 1024)
+    for build in range(1, 6):
+        assert run_cli(["log", "job0", str(build)]) == 0
+    capsys.readouterr()
+    assert not any(os.path.exists(path) for path in validators)
+
+
+def test_conditional_log_is_bounded():
+    stats = jenkins_cli.TransferStats()
+    for i in range(jenkins_cli.CONDITIONAL_LOG_SIZE * 3):
+        stats.record_conditional("revalidated" if i % 2 else "refetched", f"job/{i}/api/json")
+    assert len(stats.recent_conditional) == jenkins_cli.CONDITIONAL_LOG_SIZE
+    summary = stats.summary()
+    assert "75 revalidated, 75 refetched" in summary
+    assert f"(last {jenkins_cli.CONDITIONAL_LOG_SIZE} listed)" in summary
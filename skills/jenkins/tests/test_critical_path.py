@@ -0,0 +1,39 @@
+"""Critical-path analysis of pipeline stage timings."""
+
+import json
+
+import jenkins_cli
+from conftest import run_cli
+
+
+def stage(name: str, start_s: int, end_s: int) -> dict:
+    return {"name": name, "startTimeMillis": 1_000_000 + start_s * 1000, "durationMillis": (end_s - start_s) * 1000}
+
+
+def test_tied_parallel_branches_count_once():
+    stages = [stage("A", 0, 10), stage("B", 10, 20), stage("C", 10, 20), stage("D", 20, 30)]
+    schedule, length, path = jenkins_cli.stage_schedule(stages)
+    assert length == 30
+    assert path == ["A", "B", "D"]
+    assert [s["name"] for s in schedule if s["critical"]] == ["A", "B", "C", "D"]
+
+
+def test_shorter_branch_has_slack():
+    stages = [stage("A", 0, 10), stage("fast", 10, 15), stage("slow", 10, 40), stage("D", 40, 45)]
+    schedule, length, path = jenkins_cli.stage_schedule(stages)
+    assert length == 45
+    assert path == ["A", "slow", "D"]
+    assert {s["name"]: s["slack"] for s in schedule}["fast"] == 25
+
+
+def test_critical_path_command_against_mock(mock, capsys):
+    assert run_cli(["critical-path", "job0", "3"]) == 0
+    out = capsys.readouterr().out
+    assert "Critical path: Checkout -> Build -> Integration -> Deploy" in out
+    wall = out.split("Wall time: ")[1].split()[:2]
+    assert out.split("Critical path: ")[1].split()[:2] == wall
+
+    assert run_cli(["critical-path", "job0", "--last", "5", "--json"]) == 0
+    records = {r["name"]: r for r in json.loads(capsys.readouterr().out)}
+    assert records["Integration"]["on_path"] == 1.0
+    assert records["Lint"]["on_path"] == 0.0
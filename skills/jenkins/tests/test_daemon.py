@@ -0,0 +1,53 @@
+"""Stopping the daemon and falling back to direct mode."""
+
+import os
+import socket
+import tempfile
+import threading
+
+import pytest
+
+import jenkins_cli
+
+
+@pytest.fixture
+def socket_path(monkeypatch):
+    path = os.path.join(tempfile.mkdtemp(prefix="jd-"), "d.sock")  # short: AF_UNIX paths are limited
+    monkeypatch.setattr(jenkins_cli, "DAEMON_SOCKET", path)
+    monkeypatch.delenv("JENKINS_CLI_NO_DAEMON")
+    return path
+
+
+def test_stop_removes_socket_before_replying(socket_path, capsys):
+    server = jenkins_cli.DaemonServer(socket_path, jenkins_cli.create_parser())
+    thread = threading.Thread(target=server.run)
+    thread.start()
+    jenkins_cli.daemon_command("stop", None)
+    assert "stopping" in capsys.readouterr().out
+    assert not os.path.exists(socket_path)
+    thread.join(5)
+    assert not thread.is_alive()
+
+    with pytest.raises(SystemExit):
+        jenkins_cli.daemon_command("status", None)
+    assert capsys.readouterr().out == "Daemon not running\n"
+    assert jenkins_cli.forward_to_daemon(["info", "job0"]) is None
+
+
+def test_dropped_before_any_output_runs_directly(socket_path):
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(socket_path)
+    listener.listen()
+
+    def drop():
+        connection, _ = listener.accept()
+        connection.recv(4096)
+        connection.close()
+
+    thread = threading.Thread(target=drop)
+    thread.start()
+    try:
+        assert jenkins_cli.forward_to_daemon(["info", "job0"]) is None
+    finally:
+        thread.join(5)
+        listener.close()
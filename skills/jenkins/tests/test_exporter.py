@@ -0,0 +1,71 @@
+"""Prometheus exporter: collection, pre-rendered bodies and failed refreshes."""
+
+import gzip
+
+import jenkins_cli
+
+
+def mock_jobs(job) -> list:
+    if not job.folder:
+        return [job]
+    return [leaf for child in job.children.values() for leaf in mock_jobs(child)]
+
+
+def samples(families: list, name: str) -> list:
+    return next(family[3] for family in families if family[0] == name)
+
+
+def test_label_values_are_escaped():
+    families = [("jenkins_job_last_build_result", "gauge", "Result of the last build",
+                 [({"job": 'team\\a "b"\nc'}, 1)])]
+    text = jenkins_cli.render_metrics(families).decode()
+    assert 'jenkins_job_last_build_result{job="team\\\\a \\"b\\"\\nc"} 1' in text
+    assert len(text.splitlines()) == 3
+
+
+def test_collect_metrics_matches_the_controller(mock):
+    families = jenkins_cli.collect_metrics(jenkins_cli.LIST_MAX_DEPTH)
+    jobs = {job.full_name: job for job in mock_jobs(mock.root)}
+    numbers = {labels["job"]: value for labels, value in samples(families, "jenkins_job_last_build_number")}
+    assert numbers == {name: max(job.builds) for name, job in jobs.items()}
+    results = samples(families, "jenkins_job_last_build_result")
+    assert {labels["job"]: labels["result"] for labels, _ in results} == {
+        name: job.builds[max(job.builds)].result for name, job in jobs.items()}
+    assert samples(families, "jenkins_queue_items") == [({}, len(mock.queue))]
+    assert samples(families, "jenkins_nodes") == [({}, mock.options.agents)]
+
+
+def test_refresh_renders_every_body(mock):
+    exporter = jenkins_cli.MetricsExporter()
+    exporter.refresh()
+    plain = exporter.body(False, False).decode()
+    assert "jenkins_up 1\n" in plain
+    assert "# TYPE jenkins_exporter_refresh_errors_total counter\n" in plain
+    assert not plain.endswith("# EOF\n")
+    openmetrics = exporter.body(True, False).decode()
+    assert "# TYPE jenkins_exporter_refresh_errors counter\n" in openmetrics
+    assert openmetrics.endswith("# EOF\n")
+    for flavour in (False, True):
+        assert gzip.decompress(exporter.body(flavour, True)) == exporter.body(flavour, False)
+
+
+def test_failed_refresh_keeps_metrics_and_reports_down(mock, capsys):
+    exporter = jenkins_cli.MetricsExporter()
+    exporter.refresh()
+    jobs = samples(exporter.families, "jenkins_job_last_build_number")
+
+    for status in (503, 403):  # the tree query falls back to walking on 5xx; a 403 is reported as is
+        mock.options.error_percent = 100
+        mock.options.error_status = status
+        exporter.refresh()
+        assert f"Refresh failed: Error ({status})" in capsys.readouterr().err
+        plain = exporter.body(False, False).decode()
+        assert "jenkins_up 0\n" in plain
+        assert samples(exporter.families, "jenkins_job_last_build_number") == jobs
+        assert 'jenkins_job_last_build_number{job="job0"}' in plain
+
+    assert exporter.refresh_errors == 2
+    assert "jenkins_exporter_refresh_errors_total 2\n" in exporter.body(False, False).decode()
+    mock.options.error_percent = 0
+    exporter.refresh()
+    assert "jenkins_up 1\n" in exporter.body(False, False).decode()
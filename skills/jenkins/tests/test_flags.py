@@ -0,0 +1,29 @@
+"""Per-command flags must not leak into later commands of a long-lived process."""
+
+import os
+
+import pytest
+
+import jenkins_cli
+from conftest import run_cli
+
+
+def cached_entries() -> int:
+    return sum(len(files) for _, _, files in os.walk(jenkins_cli.BUILD_CACHE.directory))
+
+
+def test_no_cache_applies_to_one_command_only(mock, capsys):
+    assert run_cli(["build-info", "job0#3", "--no-cache"]) == 0
+    assert cached_entries() == 0
+    assert run_cli(["build-info", "job1#3"]) == 0
+    capsys.readouterr()
+    assert cached_entries() > 0
+
+
+@pytest.mark.parametrize("argv", [["build-info", "job0#3", "--no-cach"], ["queue", "--stat"]])
+def test_abbreviated_flags_are_rejected(argv, capsys):
+    parser = jenkins_cli.create_parser(argv[0])
+    with pytest.raises(SystemExit) as exit_info:
+        parser.parse_args(argv)
+    assert exit_info.value.code == 2
+    assert "unrecognized arguments" in capsys.readouterr().err
@@ -0,0 +1,72 @@
+"""--json and --ndjson output."""
+
+import json
+import os
+import subprocess
+import sys
+
+import jenkins_cli
+from conftest import run_cli
+
+
+def test_json_array_matches_json_dump(mock, capsys):
+    assert run_cli(["queue", "--json"]) == 0
+    out = capsys.readouterr().out
+    records = json.loads(out)
+    assert out == json.dumps(records, indent=2) + "\n"
+    assert run_cli(["info", "missing", "--json"]) == 1
+    assert capsys.readouterr().out == "[]\n"
+
+
+def test_log_json_streams_one_record_per_line(mock, capsys):
+    assert run_cli(["log", "job0", "2", "--json"]) == 0
+    records = json.loads(capsys.readouterr().out)
+    assert len(records) > 200  # --log-lines plus the closing status line
+    assert [record["line"] for record in records] == list(range(1, len(records) + 1))
+
+
+def run_into_closed_pipe(mock, argv: list) -> subprocess.CompletedProcess:
+    env = dict(os.environ, JENKINS_URL=mock.url)
+    script = os.path.join(os.path.dirname(jenkins_cli.__file__), "jenkins_cli.py")
+    read_end, write_end = os.pipe()
+    os.close(read_end)  # the reader is gone before the first write, as after `head` exits
+    try:
+        return subprocess.run([sys.executable, script] + argv, env=env, stdout=write_end,
+                              stderr=subprocess.PIPE, text=True)
+    finally:
+        os.close(write_end)
+
+
+def test_json_into_closed_pipe_exits_quietly(mock):
+    result = run_into_closed_pipe(mock, ["log", "job0", "1", "--json", "--no-cache"])
+    assert "Traceback" not in result.stderr
+    assert result.returncode == 0
+
+
+def test_follow_into_closed_pipe_exits_quietly(mock):
+    result = run_into_closed_pipe(mock, ["log", "job0", "lastBuild", "--follow"])
+    assert result.stderr == ""
+    assert result.returncode == 0
+
+
+def test_failures_stay_off_structured_stdout(mock, monkeypatch, capsys, tmp_path):
+    monkeypatch.setattr(jenkins_cli, "JENKINS_URL", "http://127.0.0.1:9")
+    assert run_cli(["check", "--json"]) == 1
+    out, err = capsys.readouterr()
+    assert out == "[]\n"
+    assert "Cannot connect" in err
+
+    monkeypatch.setattr(jenkins_cli, "JENKINS_URL", mock.url)
+    assert run_cli(["sync", "nothing*", "--db", str(tmp_path / "b.db"), "--ndjson"]) == 0
+    out, err = capsys.readouterr()
+    assert out == ""
+    assert "No jobs to sync." in err
+
+
+def test_listing_errors_exit_with_the_message(mock, capsys):
+    mock.options.error_percent = 100
+    mock.options.error_status = 403
+    assert run_cli(["list", "--recursive", "--json"]) == 1
+    out, err = capsys.readouterr()
+    assert out == "[]\n"
+    assert err.startswith("Error (403): Injected error")
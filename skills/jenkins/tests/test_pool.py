@@ -0,0 +1,32 @@
+"""Keep-alive connection reuse against the mock controller."""
+
+import io
+
+import jenkins_cli
+from conftest import run_cli
+
+
+def test_make_request_reuses_one_connection(mock):
+    for path in ["api/json", "job/job0/api/json", "job/job1/api/json", "queue/api/json"]:
+        status, _ = jenkins_cli.make_request(path)
+        assert status == 200
+    assert mock.counters["connections"] == 1
+    assert mock.counters["requests"] == 4
+
+
+def test_head_and_streamed_bodies_return_connection(mock):
+    with jenkins_cli.open_request("job/job0/api/json", method="HEAD") as response:
+        assert response.status == 200
+    with jenkins_cli.open_request("job/job0/1/consoleText") as response:
+        assert b"".join(response.iter_content())
+    with jenkins_cli.open_request("job/job0/2/consoleText", headers={"Accept-Encoding": "identity"}) as response:
+        assert response.copy_to(io.BytesIO()) > 0
+    jenkins_cli.make_request("job/job0/api/json")
+    assert mock.counters["connections"] == 1
+
+
+def test_paged_history_uses_one_connection(mock, capsys):
+    assert run_cli(["history", "job0", "--page-size", "2"]) == 0
+    assert "#5" in capsys.readouterr().out
+    assert mock.counters["connections"] == 1
+    assert mock.counters["requests"] > 1
@@ -0,0 +1,79 @@
+"""Retries with backoff, Retry-After and the per-command retry budget."""
+
+import asyncio
+import email.utils
+import time
+
+import pytest
+
+import jenkins_cli
+from conftest import run_cli
+
+
+@pytest.fixture
+def delays(mock, monkeypatch) -> list:
+    """Enable retries with a tiny backoff and record every delay retry_delay grants."""
+    monkeypatch.setattr(jenkins_cli, "RETRIES", 3)
+    monkeypatch.setattr(jenkins_cli, "RETRY_BASE_DELAY", 0.001)
+    granted = []
+    retry_delay = jenkins_cli.retry_delay
+
+    def spy(*args):
+        delay = retry_delay(*args)
+        granted.append(delay)
+        return delay
+
+    monkeypatch.setattr(jenkins_cli, "retry_delay", spy)
+    mock.options.error_percent = 100
+    return granted
+
+
+def test_503_with_retry_after_is_retried_until_it_succeeds(mock, delays):
+    mock.options.error_limit = 2
+    mock.options.retry_after = 0.01
+    status, _ = jenkins_cli.make_request("job/job0/api/json")
+    assert status == 200
+    assert delays == [0.01, 0.01]
+    assert mock.counters["requests"] == 3
+
+
+def test_async_client_retries_the_same_way(mock, delays):
+    mock.options.error_limit = 2
+    results = jenkins_cli.fetch_many(["job/job0/api/json", "job/job1/api/json"])
+    assert [status for status, _ in results] == [200, 200]
+    assert len(delays) == 2
+    assert mock.counters["requests"] == 4
+
+
+def test_post_is_not_retried(mock, delays):
+    status, _ = jenkins_cli.make_request("job/job0/build", method="POST")
+    assert status == 503
+
+    async def post():
+        client = jenkins_cli.AsyncJenkinsClient()
+        try:
+            return await client.request("job/job0/build", method="POST")
+        finally:
+            await client.close()
+
+    assert asyncio.run(post())[0] == 503
+    assert delays == []
+    assert mock.counters["requests"] == 2
+
+
+def test_budget_stops_retries_across_workers(mock, delays, capsys):
+    targets = [f"job{i}" for i in range(8)]
+    assert run_cli(["info"] + targets) == 1
+    assert capsys.readouterr().err.count("Error (503)") == len(targets)
+    assert delays.count(None) == len(targets)
+    assert mock.counters["requests"] == len(targets) + jenkins_cli.RETRY_BUDGET
+
+
+def test_retry_after_parsing():
+    assert jenkins_cli._retry_after_seconds("3") == 3.0
+    assert jenkins_cli._retry_after_seconds("-1") == 0.0
+    assert jenkins_cli._retry_after_seconds("soon") is None
+    assert jenkins_cli._retry_after_seconds(None) is None
+    later = email.utils.formatdate(time.time() + 60, usegmt=True)
+    assert 55 < jenkins_cli._retry_after_seconds(later) <= 60
+    assert jenkins_cli._retry_after_seconds(email.utils.formatdate(0, usegmt=True)) == 0.0
@@ -0,0 +1,88 @@
+"""Trigram filtering for search: it may keep logs that do not match, never drop one that does."""
+
+import re
+
+import pytest
+
+import jenkins_cli
+from conftest import run_cli
+
+LOG = (b"[job0#7] step 1: compiling module_1 ... ok\n"
+       b"[job0#7] ERROR: connection refused to db-3\n"
+       b"[job0#7] Warning: retrying color calibration\n"
+       b"FATAL: disk quota exceeded on volume_7\n"
+       b"Finished: FAILURE\n")
+
+
+@pytest.mark.parametrize("pattern, regex, ignore_case", [
+    ("FATAL: disk", False, False),
+    ("fatal: DISK", False, True),
+    ("(?i)fatal: disk quota", True, False),
+    ("(ERROR|WARN): connection", True, False),
+    ("(?:error|warning): (conn|retry)", True, True),
+    ("colou?r calibration", True, False),
+    ("volume_(\\d+)?7", True, False),
+    ("refused to db-\\d", True, False),
+    ("(Finished): (SUCCESS|FAILURE)", True, False),
+    ("compil(ing|ed) module", True, False),
+    ("quota\\s+exceeded", True, False),
+    ("x*FATAL", True, False),
+])
+def test_pattern_trigrams_are_in_every_matching_log(pattern, regex, ignore_case):
+    flags = re.MULTILINE | (re.IGNORECASE if ignore_case else 0)
+    matcher = re.compile(pattern.encode() if regex else re.escape(pattern.encode()), flags)
+    assert matcher.search(LOG)
+    assert jenkins_cli.pattern_trigrams(pattern, regex) <= jenkins_cli.text_trigrams(LOG)
+
+
+def test_alternation_at_top_level_disables_the_filter():
+    assert jenkins_cli.pattern_trigrams("disk|quota", True) == set()
+    assert jenkins_cli.pattern_trigrams("(unclosed", True) == set()
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 5, 7, 64])
+def test_scan_log_across_chunk_boundaries(size):
+    chunks = [LOG[i:i + size] for i in range(0, len(LOG), size)]
+    matcher = re.compile(rb"quota exceeded")
+    matches, grams = jenkins_cli.scan_log(iter(chunks), matcher, 3, index=True)
+    assert matches == [(4, b"FATAL: disk quota exceeded on volume_7")]
+    assert jenkins_cli.text_trigrams(LOG) <= grams
+
+
+def test_merged_segments_give_the_same_candidates(tmp_path):
+    words = ["alpha", "bravo", "charlie", "delta", "echo", "foxtrot"]
+    logs = [("job", n, jenkins_cli.text_trigrams(" ".join(w for i, w in enumerate(words) if n >> i & 1).encode()))
+            for n in range(1, 64)]
+    merged = jenkins_cli.LogIndex(str(tmp_path / "merged.db"), max_segments=2)
+    separate = jenkins_cli.LogIndex(str(tmp_path / "separate.db"), max_segments=100)
+    for start in range(0, len(logs), 8):
+        merged.add(logs[start:start + 8])
+        separate.add(logs[start:start + 8])
+    assert merged.db.execute("SELECT count(DISTINCT segment) FROM postings").fetchone()[0] <= 2
+    docs = set(merged.lookup("job", list(range(1, 64))).values())
+    assert docs == set(separate.lookup("job", list(range(1, 64))).values())
+
+    number = {doc: n for n, doc in merged.lookup("job", list(range(1, 64))).items()}
+    for query in [["alpha"], ["charlie", "delta"], ["bravo", "foxtrot"]]:
+        grams = jenkins_cli.text_trigrams(" ".join(query).encode())
+        found = {number[doc] for doc in merged.candidates(grams, docs)}
+        assert found == {number[doc] for doc in separate.candidates(grams, docs)}
+        assert found == {n for n in range(1, 64) if all(n >> words.index(w) & 1 for w in query)}
+    assert merged.candidates(jenkins_cli.text_trigrams(b"zulu"), docs) == set()
+    merged.close()
+    separate.close()
+
+
+def test_indexed_search_finds_the_same_lines(mock, monkeypatch, capsys, tmp_path):
+    def search(index: str, *argv) -> tuple:
+        monkeypatch.setattr(jenkins_cli, "SEARCH_INDEX_PATH", str(tmp_path / index))
+        assert run_cli(["search", *argv, "-j", "job*", "--last", "5"]) == 0
+        return capsys.readouterr()
+
+    search("search.db", "connection", "--max-count", "1")  # index every log
+    for argv in [("FATAL: disk",), ("fatal: DISK", "-i"), ("(fatal|panic): disk quota", "-E", "-i")]:
+        indexed = search("search.db", *argv)
+        unindexed = search(f"fresh{len(argv)}.db", *argv)
+        assert indexed.out == unindexed.out
+        assert indexed.out.count("FATAL: disk quota") == 3
+        assert "12 ruled out by the index" in indexed.err
@@ -0,0 +1,19 @@
+"""Cold-start regression gate: tools/startup_bench.py with its committed budget and forbidden imports."""
+
+import os
+import subprocess
+import sys
+
+BENCH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "tools", "startup_bench.py")
+
+
+def test_check_starts_within_budget_without_lazy_modules():
+    result = subprocess.run([sys.executable, BENCH, "--runs", "7"], capture_output=True, text=True)
+    assert result.returncode == 0, result.stdout + result.stderr
+
+
+def test_bench_fails_when_a_forbidden_module_loads():
+    result = subprocess.run([sys.executable, BENCH, "--runs", "1", "--budget-ms", "0", "--forbid", "http.client"],
+                            capture_output=True, text=True)
+    assert result.returncode == 1
+    assert "should load lazily: http.client" in result.stdout
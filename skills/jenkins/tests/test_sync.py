@@ -0,0 +1,70 @@
+"""Incremental sync into the build warehouse: watermarks, running builds and probe pages."""
+
+import json
+import sqlite3
+
+import jenkins_cli
+import mock_jenkins
+from conftest import run_cli
+
+
+def sync(capsys, db, *jobs) -> tuple:
+    code = run_cli(["sync", *jobs, "--db", str(db), "--ndjson"])
+    records = {r["job"]: r for r in map(json.loads, capsys.readouterr().out.splitlines())}
+    return code, records
+
+
+def add_builds(mock, name: str, numbers, running: bool = False) -> None:
+    job = mock.root.children[name]
+    for number in numbers:
+        job.builds[number] = mock_jenkins.MockBuild(mock, job, number, running=running)
+
+
+def watermarks(db) -> dict:
+    with sqlite3.connect(db) as conn:
+        return dict(conn.execute("SELECT name, watermark FROM jobs"))
+
+
+def test_running_build_is_refetched_once_it_finishes(mock, capsys, tmp_path):
+    db = tmp_path / "builds.db"
+    add_builds(mock, "job0", [6], running=True)
+    code, records = sync(capsys, db, "job0")
+    assert code == 0
+    assert records["job0"] == {"job": "job0", "fetched": 6, "watermark": 5, "running": 1}
+
+    build = mock.root.children["job0"].builds[6]
+    build.started -= mock.options.running_seconds  # finish it
+    requests = mock.counters["requests"]
+    code, records = sync(capsys, db, "job0")
+    assert code == 0
+    assert records["job0"] == {"job": "job0", "fetched": 1, "watermark": 6, "running": 0}
+    assert mock.counters["requests"] == requests + 1
+    with sqlite3.connect(db) as conn:
+        result, = conn.execute("SELECT result FROM builds WHERE job = 'job0' AND number = 6").fetchone()
+    assert result == build.result
+
+
+def test_probe_page_grows_until_it_reaches_known_builds(mock, capsys, tmp_path):
+    db = tmp_path / "builds.db"
+    assert sync(capsys, db, "job1")[1]["job1"]["watermark"] == 5
+    add_builds(mock, "job1", range(6, 36))
+    requests = mock.counters["requests"]
+    code, records = sync(capsys, db, "job1")
+    assert code == 0
+    assert records["job1"]["fetched"] == 30
+    assert records["job1"]["watermark"] == 35
+    # A probe of SYNC_PROBE_SIZE builds, then one page four times larger that reaches build 5.
+    assert jenkins_cli.SYNC_PROBE_SIZE < 30 < jenkins_cli.SYNC_PROBE_SIZE * 5
+    assert mock.counters["requests"] == requests + 2
+
+
+def test_failed_job_keeps_its_watermark(mock, capsys, tmp_path):
+    db = tmp_path / "builds.db"
+    assert sync(capsys, db, "job0", "job1")[0] == 0
+    add_builds(mock, "job0", [6])
+    add_builds(mock, "job1", [6])
+    del mock.root.children["job0"]  # its page now fails with 404
+    code, records = sync(capsys, db, "job0", "job1")
+    assert code == 1
+    assert list(records) == ["job1"]
+    assert watermarks(db) == {"job0": 5, "job1": 6}
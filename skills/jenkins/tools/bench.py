@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Command-level benchmark for jenkins_cli.py against the bundled mock Jenkins.
+
+Each command runs several times as a fresh process, the way agents invoke
+the CLI. For every command it reports wall time, throughput, the requests,
+connections and bytes the server saw (from the mock's /mock/stats counters)
+and the peak RSS of the process (from os.wait4). Results can be saved with --json
+and compared against an earlier run with --baseline.
+
+The mock runs as its own process: a child's peak RSS on Linux starts from
+the size of the process that forked it, so the benchmark process is kept
+small.
+"""
+
+import argparse
+import json
+import os
+import shlex
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+MOCK_SCRIPT = os.path.join(HERE, "mock_jenkins.py")
+DEFAULT_SCRIPT = os.path.join(HERE, "..", "scripts", "jenkins_cli.py")
+SUITE = [
+    ("check", ["check"]),
+    ("list", ["list"]),
+    ("list-recursive", ["list", "--recursive"]),
+    ("info", ["info", "job0", "job1", "job2", "job3"]),
+    ("build-info", ["build-info", "job1#lastBuild", "job2#lastBuild", "job3#40", "job4#41"]),
+    ("history", ["history", "job1"]),
+    ("stats", ["stats", "job1", "--last", "50"]),
+    ("log", ["log", "job1", "lastBuild"]),
+    ("log-tail", ["log", "job1", "lastBuild", "--tail", "50"]),
+    ("pipeline", ["pipeline", "job1", "lastBuild", "--logs"]),
+    ("critical-path", ["critical-path", "job1", "--last", "10"]),
+    ("search", ["search", "FATAL", "-j", "job1*", "--last", "10"]),
+    ("sync", ["sync"]),
+    ("queue", ["queue"]),
+    ("list-json", ["list", "--recursive", "--json"]),
+]
+
+
+def start_mock(mock_args: str) -> tuple:
+    """Start mock_jenkins.py on a free port, returning (process, url)."""
+    process = subprocess.Popen([sys.executable, MOCK_SCRIPT, "--port", "0"] + shlex.split(mock_args),
+                               stdout=subprocess.PIPE, text=True)
+    line = process.stdout.readline()
+    if not line.startswith("Mock Jenkins listening on "):
+        process.kill()
+        sys.exit(f"Mock Jenkins did not start: {line.strip() or 'no output'}")
+    return process, line.split()[-1]
+
+
+def server_counters(url: str) -> dict:
+    with urllib.request.urlopen(f"{url}/mock/stats", timeout=10) as response:
+        return json.load(response)
+
+
+def run_once(cmd: list, env: dict, url: str) -> dict:
+    """Run one command, returning wall time, exit status, peak RSS and server traffic."""
+    before = server_counters(url)
+    with tempfile.TemporaryFile() as err:
+        start = time.perf_counter()
+        process = subprocess.Popen(cmd, env=env, stdin=subprocess.DEVNULL,
+                                   stdout=subprocess.DEVNULL, stderr=err)
+        _, status, usage = os.wait4(process.pid, 0)
+        elapsed = time.perf_counter() - start
+        process.returncode = os.waitstatus_to_exitcode(status)
+        err.seek(0)
+        error = err.read().decode("utf-8", errors="replace").strip().splitlines()[-1:]
+    after = server_counters(url)
+    return {"seconds": elapsed, "exit": process.returncode, "rss_kb": usage.ru_maxrss,
+            "requests": after["requests"] - before["requests"],
+            # The mock counts a connection on accept, so `after` includes its own.
+            "connections": after["connections"] - before["connections"] - 1,
+            "bytes": after["bytes_sent"] - before["bytes_sent"],
+            "error": error[0] if error and process.returncode else None}
+
+
+def bench_command(name: str, argv: list, args: argparse.Namespace, url: str) -> dict:
+    """Run a command --warmup + --runs times and summarise the timed runs."""
+    cache_dir = tempfile.mkdtemp(prefix="jenkins-bench-")
+    env = dict(os.environ, JENKINS_URL=url, JENKINS_CACHE_DIR=cache_dir, JENKINS_CLI_NO_DAEMON="1",
+               JENKINS_DB=os.path.join(cache_dir, "builds.db"))
+    cmd = [sys.executable, args.script] + argv
+    runs = []
+    try:
+        for i in range(args.warmup + args.runs):
+            if not args.warm_cache:
+                shutil.rmtree(cache_dir, ignore_errors=True)
+            run = run_once(cmd, env, url)
+            if i >= args.warmup:
+                runs.append(run)
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    seconds = [run["seconds"] for run in runs]
+    median = statistics.median(seconds)
+    bytes_sent = statistics.median(run["bytes"] for run in runs)
+    return {
+        "name": name, "argv": argv, "runs": len(runs),
+        "median_ms": median * 1000, "min_ms": min(seconds) * 1000, "max_ms": max(seconds) * 1000,
+        "commands_per_s": 1 / median if median else 0.0,
+        "requests": statistics.median(run["requests"] for run in runs),
+        "connections": statistics.median(run["connections"] for run in runs),
+        "bytes": bytes_sent, "mb_per_s": bytes_sent / median / 1e6 if median else 0.0,
+        "peak_rss_mb": max(run["rss_kb"] for run in runs) / 1024,
+        "failures": sum(1 for run in runs if run["exit"]),
+        "error": next((run["error"] for run in runs if run["error"]), None),
+    }
+
+
+def format_delta(value: float, base) -> str:
+    if not base:
+        return ""
+    return f"{(value - base) / base * 100:+.0f}%"
+
+
+def format_count_delta(value: float, base) -> str:
+    # Absolute: one connection becoming five matters more than its percentage.
+    if base is None:
+        return ""
+    return f"{value - base:+.0f}"
+
+
+def print_results(results: list, baseline: dict) -> None:
+    header = f"{'Command':<16}{'p50 ms':>9}{'min ms':>9}{'max ms':>9}{'cmd/s':>8}{'reqs':>6}{'conns':>7}"
+    header += f"{'KB sent':>10}{'MB/s':>8}{'RSS MB':>8}"
+    if baseline:
+        header += f"{'p50 vs base':>13}{'KB vs base':>12}{'conns vs base':>15}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        line = (f"{r['name']:<16}{r['median_ms']:>9.1f}{r['min_ms']:>9.1f}{r['max_ms']:>9.1f}"
+                f"{r['commands_per_s']:>8.1f}{r['requests']:>6.0f}{r['connections']:>7.0f}"
+                f"{r['bytes'] / 1024:>10.1f}"
+                f"{r['mb_per_s']:>8.2f}{r['peak_rss_mb']:>8.1f}")
+        if baseline:
+            base = baseline.get(r["name"], {})
+            line += f"{format_delta(r['median_ms'], base.get('median_ms')):>13}"
+            line += f"{format_delta(r['bytes'], base.get('bytes')):>12}"
+            line += f"{format_count_delta(r['connections'], base.get('connections')):>15}"
+        print(line)
+        if r["failures"]:
+            print(f"  {r['failures']} of {r['runs']} runs failed: {r['error']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark jenkins_cli.py commands against the mock Jenkins",
+        epilog=f"Commands: {', '.join(name for name, _ in SUITE)}")
+    parser.add_argument("--script", default=DEFAULT_SCRIPT, help="CLI script or .pyz to benchmark")
+    parser.add_argument("--only", help="Comma-separated command names to run (default: all)")
+    parser.add_argument("--runs", "-n", type=int, default=5, help="Timed runs per command (default: 5)")
+    parser.add_argument("--warmup", type=int, default=1, help="Untimed runs per command first (default: 1)")
+    parser.add_argument("--warm-cache", action="store_true",
+                        help="Keep the CLI's cache between runs instead of starting each run cold")
+    parser.add_argument("--mock-args", default="",
+                        help='Options for the mock server, e.g. "--latency-ms 20 --log-lines 20000"')
+    parser.add_argument("--url", help="Benchmark an already running mock_jenkins.py instead")
+    parser.add_argument("--json", metavar="FILE", help="Also write the results to FILE")
+    parser.add_argument("--baseline", metavar="FILE", help="Compare against results saved with --json")
+    args = parser.parse_args()
+
+    suite = SUITE
+    if args.only:
+        wanted = args.only.split(",")
+        unknown = set(wanted) - {name for name, _ in SUITE}
+        if unknown:
+            parser.error(f"unknown commands: {', '.join(sorted(unknown))}")
+        suite = [entry for entry in SUITE if entry[0] in wanted]
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = {r["name"]: r for r in json.load(f)["results"]}
+
+    mock = None
+    url = args.url
+    if not url:
+        mock, url = start_mock(args.mock_args)
+    args.script = os.path.abspath(args.script)
+    print(f"Benchmarking {os.path.relpath(args.script)} against {url} "
+          f"({args.runs} runs, {'warm' if args.warm_cache else 'cold'} cache)\n")
+    try:
+        results = [bench_command(name, argv, args, url) for name, argv in suite]
+    finally:
+        if mock:
+            mock.terminate()
+            mock.wait()
+
+    print_results(results, baseline)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"script": args.script, "url": url, "mock_args": args.mock_args,
+                       "python": sys.version.split()[0], "results": results}, f, indent=2)
+    sys.exit(1 if any(r["failures"] for r in results) else 0)
+
+
+if __name__ == "__main__":
+    main()
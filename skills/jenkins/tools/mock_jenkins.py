@@ -0,0 +1,532 @@
+#!/usr/bin/env python3
+"""
+Fake Jenkins controller for exercising and benchmarking jenkins_cli.py offline.
+
+Serves the endpoints the CLI uses from generated, deterministic data:
+api/json (with tree= filtering and {M,N} ranges) for the root, folders, jobs
+and builds, consoleText, logText/progressiveText, wfapi/describe and the
+per-node wfapi endpoints, queue/api/json, computer/api/json, build,
+buildWithParameters and stop. Latency, payload sizes, job counts and
+injected errors are set on the command line. GET /mock/stats returns request,
+connection, byte and error counters, which tools/bench.py uses to measure
+traffic per command.
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import random
+import re
+import sys
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+STAGES = [  # name, start offset and duration as fractions of the build; Unit, Lint, Integration run in parallel
+    ("Checkout", 0.00, 0.05), ("Build", 0.05, 0.25), ("Unit", 0.30, 0.25),
+    ("Lint", 0.30, 0.10), ("Integration", 0.30, 0.55), ("Deploy", 0.85, 0.15),
+]
+TREE_NAME_RE = re.compile(r"[\w$]+")
+
+
+def _stable(*parts) -> int:
+    """Deterministic pseudo-random integer for the given parts."""
+    return int.from_bytes(hashlib.blake2b(repr(parts).encode(), digest_size=4).digest(), "big")
+
+
+class MockBuild:
+    """A build with a generated log; a running build's log grows until it completes."""
+
+    def __init__(self, server: "MockJenkins", job: "MockJob", number: int, running: bool = False):
+        self.server = server
+        self.job = job
+        self.number = number
+        options = server.options
+        self.duration = 60000 + _stable(job.full_name, number) % 240000
+        if running:
+            self.started = time.time()
+            self.timestamp = int(self.started * 1000)
+            self.aborted = False
+        else:
+            self.started = None
+            age = (job.build_count - number + 1) * options.build_interval
+            self.timestamp = server.created_ms - age * 1000 - self.duration
+        self.failed = _stable(job.full_name, number, "result") % 100 < options.failure_percent
+        self._log = None
+        self._log_gzip = None
+
+    @property
+    def building(self) -> bool:
+        return (self.started is not None and not self.aborted
+                and time.time() - self.started < self.server.options.running_seconds)
+
+    @property
+    def result(self):
+        if self.started is not None and self.aborted:
+            return "ABORTED"
+        if self.building:
+            return None
+        return "FAILURE" if self.failed else "SUCCESS"
+
+    @property
+    def log(self) -> bytes:
+        if self._log is None:
+            options = self.server.options
+            seed = f"{self.job.full_name}#{self.number}"
+            pad = "." * max(0, options.line_bytes - len(seed) - 40)
+            lines = [f"[{seed}] ERROR: connection refused to db-{i % 7}\n" if i % 50 == 49 else
+                     f"[{seed}] step {i}: compiling module_{i % 97} {pad} ok\n"
+                     for i in range(options.log_lines)]
+            if self.failed:
+                lines.append(f"FATAL: disk quota exceeded on volume_{self.number}\n")
+            lines.append(f"Finished: {'FAILURE' if self.failed else 'SUCCESS'}\n")
+            self._log = "".join(lines).encode()
+        if self.started is None:
+            return self._log
+        done = min(1.0, (time.time() - self.started) / self.server.options.running_seconds)
+        return self._log if not self.building else self._log[:int(len(self._log) * done)]
+
+    @property
+    def log_gzip(self) -> bytes:
+        """The finished log compressed once, so serving it repeatedly costs the mock little CPU."""
+        if self._log_gzip is None:
+            self._log_gzip = gzip.compress(self.log, 1)
+        return self._log_gzip
+
+    def api(self) -> dict:
+        padding = self.server.options.action_bytes
+        return {
+            "_class": "org.jenkinsci.plugins.workflow.job.WorkflowRun",
+            "number": self.number, "id": str(self.number),
+            "result": lambda: self.result, "building": lambda: self.building,
+            "duration": lambda: 0 if self.building else self.duration,
+            "estimatedDuration": self.duration, "timestamp": self.timestamp,
+            "displayName": f"#{self.number}", "fullDisplayName": f"{self.job.full_name} #{self.number}",
+            "url": f"{self.server.url}/{self.job.path}/{self.number}/",
+            "builtOn": f"agent-{self.number % max(1, self.server.options.agents)}",
+            "actions": lambda: [
+                {"_class": "hudson.model.ParametersAction",
+                 "parameters": [{"name": "VERSION", "value": f"1.{self.number}"}]},
+                {"_class": "hudson.model.CauseAction",
+                 "causes": [{"shortDescription": "Started by timer"}]},
+                {"_class": "hudson.tasks.junit.TestResultAction", "failCount": int(self.failed),
+                 "totalCount": 100, "urlName": "testReport", "padding": "x" * padding},
+            ],
+            "changeSets": lambda: [{"items": [{"msg": f"change {self.number}",
+                                               "author": {"fullName": "dev"}}]}],
+        }
+
+    def stages(self) -> list:
+        stages = []
+        for index, (name, offset, share) in enumerate(STAGES, 1):
+            status = "FAILED" if self.failed and name == "Integration" else "SUCCESS"
+            if self.building:
+                status = "IN_PROGRESS"
+            stages.append({"id": str(index), "name": name, "status": status,
+                           "startTimeMillis": self.timestamp + int(self.duration * offset),
+                           "durationMillis": int(self.duration * share), "pauseDurationMillis": 0})
+        return stages
+
+    def describe(self) -> dict:
+        status = "IN_PROGRESS" if self.building else {"FAILURE": "FAILED"}.get(self.result, self.result)
+        return {"id": str(self.number), "name": f"#{self.number}", "status": status,
+                "startTimeMillis": self.timestamp, "durationMillis": self.duration,
+                "stages": self.stages()}
+
+
+class MockJob:
+    """A pipeline job, or a folder when it has children."""
+
+    def __init__(self, server: "MockJenkins", name: str, parent=None, folder: bool = False,
+                 build_count: int = 0, running: bool = False):
+        self.server = server
+        self.name = name
+        self.parent = parent
+        self.folder = folder
+        self.children = {}
+        self.full_name = f"{parent.full_name}/{name}" if parent and parent.full_name else name
+        self.path = "/".join(f"job/{urllib.parse.quote(part, safe='')}"
+                             for part in self.full_name.split("/")) if name else ""
+        self.build_count = build_count
+        self.builds = {n: MockBuild(server, self, n) for n in range(1, build_count + 1)}
+        if running:
+            self.builds[build_count + 1] = MockBuild(server, self, build_count + 1, running=True)
+
+    def add(self, child: "MockJob") -> "MockJob":
+        self.children[child.name] = child
+        return child
+
+    def find_build(self, ref: str):
+        numbers = sorted(self.builds, reverse=True)
+        if ref.isdigit():
+            return self.builds.get(int(ref))
+        if ref == "lastBuild":
+            matches = numbers
+        elif ref == "lastCompletedBuild":
+            matches = [n for n in numbers if not self.builds[n].building]
+        elif ref == "lastSuccessfulBuild":
+            matches = [n for n in numbers if self.builds[n].result == "SUCCESS"]
+        elif ref == "lastFailedBuild":
+            matches = [n for n in numbers if self.builds[n].result == "FAILURE"]
+        else:
+            matches = []
+        return self.builds[matches[0]] if matches else None
+
+    def api(self) -> dict:
+        url = f"{self.server.url}/{self.path}/"
+        if self.folder:
+            return {"_class": "com.cloudbees.hudson.plugins.folder.Folder", "name": self.name,
+                    "fullName": self.full_name, "url": url,
+                    "jobs": lambda: [child.api() for child in self.children.values()]}
+        numbers = sorted(self.builds, reverse=True)
+        ref = lambda name: lambda: (lambda build: build.api() if build else None)(self.find_build(name))
+        color = lambda: ("notbuilt" if not numbers else
+                         {"FAILURE": "red", "ABORTED": "aborted"}.get(self.builds[numbers[0]].result, "blue") +
+                         ("_anime" if self.builds[numbers[0]].building else ""))
+        return {
+            "_class": "org.jenkinsci.plugins.workflow.job.WorkflowJob",
+            "name": self.name, "fullName": self.full_name, "displayName": self.name,
+            "description": None, "buildable": True, "url": url, "color": color,
+            "inQueue": lambda: any(item["task"]["name"] == self.full_name for item in self.server.queue),
+            "nextBuildNumber": (numbers[0] + 1) if numbers else 1,
+            "lastBuild": ref("lastBuild"), "lastCompletedBuild": ref("lastCompletedBuild"),
+            "lastSuccessfulBuild": ref("lastSuccessfulBuild"), "lastFailedBuild": ref("lastFailedBuild"),
+            "healthReport": [{"description": "Build stability", "score": 80}],
+            "builds": lambda: [self.builds[n].api() for n in numbers[:100]],
+            "allBuilds": lambda: [self.builds[n].api() for n in numbers],
+            "queueItem": lambda: next((item for item in self.server.queue
+                                       if item["task"]["name"] == self.full_name), None),
+            "property": [{"_class": "hudson.model.ParametersDefinitionProperty",
+                          "parameterDefinitions": [{"name": "VERSION", "type": "StringParameterDefinition"}]}],
+        }
+
+
+def parse_tree(text: str) -> dict:
+    """Parse a tree= expression into {field: (subtree or None, range or None)}."""
+    pos = 0
+
+    def parse_list() -> dict:
+        nonlocal pos
+        spec = {}
+        while pos < len(text) and text[pos] != "]":
+            match = TREE_NAME_RE.match(text, pos)
+            if not match:
+                raise ValueError(f"bad tree expression at offset {pos}")
+            pos = match.end()
+            sub = rng = None
+            if pos < len(text) and text[pos] == "[":
+                pos += 1
+                sub = parse_list()
+                pos += 1
+            if pos < len(text) and text[pos] == "{":
+                end = text.index("}", pos)
+                rng = text[pos + 1:end]
+                pos = end + 1
+            spec[match.group(0)] = (sub, rng)
+            if pos < len(text) and text[pos] == ",":
+                pos += 1
+        return spec
+
+    return parse_list()
+
+
+def apply_range(values: list, rng) -> list:
+    """Slice a list like Jenkins' {M,N}, {M,}, {,N} and {N} ranges."""
+    if rng is None:
+        return values
+    if "," in rng:
+        start, end = rng.split(",")
+        return values[int(start or 0):int(end) if end else None]
+    return values[int(rng):int(rng) + 1]
+
+
+def render(value, spec=None):
+    """Resolve lazy fields and keep only those selected by spec (everything when None)."""
+    if callable(value):
+        value = value()
+    if isinstance(value, list):
+        return [render(item, spec) for item in value]
+    if not isinstance(value, dict):
+        return value
+    if spec is None:
+        return {key: render(item) for key, item in value.items()}
+    out = {"_class": value["_class"]} if "_class" in value else {}
+    for name, (sub, rng) in spec.items():
+        if name in value:
+            item = value[name]() if callable(value[name]) else value[name]
+            if isinstance(item, list):
+                item = apply_range(item, rng)
+            out[name] = render(item, sub) if sub is not None else render(item)
+    return out
+
+
+class MockJenkins(ThreadingHTTPServer):
+    """HTTP server holding the generated controller state and traffic counters."""
+
+    daemon_threads = True
+    request_queue_size = 128  # the default backlog of 5 drops SYNs under concurrent clients
+
+    def __init__(self, options: argparse.Namespace):
+        super().__init__((options.host, options.port), MockHandler)
+        self.options = options
+        self.url = f"http://{options.host}:{self.server_address[1]}"
+        self.created_ms = int(time.time() * 1000)
+        self.lock = threading.Lock()
+        self.counters = {"connections": 0, "requests": 0, "bytes_sent": 0, "bytes_received": 0, "errors": 0}
+        self.queue = [{"id": i + 1, "task": {"name": f"job{i}"}, "why": "Waiting for next available executor",
+                       "inQueueSince": self.created_ms - (i + 1) * 60000, "stuck": False, "blocked": False,
+                       "buildable": True} for i in range(options.queue)]
+        self.next_queue_id = options.queue + 1
+        self.root = MockJob(self, "", folder=True)
+        for i in range(options.jobs):
+            self.root.add(MockJob(self, f"job{i}", self.root, build_count=options.builds,
+                                  running=i < options.running))
+        for f in range(options.folders):
+            folder = self.root.add(MockJob(self, f"folder{f}", self.root, folder=True))
+            for i in range(options.folder_jobs):
+                folder.add(MockJob(self, f"app{i}", folder, build_count=options.builds))
+            nested = folder.add(MockJob(self, "nested", folder, folder=True))
+            nested.add(MockJob(self, "deep", nested, build_count=options.builds))
+
+    def count(self, **deltas) -> None:
+        with self.lock:
+            for key, delta in deltas.items():
+                self.counters[key] += delta
+
+    def inject_error(self) -> bool:
+        """Decide whether a request gets an injected error, counting it if so."""
+        options = self.options
+        with self.lock:
+            if options.error_limit is not None and self.counters["errors"] >= options.error_limit:
+                return False
+            if not (options.error_percent and random.uniform(0, 100) < options.error_percent):
+                return False
+            self.counters["errors"] += 1
+            return True
+
+    def enqueue(self, job: MockJob) -> int:
+        with self.lock:
+            queue_id = self.next_queue_id
+            self.next_queue_id += 1
+            self.queue.append({"id": queue_id, "task": {"name": job.full_name}, "why": "Waiting for next available executor",
+                               "inQueueSince": int(time.time() * 1000), "stuck": False, "blocked": False,
+                               "buildable": True})
+        return queue_id
+
+    def root_api(self) -> dict:
+        return {"_class": "hudson.model.Hudson", "mode": "NORMAL", "nodeDescription": "mock Jenkins",
+                "nodeName": "", "numExecutors": 0, "useSecurity": True, "url": f"{self.url}/",
+                "jobs": lambda: [child.api() for child in self.root.children.values()]}
+
+    def computer_api(self) -> dict:
+        agents = self.options.agents
+        busy = sum(1 for job in self.root.children.values() for build in job.builds.values() if build.building)
+        computers = [{"_class": "hudson.slaves.SlaveComputer", "displayName": f"agent-{i}", "offline": False,
+                      "idle": i >= busy, "numExecutors": 2,
+                      "executors": [{"idle": not (i < busy and k == 0)} for k in range(2)]}
+                     for i in range(agents)]
+        return {"busyExecutors": min(busy, agents), "totalExecutors": agents * 2, "computer": computers}
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: MockJenkins
+
+    def setup(self):
+        super().setup()
+        self.server.count(connections=1)
+
+    def log_message(self, format, *args):
+        if self.server.options.verbose:
+            sys.stderr.write(f"{self.address_string()} {format % args}\n")
+
+    def do_HEAD(self):
+        self.handle_request()
+
+    def do_GET(self):
+        self.handle_request()
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        self.rfile.read(length)
+        self.server.count(bytes_received=length)
+        self.handle_request()
+
+    def send(self, status: int, body: bytes = b"", content_type: str = "text/plain;charset=utf-8",
+             headers: dict = None, etag: bool = False, compressed: bytes = None) -> None:
+        """Send a response, gzipped when the client accepts it (compressed is a ready-made gzip body)."""
+        headers = dict(headers or {})
+        if etag and status == 200 and not self.server.options.no_etag:
+            tag = '"' + hashlib.md5(body).hexdigest() + '"'
+            headers["ETag"] = tag
+            if self.headers.get("If-None-Match") == tag:
+                status, body = 304, b""
+        if (body and len(body) > 256 and not self.server.options.no_gzip
+                and "gzip" in self.headers.get("Accept-Encoding", "")):
+            body = compressed or gzip.compress(body, 1)
+            headers["Content-Encoding"] = "gzip"
+        self.send_response(status)
+        if body or status == 200:
+            self.send_header("Content-Type", content_type)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        # Counted before sending, so a client that reads /mock/stats right
+        # after the response always sees it.
+        self.server.count(requests=1, bytes_sent=len(body) if self.command != "HEAD" else 0)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def send_json(self, obj, query: dict, etag: bool = False) -> None:
+        try:
+            spec = parse_tree(query["tree"][0]) if "tree" in query else None
+        except (ValueError, IndexError) as e:
+            return self.send(400, str(e).encode())
+        self.send(200, json.dumps(render(obj, spec)).encode(), "application/json;charset=utf-8", etag=etag)
+
+    def not_found(self) -> None:
+        self.send(404, b"Not found")
+
+    def handle_request(self) -> None:
+        options = self.server.options
+        parts = urllib.parse.urlsplit(self.path)
+        if parts.path == "/mock/stats":
+            with self.server.lock:
+                body = json.dumps(self.server.counters).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        delay = options.latency_ms + random.uniform(0, options.jitter_ms)
+        if delay:
+            time.sleep(delay / 1000)
+        if self.server.inject_error():
+            headers = {"Retry-After": f"{options.retry_after:g}"} if options.retry_after is not None else {}
+            return self.send(options.error_status, b"Injected error", headers=headers)
+        query = urllib.parse.parse_qs(parts.query)
+        segments = [urllib.parse.unquote(s) for s in parts.path.strip("/").split("/") if s]
+        node = self.server.root
+        while len(segments) >= 2 and segments[0] == "job":
+            node = node.children.get(segments[1])
+            if node is None:
+                return self.not_found()
+            segments = segments[2:]
+
+        if node is self.server.root:
+            if segments == ["api", "json"]:
+                return self.send_json(self.server.root_api(), query, etag=True)
+            if segments == ["queue", "api", "json"]:
+                return self.send_json({"items": list(self.server.queue)}, query)
+            if segments == ["computer", "api", "json"]:
+                return self.send_json(self.server.computer_api(), query)
+            return self.not_found()
+        if segments == ["api", "json"]:
+            return self.send_json(node.api(), query, etag=True)
+        if segments in (["build"], ["buildWithParameters"]) and self.command == "POST" and not node.folder:
+            queue_id = self.server.enqueue(node)
+            return self.send(201, headers={"Location": f"{self.server.url}/queue/item/{queue_id}/"})
+        if not segments or node.folder:
+            return self.not_found()
+
+        build = node.find_build(segments[0])
+        if build is None:
+            return self.not_found()
+        rest = segments[1:]
+        if rest == ["api", "json"]:
+            return self.send_json(build.api(), query)
+        if rest == ["stop"] and self.command == "POST":
+            if build.building:
+                build.aborted = True
+            return self.send(302, headers={"Location": f"{self.server.url}/{node.path}/{build.number}/"})
+        if rest == ["consoleText"]:
+            return self.send(200, build.log, compressed=None if build.building else build.log_gzip)
+        if rest == ["logText", "progressiveText"]:
+            log = build.log
+            start = int(query.get("start", ["0"])[0] or 0)
+            headers = {"X-Text-Size": str(len(log))}
+            if build.building:
+                headers["X-More-Data"] = "true"
+            return self.send(200, log[start:] if start <= len(log) else log, headers=headers)
+        if rest == ["wfapi", "describe"]:
+            return self.send_json(build.describe(), query)
+        if len(rest) == 5 and rest[:2] == ["execution", "node"] and rest[3] == "wfapi":
+            return self.node_api(build, rest[2], rest[4], query)
+        return self.not_found()
+
+    def node_api(self, build: MockBuild, node_id: str, endpoint: str, query: dict) -> None:
+        """Serve wfapi describe (stage with its steps) and log (one step) for a flow node."""
+        stage = next((s for s in build.stages() if node_id.startswith(s["id"])), None)
+        if stage is None:
+            return self.not_found()
+        if endpoint == "describe" and node_id == stage["id"]:
+            steps = [{"id": f"{node_id}{k}", "name": "Shell Script", "status": stage["status"] if k == 2 else "SUCCESS",
+                      "parameterDescription": f"make {stage['name'].lower()} {k}", "parentNodes": [node_id],
+                      "startTimeMillis": stage["startTimeMillis"] + k * 1000, "durationMillis": 1000}
+                     for k in range(3)]
+            return self.send_json(dict(stage, stageFlowNodes=steps), query)
+        if endpoint == "log":
+            text = "".join(f"output of node {node_id} line {i}\n" for i in range(5))
+            if stage["status"] == "FAILED" and node_id.endswith("2"):
+                text += "ERROR: tests failed\n"
+            return self.send_json({"nodeId": node_id, "nodeStatus": stage["status"], "length": len(text),
+                                   "hasMore": False, "text": text,
+                                   "consoleUrl": f"/execution/node/{node_id}/log"}, query)
+        return self.not_found()
+
+
+def create_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Fake Jenkins controller for testing jenkins_cli.py offline")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to bind (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on; 0 picks a free one (default: 8765)")
+    parser.add_argument("--jobs", type=int, default=20, help="Top-level jobs (default: 20)")
+    parser.add_argument("--folders", type=int, default=2,
+                        help="Folders, each with --folder-jobs jobs and a nested folder (default: 2)")
+    parser.add_argument("--folder-jobs", type=int, default=5, help="Jobs per folder (default: 5)")
+    parser.add_argument("--builds", type=int, default=50, help="Finished builds per job (default: 50)")
+    parser.add_argument("--running", type=int, default=1,
+                        help="Top-level jobs with an extra build in progress (default: 1)")
+    parser.add_argument("--running-seconds", type=float, default=30,
+                        help="Time a running build takes to finish, its log growing meanwhile (default: 30)")
+    parser.add_argument("--build-interval", type=int, default=3600,
+                        help="Seconds between the start of consecutive builds (default: 3600)")
+    parser.add_argument("--failure-percent", type=int, default=20, help="Share of failed builds (default: 20)")
+    parser.add_argument("--log-lines", type=int, default=2000, help="Console lines per build (default: 2000)")
+    parser.add_argument("--line-bytes", type=int, default=80, help="Approximate bytes per console line (default: 80)")
+    parser.add_argument("--action-bytes", type=int, default=2000,
+                        help="Padding in each build's actions, to mimic plugin-heavy payloads (default: 2000)")
+    parser.add_argument("--queue", type=int, default=2, help="Initial queue items (default: 2)")
+    parser.add_argument("--agents", type=int, default=4, help="Agents with two executors each (default: 4)")
+    parser.add_argument("--latency-ms", type=float, default=0, help="Delay before every response (default: 0)")
+    parser.add_argument("--jitter-ms", type=float, default=0, help="Extra random delay up to this (default: 0)")
+    parser.add_argument("--error-percent", type=float, default=0,
+                        help="Share of requests answered with --error-status instead (default: 0)")
+    parser.add_argument("--error-status", type=int, default=503, help="Status of injected errors (default: 503)")
+    parser.add_argument("--error-limit", type=int,
+                        help="Stop injecting errors after this many (default: no limit)")
+    parser.add_argument("--retry-after", type=float,
+                        help="Retry-After seconds sent with injected errors (default: none)")
+    parser.add_argument("--no-gzip", action="store_true", help="Never compress responses")
+    parser.add_argument("--no-etag", action="store_true", help="Do not send ETags on job and folder JSON")
+    parser.add_argument("--verbose", "-v", action="store_true", help="Log every request to stderr")
+    return parser
+
+
+def main():
+    server = MockJenkins(create_parser().parse_args())
+    print(f"Mock Jenkins listening on {server.url}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Measure jenkins_cli.py cold-start time.
+
+Runs a command in fresh interpreters (by default `check` against an address
+nothing listens on, so no network time is included), reports the median
+wall-clock time and the slowest top-level imports from `python -X importtime`,
+and exits non-zero when the median exceeds --budget-ms or when a module that
+should load lazily was imported. tests/test_startup.py runs it with the
+defaults below as a regression gate.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_SCRIPT = os.path.join(HERE, "..", "scripts", "jenkins_cli.py")
+DEFAULT_FORBID = ["asyncio", "sqlite3", "subprocess", "concurrent.futures"]
+DEFAULT_BUDGET_MS = 250.0  # about 150ms on a typical machine, with headroom for slow CI
+
+
+def run_env(cache_dir: str) -> dict:
+    env = dict(os.environ)
+    # Nothing listens on port 9; without retries the refused connection fails at once.
+    env.update(JENKINS_URL="http://127.0.0.1:9", JENKINS_CLI_NO_DAEMON="1", JENKINS_RETRIES="0",
+               JENKINS_CACHE_DIR=cache_dir)
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    return env
+
+
+def wall_times(cmd: list, env: dict, runs: int) -> list:
+    subprocess.run(cmd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)  # warm bytecode
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(cmd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        times.append((time.perf_counter() - start) * 1000)
+    return times
+
+
+def import_times(cmd: list, env: dict) -> tuple:
+    """Return ({module: cumulative_us} for top-level imports, set of all imported modules)."""
+    result = subprocess.run([cmd[0], "-X", "importtime"] + cmd[1:], env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    top, seen = {}, set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        seen.add(name.strip())
+        if not name[1:].startswith(" "):  # nested imports are indented
+            top[name.strip()] = int(cumulative)
+    return top, seen
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold-start benchmark for jenkins_cli.py")
+    parser.add_argument("--script", default=DEFAULT_SCRIPT, help="CLI script or .pyz to run")
+    parser.add_argument("--runs", type=int, default=15, help="Timed runs (default: 15)")
+    parser.add_argument("--top", type=int, default=12, help="Imports to list (default: 12)")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS,
+                        help=f"Fail when the median wall time exceeds this (default: {DEFAULT_BUDGET_MS:g}; "
+                             "0 to skip)")
+    parser.add_argument("--forbid", default=",".join(DEFAULT_FORBID),
+                        help="Comma-separated modules the command must not import "
+                             f"(default: {','.join(DEFAULT_FORBID)}; empty to skip)")
+    parser.add_argument("command", nargs="*", default=["check"],
+                        help="CLI arguments to run (default: check); put them after --")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        env = run_env(cache_dir)
+        cmd = [sys.executable, args.script] + args.command
+        baseline = statistics.median(wall_times([sys.executable, "-c", "pass"], env, args.runs))
+        times = wall_times(cmd, env, args.runs)
+        top, seen = import_times(cmd, env)
+
+    median = statistics.median(times)
+    print(f"Command: {' '.join(args.command)}  ({args.runs} runs)")
+    print(f"Wall time: median {median:.1f}ms  min {min(times):.1f}ms  max {max(times):.1f}ms  "
+          f"(bare interpreter {baseline:.1f}ms)")
+    print(f"Imports: {sum(top.values()) / 1000:.1f}ms in {len(seen)} modules; slowest top-level:")
+    for name, cumulative in sorted(top.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {cumulative / 1000:8.2f}ms  {name}")
+
+    failed = False
+    # A package executed on first use is not listed itself, only its submodules.
+    forbidden = sorted(m for m in args.forbid.split(",")
+                       if m and any(name == m or name.startswith(m + ".") for name in seen))
+    if forbidden:
+        print(f"FAIL: imported modules that should load lazily: {', '.join(forbidden)}")
+        failed = True
+    if args.budget_ms and median > args.budget_ms:
+        print(f"FAIL: median {median:.1f}ms exceeds budget of {args.budget_ms:g}ms")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()